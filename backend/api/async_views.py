@@ -0,0 +1,93 @@
+"""
+Асинхронные представления для режима ASGI (настройка ASGI).
+
+Представления не держат поток на время запроса: работа с базой идет
+в ограниченном пуле потоков foodgram.db.pool, пока цикл событий
+обслуживает другие соединения. Ответы совпадают с ответами
+синхронных представлений DRF.
+"""
+from django.http import Http404, HttpResponseNotModified
+from django.utils.cache import get_conditional_response
+from rest_framework.authentication import get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.authentication import CachedTokenAuthentication
+from api.conditional import recipe_validators, set_conditional_headers
+from api.views import IngredientsViewSet, RecipeViewSet, TagsViewSet
+from foodgram.db.pool import database_sync_to_async
+
+recipe_view = RecipeViewSet.as_view({
+    'get': 'retrieve',
+    'put': 'update',
+    'patch': 'partial_update',
+    'delete': 'destroy',
+})
+
+
+CATALOG_VIEWS = {
+    'tags': (
+        TagsViewSet.as_view({'get': 'list'}),
+        TagsViewSet.as_view({'get': 'retrieve'}),
+    ),
+    'ingredients': (
+        IngredientsViewSet.as_view({'get': 'list'}),
+        IngredientsViewSet.as_view({'get': 'retrieve'}),
+    ),
+}
+
+
+async def catalog_view(request, catalog, pk=None):
+    """
+    Справочники меток и продуктов: представления DRF в пуле потоков
+    базы, с их фильтрами, правами доступа и кэшем ответов.
+    """
+    list_view, detail_view = CATALOG_VIEWS[catalog]
+    if pk is None:
+        return await database_sync_to_async(list_view)(request)
+    return await database_sync_to_async(detail_view)(request, pk=str(pk))
+
+
+@database_sync_to_async
+def check_recipe_not_modified(request, pk):
+    """
+    304 для рецепта, который не изменился с версии клиента, без DRF
+    и сериализации. None - ответ нужно строить полностью.
+    """
+    if get_authorization_header(request):
+        try:
+            credentials = CachedTokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return None
+        if credentials is not None:
+            request.user = credentials[0]
+    try:
+        etag, last_modified = recipe_validators(request, pk)
+    except Http404:
+        return None
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if isinstance(response, HttpResponseNotModified):
+        return set_conditional_headers(response, etag, last_modified)
+    return None
+
+
+async def recipe_detail(request, pk):
+    """
+    Рецепт: условный GET проверяется асинхронно, остальное -
+    RecipeViewSet в пуле потоков базы.
+    """
+    if request.method == 'GET' and (
+        'HTTP_IF_NONE_MATCH' in request.META
+        or 'HTTP_IF_MODIFIED_SINCE' in request.META
+    ):
+        response = await check_recipe_not_modified(request, pk)
+        if response is not None:
+            return response
+    return await database_sync_to_async(recipe_view)(request, pk=str(pk))
+
+
+# csrf_exempt в Django 3.2 не поддерживает корутины; DRF проверяет CSRF
+# сам только при сессионной аутентификации.
+catalog_view.csrf_exempt = True
+recipe_detail.csrf_exempt = True
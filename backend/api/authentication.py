@@ -0,0 +1,124 @@
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+from api import replicas
+from recipes.cache import bump_version, get_version
+
+logger = logging.getLogger(__name__)
+
+USER_VERSION_KEY = 'auth:user:{user_id}'
+STATS_LOG_EVERY = 1000
+
+
+def get_user_version(user_id):
+    return get_version(USER_VERSION_KEY.format(user_id=user_id))
+
+
+def invalidate_user_tokens(user_id):
+    """
+    Сбрасывает закэшированные токены пользователя во всех воркерах:
+    версия пользователя в общем кэше перестает совпадать с версией,
+    сохраненной вместе с токеном.
+    """
+    bump_version(USER_VERSION_KEY.format(user_id=user_id))
+
+
+class TokenCache:
+    """LRU-кэш токен → пользователь с ограниченным временем жизни."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _count(self, hit):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        if (self.hits + self.misses) % STATS_LOG_EVERY == 0:
+            logger.info(
+                'Кэш токенов: попаданий %.1f%%, записей %d',
+                self.hit_ratio() * 100, len(self._entries)
+            )
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            user, token, expires_at, version = entry
+            if (
+                expires_at > time.monotonic()
+                and version == get_user_version(user.pk)
+            ):
+                with self._lock:
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                    self._count(hit=True)
+                return copy.copy(user), token
+            self.discard(key)
+        with self._lock:
+            self._count(hit=False)
+        return None
+
+    def set(self, key, user, token):
+        entry = (
+            user, token,
+            time.monotonic() + self.ttl,
+            get_user_version(user.pk)
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+            'hit_ratio': self.hit_ratio(),
+        }
+
+
+token_cache = TokenCache(
+    max_size=settings.TOKEN_CACHE_SIZE,
+    ttl=settings.TOKEN_CACHE_TTL
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по токену с кэшированием пары токен → пользователь
+    в памяти процесса. Записи сбрасываются по истечении TTL, при удалении
+    токена (выход через djoser) и при любом сохранении пользователя,
+    в том числе смене пароля и is_active. Токен читается из основной
+    базы: только что выданного токена на реплике может еще не быть.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            with replicas.primary():
+                cached = super().authenticate_credentials(key)
+            token_cache.set(key, *cached)
+        replicas.user_authenticated(cached[0].pk)
+        return cached
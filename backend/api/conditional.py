@@ -0,0 +1,82 @@
+import hashlib
+
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from api.fieldsets import selection_key
+from recipes.cache import bump_version, get_version
+from recipes.models import Recipe
+
+USER_STATE_KEY = 'etag:user:{user_id}'
+
+
+def bump_user_state(user_id):
+    """
+    Меняет версию пользовательских флагов (избранное, корзина, подписки),
+    от которой зависят ETag рецептов для этого пользователя.
+    """
+    bump_version(USER_STATE_KEY.format(user_id=user_id))
+
+
+def make_etag(request, *parts):
+    """
+    ETag из переданных частей, пользователя и версии его флагов:
+    одинаковый рецепт у разных пользователей отличается флагами.
+    """
+    user = request.user
+    if user.is_authenticated:
+        parts = (
+            *parts,
+            user.pk,
+            get_version(USER_STATE_KEY.format(user_id=user.pk))
+        )
+    return '"{}"'.format(hashlib.md5(
+        ':'.join(str(part) for part in parts).encode()
+    ).hexdigest())
+
+
+def get_last_modified(request, updated_at):
+    """
+    Last-Modified отдается только анонимным пользователям: для остальных
+    ответ зависит еще и от их флагов, которые дата не отражает.
+    """
+    if request.user.is_authenticated or updated_at is None:
+        return None
+    return int(updated_at.timestamp())
+
+
+def recipe_validators(request, recipe_id):
+    """
+    ETag и Last-Modified рецепта; Http404, если его нет или recipe_id
+    не число.
+    """
+    # Как rest_framework.generics.get_object_or_404, который отсюда не
+    # импортировать: модуль загружается до настроек пагинации DRF.
+    try:
+        updated_at = get_object_or_404(
+            Recipe.objects.values_list('updated_at', flat=True),
+            pk=recipe_id
+        )
+    except (TypeError, ValueError):
+        raise Http404
+    etag = make_etag(
+        request, selection_key(request), recipe_id, updated_at.timestamp()
+    )
+    return etag, get_last_modified(request, updated_at)
+
+
+def conditional_response(request, etag, last_modified=None):
+    """Ответ 304, если клиентская копия не устарела, иначе None."""
+    return get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+
+
+def set_conditional_headers(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ('Authorization',))
+    return response
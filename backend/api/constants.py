@@ -2,6 +2,32 @@ AUTHORIZE_TEXT = 'Войдите в свою учетную запись или
 RECIPE_NOT_FOUND = 'Рецепт не найден.'
 
 RECIPE_ALREADY = 'Рецепт уже в {message_text}.'
+RECIPE_NOT_IN_LIST = 'Рецепта нет в {message_text}.'
+BATCH_MAX_RECIPES = 100
+# Наибольший id в BigAutoField (и в INTEGER SQLite).
+MAX_ID = 2 ** 63 - 1
+# Наибольшее значение IntegerField и PositiveIntegerField в PostgreSQL.
+MAX_INTEGER = 2 ** 31 - 1
+STATUS_IDS_PARAM = 'ids'
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+EXPAND_PARAM = 'expand'
+NORMALIZE_PARAM = 'normalize'
+PAGE_PARAM = 'page'
+LIMIT_PARAM = 'limit'
+TAGS_PARAM = 'tags'
+FORMAT_PARAM = 'format'
+CACHED_MEDIA_TYPE = 'application/json'
+TRUE_VALUES = ('1', 'true')
+COUNT_IGNORED_PARAMS = (
+    PAGE_PARAM, LIMIT_PARAM, FIELDS_PARAM, OMIT_PARAM, EXPAND_PARAM,
+    NORMALIZE_PARAM, FORMAT_PARAM
+)
+USER_FILTER_PARAMS = ('is_favorited', 'is_in_shopping_cart', 'is_subscribed')
+VALID_STATUS_IDS = (
+    'Параметр ids должен содержать от 1 до '
+    f'{BATCH_MAX_RECIPES} id рецептов через запятую.'
+)
 
 VALID_EMPTY = 'Поле {field} не должно быть пустым!'
 VALID_INGREDIENT = 'Продукт {ingredient} не существует!'
@@ -29,3 +55,22 @@ AUTH_FAIL_TEXT = 'Неверный email или пароль.'
 HTTP_METHOD_NAMES = ('get', 'post', 'delete', 'patch')
 
 FOR_RECIPES = 'Для рецептов: '
+
+PANTRY_INGREDIENTS_PARAM = 'ingredients'
+PANTRY_MISSING_PARAM = 'missing'
+PANTRY_MAX_MISSING = 5
+VALID_PANTRY_IDS = 'Параметр ingredients должен содержать id продуктов.'
+VALID_PANTRY_MISSING = (
+    f'Параметр missing должен быть числом от 0 до {PANTRY_MAX_MISSING}.'
+)
+
+BATCH_MAX_REQUESTS = 20
+# PUT нужен подзапросам к users/me/avatar/, хотя рецепты его не принимают.
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+BATCH_PATH_PREFIX = '/api/'
+VALID_BATCH_PATH = 'Путь подзапроса должен начинаться с /api/.'
+VALID_BATCH_NESTED = 'Пакетные запросы не могут быть вложенными.'
+
+EVENTS_PATH = '/api/events/'
+SSE_TICKET_PARAM = 'ticket'
+SSE_UNAUTHORIZED = 'Учетные данные не были предоставлены.'
@@ -0,0 +1,164 @@
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Count, Q
+from django.utils.functional import cached_property
+
+import api.constants as const
+from api.conditional import USER_STATE_KEY
+from api.response_cache import normalize_query
+from recipes.cache import get_generations, get_version
+from recipes.models import Recipe, RecipeIngredient, Tag
+
+COUNT_KEY = 'count:{scope}:{digest}'
+ESTIMATE_SQL = (
+    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass'
+)
+
+
+class CountStats:
+    """Счетчики кэша количеств в процессе."""
+
+    FIELDS = ('hits', 'misses', 'estimates')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+
+    def count(self, field):
+        with self._lock:
+            self._counts[field] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+
+count_stats = CountStats()
+
+
+def count_key(request, scope, ignored=const.COUNT_IGNORED_PARAMS):
+    """
+    Ключ количества по параметрам фильтров запроса: страница, размер
+    страницы и набор полей на количество не влияют. Фильтры по спискам
+    пользователя добавляют в ключ его id и версию его флагов.
+    """
+    parts = [normalize_query(request.query_params, ignored)]
+    user = request.user
+    if user.is_authenticated and any(
+        name in request.query_params for name in const.USER_FILTER_PARAMS
+    ):
+        parts += [
+            user.pk, get_version(USER_STATE_KEY.format(user_id=user.pk))
+        ]
+    return COUNT_KEY.format(scope=scope, digest=hashlib.md5(
+        ':'.join(str(part) for part in parts).encode()
+    ).hexdigest())
+
+
+def estimate_count(queryset):
+    """
+    Оценка планировщика PostgreSQL (pg_class.reltuples) для запроса
+    без условий, кроме условия менеджера по умолчанию, если таблица
+    больше COUNT_ESTIMATE_THRESHOLD строк; иначе None. На больших
+    таблицах COUNT(*) читает их целиком.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql' or queryset.query.distinct or (
+        queryset.query.where
+        != queryset.model._default_manager.all().query.where
+    ):
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(ESTIMATE_SQL, [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    # До первого ANALYZE reltuples равен -1 или 0.
+    if row is None or row[0] < settings.COUNT_ESTIMATE_THRESHOLD:
+        return None
+    return row[0]
+
+
+def cached(key, models, compute):
+    """
+    Значение compute() из общего кэша, пока не сменилось поколение
+    данных моделей models и не истек COUNT_CACHE_TTL.
+    """
+    generations = get_generations(*models)
+    entry = cache.get(key)
+    if entry is not None and entry[0] == generations:
+        count_stats.count('hits')
+        return entry[1]
+    value = compute()
+    cache.set(key, (generations, value), settings.COUNT_CACHE_TTL)
+    return value
+
+
+def cached_count(queryset, key, models):
+    def compute():
+        count = estimate_count(queryset)
+        if count is not None:
+            count_stats.count('estimates')
+            return count
+        count_stats.count('misses')
+        return queryset.count()
+
+    return cached(key, models, compute)
+
+
+def tag_facets(queryset, key, models):
+    """
+    Число рецептов queryset с каждой меткой, включая метки без рецептов,
+    одним запросом с группировкой вместо COUNT на каждую метку.
+    """
+    def compute():
+        count_stats.count('misses')
+        return list(Tag.objects.annotate(
+            count=Count('recipes', filter=Q(
+                recipes__in=queryset.order_by().values('id')
+            ))
+        ).order_by(*Tag._meta.ordering).values(
+            'id', 'name', 'slug', 'count'
+        ))
+
+    return cached(key, models, compute)
+
+
+def ingredient_frequencies(ingredient_ids):
+    """
+    Число рецептов с каждым из продуктов ingredient_ids одним запросом
+    с группировкой по индексу (ingredient, recipe).
+    """
+    ingredient_ids = sorted(set(ingredient_ids))
+    key = COUNT_KEY.format(scope='ingredients', digest=hashlib.md5(
+        ','.join(str(ingredient_id) for ingredient_id in ingredient_ids)
+        .encode()
+    ).hexdigest())
+
+    def compute():
+        count_stats.count('misses')
+        return dict(RecipeIngredient.objects.filter(
+            ingredient_id__in=ingredient_ids
+        ).values('ingredient_id').annotate(
+            count=Count('recipe_id')
+        ).values_list('ingredient_id', 'count'))
+
+    return cached(key, (Recipe,), compute)
+
+
+class CachedCountPaginator(Paginator):
+    """Пагинатор, берущий общее число записей из кэша количеств."""
+
+    def __init__(self, *args, count_key, count_models, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_key = count_key
+        self.count_models = count_models
+
+    @cached_property
+    def count(self):
+        return cached_count(
+            self.object_list, self.count_key, self.count_models
+        )
@@ -0,0 +1,207 @@
+import asyncio
+import atexit
+import json
+import logging
+import os
+import socket
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+USER_TOPIC = 'user:{user_id}'
+AUTHOR_TOPIC = 'author:{author_id}'
+RESYNC_EVENT = {'type': 'resync'}
+SOCKET_SUFFIX = '.sock'
+MAX_DATAGRAM = 65536
+
+
+def user_topic(user_id):
+    return USER_TOPIC.format(user_id=user_id)
+
+
+def author_topic(author_id):
+    return AUTHOR_TOPIC.format(author_id=author_id)
+
+
+class Subscriber:
+    """
+    Одно SSE-соединение: набор тем и ограниченная очередь событий
+    в цикле событий соединения. Медленный клиент не копит события
+    без конца: при переполнении очередь заменяется событием resync,
+    по которому клиент перечитывает списки целиком.
+    """
+
+    def __init__(self, bus, topics, loop, queue_size):
+        self.bus = bus
+        self.topics = set()
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        for topic in topics:
+            self.follow(topic)
+
+    def follow(self, topic):
+        self.bus._add(self, topic)
+
+    def unfollow(self, topic):
+        self.bus._remove(self, topic)
+
+    def put(self, event):
+        """Вызывается только в цикле событий соединения."""
+        if event.get('type') == 'subscription':
+            # Лента пользователя следует за его подписками.
+            topic = author_topic(event['author'])
+            if event['added']:
+                self.follow(topic)
+            else:
+                self.unfollow(topic)
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.bus.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_EVENT)
+
+    def close(self):
+        for topic in list(self.topics):
+            self.unfollow(topic)
+
+
+class SocketRelay:
+    """
+    Передает события другим процессам хоста через unix-датаграммы:
+    каждый процесс с SSE-клиентами слушает сокет <pid>.sock в общем
+    каталоге, публикующий процесс отправляет событие во все сокеты
+    каталога. Сокеты завершившихся процессов удаляются при отправке.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.path = None
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+        self._listener = None
+
+    def send(self, message):
+        for path in self.directory.glob(f'*{SOCKET_SUFFIX}'):
+            if path == self.path:
+                continue
+            try:
+                self._sender.sendto(message, str(path))
+            except (ConnectionRefusedError, FileNotFoundError):
+                path.unlink(missing_ok=True)
+            except BlockingIOError:
+                logger.warning('Очередь сокета %s переполнена', path)
+
+    def listen(self, loop, callback):
+        """Начинает прием событий в цикле loop; повторный вызов - no-op."""
+        if self._listener is not None:
+            return
+        # pid определяется здесь, а не при импорте: воркеры могут быть
+        # форками одного процесса.
+        self.path = self.directory / f'{os.getpid()}{SOCKET_SUFFIX}'
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path.unlink(missing_ok=True)
+        atexit.register(self.path.unlink, missing_ok=True)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        listener.bind(str(self.path))
+        listener.setblocking(False)
+        self._listener = listener
+
+        def receive():
+            while True:
+                try:
+                    message = listener.recv(MAX_DATAGRAM)
+                except BlockingIOError:
+                    return
+                callback(message)
+
+        loop.add_reader(listener.fileno(), receive)
+
+
+class EventBus:
+    """
+    Шина событий процесса. Синхронный код (сигналы моделей) публикует
+    события из любого потока, SSE-соединения получают их в своем
+    цикле событий через call_soon_threadsafe. С EVENTS_SOCKET_DIR
+    события доходят и до SSE-клиентов других процессов хоста.
+    """
+
+    def __init__(self, queue_size, relay=None):
+        self.queue_size = queue_size
+        self.relay = relay
+        self.published = 0
+        self.dropped = 0
+        self._topics = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def _add(self, subscriber, topic):
+        with self._lock:
+            self._topics[topic].add(subscriber)
+        subscriber.topics.add(topic)
+
+    def _remove(self, subscriber, topic):
+        with self._lock:
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._topics[topic]
+        subscriber.topics.discard(topic)
+
+    def subscribe(self, topics):
+        """Подписка текущего цикла событий на темы."""
+        loop = asyncio.get_running_loop()
+        if self.relay is not None:
+            self.relay.listen(loop, self._receive)
+        return Subscriber(self, topics, loop, self.queue_size)
+
+    def connections(self):
+        with self._lock:
+            return len(set().union(*self._topics.values()))
+
+    def _deliver(self, topic, event):
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.put, event)
+            except RuntimeError:
+                # Цикл событий уже закрыт.
+                subscriber.close()
+
+    def _receive(self, message):
+        try:
+            topic, event = json.loads(message)
+        except ValueError:
+            logger.warning('Некорректное событие от другого процесса')
+            return
+        self._deliver(topic, event)
+
+    def publish(self, topic, event):
+        self.published += 1
+        self._deliver(topic, event)
+        if self.relay is not None:
+            message = json.dumps([topic, event]).encode()
+            if len(message) <= MAX_DATAGRAM:
+                self.relay.send(message)
+
+    def stats(self):
+        return {
+            'connections': self.connections(),
+            'published': self.published,
+            'dropped': self.dropped,
+        }
+
+
+bus = EventBus(
+    queue_size=settings.SSE_QUEUE_SIZE,
+    relay=(
+        SocketRelay(settings.EVENTS_SOCKET_DIR)
+        if settings.EVENTS_SOCKET_DIR else None
+    ),
+)
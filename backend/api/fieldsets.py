@@ -0,0 +1,126 @@
+from rest_framework import serializers
+
+import api.constants as const
+
+SELECTION_ATTRIBUTE = '_field_selection'
+
+
+def parse_paths(values):
+    """'id,author.username' → {'id': {}, 'author': {'username': {}}}."""
+    tree = {}
+    for value in values:
+        for path in value.split(','):
+            node = tree
+            for name in filter(None, path.strip().split('.')):
+                node = node.setdefault(name, {})
+    return tree
+
+
+class FieldSelection:
+    """
+    Выбор полей ответа из параметров fields, omit и expand.
+    Вложенные поля задаются через точку: fields=id,author.username.
+    Вложенный объект, указанный в fields без подполей, отдается
+    ссылкой (id), если он не перечислен в expand.
+    """
+
+    def __init__(self, include=None, exclude=None, expand=None):
+        self.include = include
+        self.exclude = exclude or {}
+        self.expand = expand or {}
+
+    def allows(self, name):
+        if self.exclude.get(name) == {}:
+            return False
+        return self.include is None or name in self.include
+
+    def is_reference(self, name):
+        return (
+            self.include is not None
+            and self.include.get(name) == {}
+            and name not in self.expand
+        )
+
+    def child(self, name):
+        """Выбор полей вложенного объекта или None, если нужны все."""
+        include = None
+        if self.include is not None and self.include.get(name):
+            include = self.include[name]
+        exclude = self.exclude.get(name) or {}
+        expand = self.expand.get(name) or {}
+        if include is None and not exclude:
+            return None
+        return FieldSelection(include, exclude, expand)
+
+    def key(self):
+        """Строка для ETag: разные выборки полей - разные ответы."""
+        return repr((self.include, self.exclude, self.expand))
+
+
+def get_selection(request):
+    """Выбор полей запроса (кэшируется на запросе) или None."""
+    if not hasattr(request, SELECTION_ATTRIBUTE):
+        params = getattr(request, 'query_params', request.GET)
+        selection = None
+        if any(param in params for param in (
+            const.FIELDS_PARAM, const.OMIT_PARAM, const.EXPAND_PARAM
+        )):
+            selection = FieldSelection(
+                parse_paths(params.getlist(const.FIELDS_PARAM)) or None,
+                parse_paths(params.getlist(const.OMIT_PARAM)),
+                parse_paths(params.getlist(const.EXPAND_PARAM)),
+            )
+        setattr(request, SELECTION_ATTRIBUTE, selection)
+    return getattr(request, SELECTION_ATTRIBUTE)
+
+
+def selection_key(request):
+    selection = get_selection(request)
+    return selection.key() if selection is not None else ''
+
+
+class SparseFieldsMixin:
+    """
+    Отбрасывает поля сериализатора по выбору из запроса. Вложенные
+    сериализаторы получают выбор своих подполей, а поля из
+    reference_fields в режиме ссылки заменяются фабрикой поля с id.
+    """
+
+    reference_fields = {}
+
+    def __init__(self, *args, selection=None, **kwargs):
+        self._selection = selection
+        super().__init__(*args, **kwargs)
+
+    @property
+    def selection(self):
+        if self._selection is not None:
+            return self._selection
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        request = self.context.get('request')
+        if parent is None and request is not None:
+            return get_selection(request)
+        return None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selection = self.selection
+        if selection is None:
+            return fields
+        for name in list(fields):
+            if not selection.allows(name):
+                del fields[name]
+            elif (
+                selection.is_reference(name)
+                and name in self.reference_fields
+            ):
+                fields[name] = self.reference_fields[name]()
+            else:
+                nested = fields[name]
+                if isinstance(nested, serializers.ListSerializer):
+                    nested = nested.child
+                if isinstance(nested, SparseFieldsMixin):
+                    nested._selection = selection.child(name)
+        return fields
@@ -1,6 +1,54 @@
+from django import forms
+from django.conf import settings
+from django.db.models import Count, Exists, F, OuterRef
 from django_filters import rest_framework as filters
 
-from recipes.models import Ingredient, FoodgramUser, Recipe, Tag
+import api.constants as const
+from api.counts import ingredient_frequencies
+from recipes.models import Ingredient, FoodgramUser, Recipe, RecipeIngredient
+from recipes.tags import get_tag_ids, has_tag_bits, tags_mask
+
+
+def tag_choices():
+    return [(slug, slug) for slug in get_tag_ids()]
+
+
+class IdInFilter(filters.BaseInFilter):
+    """
+    Список id через запятую. Дробные, отрицательные и не помещающиеся
+    в BIGINT значения дают 400, пустые элементы (?ingredients=,)
+    становятся None.
+    """
+    field_class = forms.IntegerField
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('min_value', 1)
+        kwargs.setdefault('max_value', const.MAX_ID)
+        super().__init__(*args, **kwargs)
+
+
+class IntegerRangeFilter(filters.RangeFilter):
+    """
+    Диапазон целых чисел (_min и _max) от 0 до INTEGER: дробные
+    и слишком большие значения дают 400, а не ошибку базы.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('fields', tuple(
+            forms.IntegerField(min_value=0, max_value=const.MAX_INTEGER)
+            for _ in range(2)
+        ))
+        super().__init__(*args, **kwargs)
+
+
+def clean_ids(value):
+    return sorted({item for item in value if item is not None})
+
+
+def has_ingredient(ingredient_ids):
+    return Exists(RecipeIngredient.objects.filter(
+        recipe_id=OuterRef('pk'), ingredient_id__in=ingredient_ids
+    ))
 
 
 class RecipesFilterSet(filters.FilterSet):
@@ -17,16 +65,84 @@ class RecipesFilterSet(filters.FilterSet):
         method='filter_is_favorited',
         label='Рецепт в избранных'
     )
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        queryset=Tag.objects.all(),
-        to_field_name='slug',
-        conjoined=False
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_choices,
+        method='filter_tags',
+        label='Метки'
+    )
+    cooking_time = IntegerRangeFilter(
+        label='Время готовки от и до (cooking_time_min, cooking_time_max)'
+    )
+    ingredients = IdInFilter(
+        method='filter_ingredients',
+        label='Содержит все продукты'
+    )
+    exclude_ingredients = IdInFilter(
+        method='filter_exclude_ingredients',
+        label='Не содержит продуктов'
     )
 
     class Meta:
         model = Recipe
-        fields = ['is_favorited', 'is_in_shopping_cart', 'author', 'tags']
+        fields = [
+            'is_favorited', 'is_in_shopping_cart', 'author', 'tags',
+            'cooking_time', 'ingredients', 'exclude_ingredients'
+        ]
+
+    def filter_tags(self, recipes, name, value):
+        """
+        Рецепты хотя бы с одной из меток: условие на Recipe.tags_mask
+        без соединения с таблицей связей и DISTINCT.
+        """
+        tag_ids = get_tag_ids()
+        tag_ids = [tag_ids[slug] for slug in value if slug in tag_ids]
+        if not has_tag_bits(tag_ids):
+            return recipes.filter(tags__in=tag_ids).distinct()
+        return recipes.alias(
+            tags_matched=F('tags_mask').bitand(tags_mask(tag_ids))
+        ).filter(tags_matched__gt=0)
+
+    def filter_ingredients(self, recipes, name, value):
+        """
+        Рецепты со всеми продуктами value. Условия начинаются с самого
+        редкого продукта; если с ним не больше
+        RECIPE_FILTER_MATERIALIZE_LIMIT рецептов, подходящие id
+        выбираются заранее одним запросом по индексу (ingredient, recipe)
+        и список сужается по первичному ключу. Иначе каждый продукт -
+        отдельный EXISTS, и порядок выбирает планировщик.
+        """
+        ingredient_ids = clean_ids(value)
+        if not ingredient_ids:
+            return recipes
+        frequencies = ingredient_frequencies(ingredient_ids)
+        ingredient_ids.sort(key=lambda ingredient_id: frequencies.get(
+            ingredient_id, 0
+        ))
+        rarest = frequencies.get(ingredient_ids[0], 0)
+        if not rarest:
+            return recipes.none()
+        if rarest <= settings.RECIPE_FILTER_MATERIALIZE_LIMIT:
+            return recipes.filter(pk__in=list(
+                RecipeIngredient.objects.filter(
+                    ingredient_id__in=ingredient_ids,
+                    recipe_id__in=RecipeIngredient.objects.filter(
+                        ingredient_id=ingredient_ids[0]
+                    ).values('recipe_id')
+                ).values('recipe_id').annotate(
+                    matched=Count('ingredient_id')
+                ).filter(
+                    matched=len(ingredient_ids)
+                ).values_list('recipe_id', flat=True)
+            ))
+        for ingredient_id in ingredient_ids:
+            recipes = recipes.filter(has_ingredient([ingredient_id]))
+        return recipes
+
+    def filter_exclude_ingredients(self, recipes, name, value):
+        ingredient_ids = clean_ids(value)
+        if not ingredient_ids:
+            return recipes
+        return recipes.filter(~has_ingredient(ingredient_ids))
 
     def filter_is_in_shopping_cart(self, recipes, name, value):
         if value:
@@ -0,0 +1,108 @@
+import threading
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import RequestFactory, override_settings
+from rest_framework.authtoken.models import Token
+
+from foodgram.db import connection_stats
+from recipes.models import FoodgramUser, Recipe
+
+HELP = (
+    'Пропускная способность API с постоянными соединениями с базой '
+    'и без них: запросов в секунду и статистика соединений.'
+)
+NO_DATA = 'Нет данных для замера: выполните seed_synthetic.'
+ROW = '{mode:<28}{rps:>12.1f}{opened:>10}{reused:>10}{broken:>10}'
+HEADER = '{:<28}{:>12}{:>10}{:>10}{:>10}'.format(
+    'CONN_MAX_AGE', 'Запросов/с', 'Открыто', 'Повторно', 'Сломано'
+)
+
+
+class Command(BaseCommand):
+    help = HELP
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300)
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--max-age', type=int, default=60)
+
+    def get_paths(self):
+        recipe_id = Recipe.objects.values_list('id', flat=True).first()
+        return (
+            '/api/recipes/?limit=6',
+            f'/api/recipes/{recipe_id}/',
+            '/api/tags/',
+            '/api/users/me/',
+            '/api/ingredients/?name=%D1%81%D0%BE',
+        )
+
+    def run_client(self, token, paths, count):
+        # Тестовый Client отключает закрытие соединений между запросами,
+        # поэтому запросы идут прямо в WSGI-обработчик, как у gunicorn.
+        handler = WSGIHandler()
+        factory = RequestFactory(HTTP_AUTHORIZATION=f'Token {token}')
+        try:
+            for index in range(count):
+                path, _, query = paths[index % len(paths)].partition('?')
+                response = handler(
+                    factory._base_environ(
+                        PATH_INFO=path, QUERY_STRING=query
+                    ),
+                    lambda status, headers: None
+                )
+                b''.join(response)
+                response.close()
+        finally:
+            connections.close_all()
+
+    def measure(self, max_age, token, paths, options):
+        for alias in connections:
+            connections.settings[alias]['CONN_MAX_AGE'] = max_age
+        connections.close_all()
+        before = connection_stats.snapshot()
+        per_thread = options['requests'] // options['threads']
+        threads = [
+            threading.Thread(
+                target=self.run_client, args=(token, paths, per_thread)
+            )
+            for _ in range(options['threads'])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        after = connection_stats.snapshot()
+        self.stdout.write(ROW.format(
+            mode=str(max_age),
+            rps=per_thread * len(threads) / elapsed,
+            **{
+                field: after[field] - before[field]
+                for field in ('opened', 'reused', 'broken')
+            }
+        ))
+
+    def handle(self, *args, **options):
+        user = FoodgramUser.objects.first()
+        if user is None or not Recipe.objects.exists():
+            raise CommandError(NO_DATA)
+        token = Token.objects.get_or_create(user=user)[0].key
+        paths = self.get_paths()
+        initial = {
+            alias: connections.settings[alias]['CONN_MAX_AGE']
+            for alias in connections
+        }
+        self.stdout.write(HEADER)
+        try:
+            with override_settings(
+                ALLOWED_HOSTS=['testserver'], DEBUG=False
+            ):
+                for max_age in (0, options['max_age']):
+                    self.measure(max_age, token, paths, options)
+        finally:
+            for alias, max_age in initial.items():
+                connections.settings[alias]['CONN_MAX_AGE'] = max_age
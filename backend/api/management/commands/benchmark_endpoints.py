@@ -0,0 +1,262 @@
+import itertools
+import json
+import os
+import time
+import tracemalloc
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client, override_settings
+from rest_framework.authtoken.models import Token
+
+from api.metrics import RequestTiming
+from recipes.models import (
+    FoodgramUser, Ingredient, Recipe, RecipeIngredient, ShoppingCart,
+    Subscription, Tag
+)
+
+HELP = (
+    'Замер основных эндпоинтов на заполненной базе: p50/p95 задержки, '
+    'SQL-запросы и память на запрос, сравнение с сохраненной базовой '
+    'линией.'
+)
+DEFAULT_BASELINE = os.path.join(
+    settings.BASE_DIR, 'benchmarks', 'baseline.json'
+)
+MEMORY_SLACK_KB = 64
+NO_DATA = 'Нет данных для замера: выполните seed_synthetic.'
+REGRESSION = '{name}: {metric} {value} превышает бюджет {budget}'
+REGRESSIONS_FOUND = 'Найдены регрессии:\n{regressions}'
+BASELINE_SAVED = 'Базовая линия сохранена в {path}.'
+ROW = '{name:<60}{p50:>9.2f}{p95:>9.2f}{queries:>9}{memory:>11}'
+HEADER = '{:<60}{:>9}{:>9}{:>9}{:>11}'.format(
+    'Сценарий', 'p50 мс', 'p95 мс', 'Запросы', 'Память КБ'
+)
+
+Scenario = namedtuple(
+    'Scenario', 'name method path reset anonymous', defaults=(None, False)
+)
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = HELP
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Записать результаты как новую базовую линию.'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=1.5,
+            help='Допустимый рост p95 и памяти относительно базовой линии.'
+        )
+        parser.add_argument(
+            '--slack-ms', type=float, default=5.0,
+            help='Допуск p95 в мс сверх --tolerance для быстрых запросов.'
+        )
+
+    def get_scenarios(self):
+        recipe_id = Recipe.objects.values_list('id', flat=True).first()
+        author_id = Subscription.objects.values('author').annotate(
+            followers=Count('id')
+        ).order_by('-followers').values_list('author', flat=True).first()
+        tag_slugs = list(Tag.objects.values_list('slug', flat=True)[:2])
+        ingredient = Ingredient.objects.values_list('name', flat=True).first()
+        filters = {
+            'tags': '&'.join(f'tags={slug}' for slug in tag_slugs),
+            'author': f'author={author_id}',
+            'is_favorited': 'is_favorited=1',
+            'is_in_shopping_cart': 'is_in_shopping_cart=1',
+        }
+        scenarios = []
+        for size in range(len(filters) + 1):
+            for names in itertools.combinations(filters, size):
+                query = '&'.join(filters[name] for name in names)
+                scenarios.append(Scenario(
+                    f'recipes list {"+".join(names) or "all"}',
+                    'get', f'/api/recipes/?limit=6&{query}'
+                ))
+        scenarios.append(Scenario(
+            'recipes list card fields', 'get',
+            '/api/recipes/?limit=6&fields=id,name,image,cooking_time,'
+            'is_favorited,is_in_shopping_cart,author.username'
+        ))
+        scenarios.append(Scenario(
+            'recipes list normalized', 'get',
+            '/api/recipes/?limit=6&normalize=true'
+        ))
+        scenarios.append(Scenario(
+            'recipes list anonymous', 'get', '/api/recipes/?limit=6',
+            anonymous=True
+        ))
+        frequent = RecipeIngredient.objects.values('ingredient').annotate(
+            recipes=Count('id')
+        ).order_by('-recipes').values_list('ingredient', 'recipes')
+        common = frequent.values_list('ingredient', flat=True).first()
+        # Самый частый продукт, рецепты с которым выбираются заранее.
+        rare = frequent.filter(
+            recipes__lte=settings.RECIPE_FILTER_MATERIALIZE_LIMIT
+        ).values_list('ingredient', flat=True).first()
+        for name, query in (
+            ('quick', 'cooking_time_max=30'),
+            ('common ingredient', f'ingredients={common}'),
+            ('rare ingredient', f'ingredients={rare}'),
+            ('without common ingredient', f'exclude_ingredients={common}'),
+            (
+                'quick+common ingredient+without rare ingredient',
+                f'cooking_time_max=30&ingredients={common}'
+                f'&exclude_ingredients={rare}'
+            ),
+            (
+                'quick+rare ingredient+without common ingredient',
+                f'cooking_time_max=30&ingredients={rare}'
+                f'&exclude_ingredients={common}'
+            ),
+        ):
+            scenarios.append(Scenario(
+                f'recipes list {name}', 'get', f'/api/recipes/?limit=6&{query}'
+            ))
+        scenarios.append(Scenario(
+            'recipes tag facets', 'get',
+            f'/api/recipes/facets/?{filters["author"]}'
+        ))
+        for action in ('favorite', 'shopping_cart'):
+            scenarios += [
+                Scenario(
+                    f'recipes {action} add', 'post',
+                    f'/api/recipes/{recipe_id}/{action}/', reset='delete'
+                ),
+                Scenario(
+                    f'recipes {action} remove', 'delete',
+                    f'/api/recipes/{recipe_id}/{action}/', reset='post'
+                ),
+            ]
+        return scenarios + [
+            Scenario(
+                'recipes retrieve', 'get', f'/api/recipes/{recipe_id}/'
+            ),
+            Scenario(
+                'recipes status', 'get',
+                '/api/recipes/status/?ids={}'.format(','.join(
+                    str(recipe_id) for recipe_id in Recipe.objects.values_list(
+                        'id', flat=True
+                    )[:6]
+                ))
+            ),
+            Scenario(
+                'shopping list download', 'get',
+                '/api/recipes/download_shopping_cart/'
+            ),
+            Scenario(
+                'subscriptions', 'get', '/api/users/subscriptions/?limit=6'
+            ),
+            Scenario('users list', 'get', '/api/users/?limit=6'),
+            Scenario('users me', 'get', '/api/users/me/'),
+            Scenario(
+                'ingredients search', 'get',
+                f'/api/ingredients/?name={ingredient[:3]}'
+            ),
+            Scenario('short link redirect', 'get', f'/s/{recipe_id}/'),
+        ]
+
+    def measure(self, client, scenario, repeat):
+        if scenario.anonymous:
+            client = Client()
+
+        def request(path):
+            if scenario.reset:
+                getattr(client, scenario.reset)(path)
+            return getattr(client, scenario.method)(path)
+
+        request(scenario.path)
+        durations = []
+        queries = 0
+        for _ in range(repeat):
+            if scenario.reset:
+                getattr(client, scenario.reset)(scenario.path)
+            timing = RequestTiming()
+            with timing.instrument_databases():
+                started = time.perf_counter()
+                response = getattr(client, scenario.method)(scenario.path)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                durations.append((time.perf_counter() - started) * 1000)
+            queries = max(queries, timing.queries)
+        tracemalloc.start()
+        request(scenario.path)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {
+            'p50': round(percentile(durations, 0.5), 2),
+            'p95': round(percentile(durations, 0.95), 2),
+            'queries': queries,
+            'memory': peak // 1024,
+        }
+
+    def find_regressions(self, results, baseline, tolerance, slack_ms):
+        regressions = []
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            for metric, budget in (
+                ('queries', baseline[name]['queries']),
+                ('p95', round(
+                    baseline[name]['p95'] * tolerance + slack_ms, 2
+                )),
+                ('memory', int(
+                    baseline[name]['memory'] * tolerance + MEMORY_SLACK_KB
+                )),
+            ):
+                if result[metric] > budget:
+                    regressions.append(REGRESSION.format(
+                        name=name, metric=metric,
+                        value=result[metric], budget=budget
+                    ))
+        return regressions
+
+    def handle(self, *args, **options):
+        user = FoodgramUser.objects.filter(
+            id__in=ShoppingCart.objects.values('user')
+        ).first()
+        if user is None:
+            raise CommandError(NO_DATA)
+        client = Client(
+            HTTP_AUTHORIZATION='Token {}'.format(
+                Token.objects.get_or_create(user=user)[0].key
+            )
+        )
+        results = {}
+        self.stdout.write(HEADER)
+        with override_settings(ALLOWED_HOSTS=['testserver'], DEBUG=False):
+            for scenario in self.get_scenarios():
+                result = self.measure(client, scenario, options['repeat'])
+                results[scenario.name] = result
+                self.stdout.write(ROW.format(name=scenario.name, **result))
+        if options['save_baseline']:
+            os.makedirs(os.path.dirname(options['baseline']), exist_ok=True)
+            with open(options['baseline'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                BASELINE_SAVED.format(path=options['baseline'])
+            ))
+            return
+        if not os.path.exists(options['baseline']):
+            return
+        with open(options['baseline'], encoding='utf-8') as f:
+            regressions = self.find_regressions(
+                results, json.load(f),
+                options['tolerance'], options['slack_ms']
+            )
+        if regressions:
+            raise CommandError(REGRESSIONS_FOUND.format(
+                regressions='\n'.join(regressions)
+            ))
@@ -0,0 +1,81 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.readers import RecipeListReader
+from api.serializers import RecipeRetriveSerializer
+from recipes.models import FoodgramUser, Recipe
+
+HELP = (
+    'Сравнение чтения списка рецептов через RecipeRetriveSerializer '
+    'и через values(): проверка совпадения ответов и замер времени.'
+)
+PARITY_FAIL = 'Ответы различаются на странице из {size} рецептов.'
+ROW = '{path:<12}{size:>8}{queries:>10}{ms:>14.2f}'
+HEADER = '{:<12}{:>8}{:>10}{:>14}'.format(
+    'Путь', 'Размер', 'Запросов', 'мс/страница'
+)
+
+
+class Command(BaseCommand):
+    help = HELP
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[6, 50, 200]
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--user', help='email пользователя для флагов рецептов'
+        )
+
+    def _measure(self, read, repeat):
+        with CaptureQueriesContext(connection) as queries:
+            content = JSONRenderer().render(read())
+        started = time.perf_counter()
+        for _ in range(repeat):
+            read()
+        return content, len(queries), (
+            (time.perf_counter() - started) / repeat * 1000
+        )
+
+    def handle(self, *args, **options):
+        # Запросы APIRequestFactory идут на хост testserver.
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            self.compare(options)
+
+    def compare(self, options):
+        request = APIRequestFactory().get('/api/recipes/')
+        request.user = (
+            FoodgramUser.objects.get(email=options['user'])
+            if options['user'] else AnonymousUser()
+        )
+        self.stdout.write(HEADER)
+        for size in options['sizes']:
+            recipe_ids = list(
+                Recipe.objects.values_list('id', flat=True)[:size]
+            )
+            results = {}
+            for path, read in (
+                ('serializer', lambda: RecipeRetriveSerializer(
+                    Recipe.objects.filter(id__in=recipe_ids),
+                    many=True,
+                    context={'request': request}
+                ).data),
+                ('values', lambda: RecipeListReader(request).read(
+                    recipe_ids
+                )),
+            ):
+                content, queries, ms = self._measure(read, options['repeat'])
+                results[path] = content
+                self.stdout.write(ROW.format(
+                    path=path, size=len(recipe_ids), queries=queries, ms=ms
+                ))
+            if results['serializer'] != results['values']:
+                raise CommandError(PARITY_FAIL.format(size=len(recipe_ids)))
@@ -0,0 +1,68 @@
+import time
+from gzip import compress
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import ORJSONRenderer
+from api.serializers import RecipeRetriveSerializer
+from recipes.models import Recipe
+
+HELP = (
+    'Замер размера ответа и процессорного времени на рендеринг '
+    'списка рецептов.'
+)
+ROW = '{name:<28}{size:>12}{cpu:>16.3f}'
+HEADER = '{:<28}{:>12}{:>16}'.format('Вариант', 'Байт', 'мс CPU/запрос')
+
+
+def cpu_per_call(function, repeat):
+    """Среднее процессорное время одного вызова в миллисекундах."""
+    started = time.process_time()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.process_time() - started) / repeat * 1000
+
+
+class Command(BaseCommand):
+    help = HELP
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        request = APIRequestFactory().get('/api/recipes/')
+        request.user = AnonymousUser()
+        data = RecipeRetriveSerializer(
+            Recipe.objects.all()[:options['limit']],
+            many=True,
+            context={'request': request}
+        ).data
+        self.stdout.write(HEADER)
+        for name, renderer in (
+            ('json', JSONRenderer()),
+            ('orjson', ORJSONRenderer()),
+        ):
+            content, cpu = cpu_per_call(
+                lambda: renderer.render(data), options['repeat']
+            )
+            self.stdout.write(ROW.format(
+                name=name, size=len(content), cpu=cpu
+            ))
+            compressed, gzip_cpu = cpu_per_call(
+                lambda: compress(
+                    content,
+                    compresslevel=settings.COMPRESSION_LEVEL,
+                    mtime=0
+                ),
+                options['repeat']
+            )
+            self.stdout.write(ROW.format(
+                name=f'{name} + gzip {settings.COMPRESSION_LEVEL}',
+                size=len(compressed),
+                cpu=cpu + gzip_cpu
+            ))
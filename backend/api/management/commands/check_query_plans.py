@@ -0,0 +1,181 @@
+import re
+from contextlib import ExitStack, contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from rest_framework.authtoken.models import Token
+
+from api.management.commands.benchmark_endpoints import (
+    NO_DATA, Command as BenchmarkCommand
+)
+from recipes.models import FoodgramUser, ShoppingCart
+
+HELP = (
+    'Планы SQL-запросов основных эндпоинтов на заполненной базе: '
+    'EXPLAIN на PostgreSQL, EXPLAIN QUERY PLAN на SQLite. Ошибка, если '
+    'запрос читает большую таблицу целиком вместо индекса.'
+)
+# Полные чтения, допустимые по смыслу запроса: таблица, шаблон SQL.
+ALLOWED_SCANS = (
+    # Маска меток не индексируется: страница списка идет по индексу
+    # pub_date до первых совпадений, а количество кэшируется
+    # (api.counts).
+    (
+        'recipes_recipe',
+        re.compile(r'^SELECT COUNT\(\*\).*"tags_mask" &')
+    ),
+)
+EXPLAINED_STATEMENTS = ('SELECT', 'UPDATE', 'DELETE')
+SQLITE_SCAN = re.compile(
+    r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?( USING (?:COVERING )?INDEX \w+)?$'
+)
+SQLITE_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+}
+SCAN_FOUND = '{name}: {table} ({rows} строк) читается целиком:\n{sql}'
+SCANS_FOUND = 'Найдены полные чтения больших таблиц:\n\n{scans}'
+ROW = '{name:<60}{statements:>10}{scans:>8}'
+HEADER = '{:<60}{:>10}{:>8}'.format('Сценарий', 'Запросы', 'Скан')
+
+
+@contextmanager
+def capture_statements(statements):
+    """Запросы всех подключений с параметрами, как их выполнил Django."""
+    def record(execute, sql, params, many, context):
+        if not many:
+            statements.append((context['connection'].alias, sql, params))
+        return execute(sql, params, many, context)
+
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(record))
+        yield
+
+
+def sqlite_scans(cursor, sql, params):
+    """
+    SCAN без индекса, а также обход всего индекса с последующей
+    сортировкой: прочитать только первые строки по порядку индекса
+    такой запрос не может.
+    """
+    cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+    details = [detail for *_, detail in cursor.fetchall()]
+    for detail in details:
+        match = SQLITE_SCAN.match(detail)
+        if match and (not match.group(2) or SQLITE_SORT in details):
+            yield match.group(1)
+
+
+def postgresql_scans(cursor, sql, params):
+    cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+    plans = [cursor.fetchone()[0][0]['Plan']]
+    while plans:
+        plan = plans.pop()
+        if plan['Node Type'] == 'Seq Scan':
+            yield plan['Relation Name']
+        plans += plan.get('Plans', [])
+
+
+def is_allowed(table, sql):
+    return any(
+        table == allowed and pattern.search(sql)
+        for allowed, pattern in ALLOWED_SCANS
+    )
+
+
+EXPLAINERS = {'sqlite': sqlite_scans, 'postgresql': postgresql_scans}
+
+
+class Command(BaseCommand):
+    help = HELP
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-rows', type=int, default=10000,
+            help='Таблица считается большой начиная с этого числа строк.'
+        )
+        parser.add_argument(
+            '--show-plans', action='store_true',
+            help='Печатать SQL всех запросов с полным чтением таблиц.'
+        )
+
+    def table_rows(self, alias, table):
+        """Число строк таблицы; None для подзапросов и представлений."""
+        key = (alias, table)
+        if key not in self._rows:
+            connection = connections[alias]
+            if table not in connection.introspection.table_names():
+                self._rows[key] = None
+                return None
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT COUNT(*) FROM {}'.format(
+                    connection.ops.quote_name(table)
+                ))
+                self._rows[key] = cursor.fetchone()[0]
+        return self._rows[key]
+
+    def scans(self, alias, sql, params):
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            return set(EXPLAINERS[connection.vendor](cursor, sql, params))
+
+    def capture(self, client, scenario):
+        if scenario.anonymous:
+            client = Client()
+        if scenario.reset:
+            getattr(client, scenario.reset)(scenario.path)
+        statements = []
+        with capture_statements(statements):
+            getattr(client, scenario.method)(scenario.path)
+        return [
+            statement for statement in statements
+            if statement[1].lstrip().upper().startswith(EXPLAINED_STATEMENTS)
+        ]
+
+    def handle(self, *args, **options):
+        user = FoodgramUser.objects.filter(
+            id__in=ShoppingCart.objects.values('user')
+        ).first()
+        if user is None:
+            raise CommandError(NO_DATA)
+        client = Client(
+            HTTP_AUTHORIZATION='Token {}'.format(
+                Token.objects.get_or_create(user=user)[0].key
+            )
+        )
+        self._rows = {}
+        found = []
+        self.stdout.write(HEADER)
+        # Без кэша каждый запрос доходит до базы.
+        with override_settings(
+            ALLOWED_HOSTS=['testserver'], DEBUG=False, CACHES=NO_CACHE
+        ):
+            for scenario in BenchmarkCommand().get_scenarios():
+                statements = self.capture(client, scenario)
+                scans = []
+                for alias, sql, params in statements:
+                    for table in sorted(self.scans(alias, sql, params)):
+                        rows = self.table_rows(alias, table)
+                        if rows is not None and (
+                            rows >= options['min_rows']
+                        ) and not is_allowed(table, sql):
+                            scans.append(SCAN_FOUND.format(
+                                name=scenario.name, table=table, rows=rows,
+                                sql=sql % tuple(
+                                    repr(param) for param in params or ()
+                                )
+                            ))
+                self.stdout.write(ROW.format(
+                    name=scenario.name,
+                    statements=len(statements),
+                    scans=len(scans)
+                ))
+                if options['show_plans']:
+                    for scan in scans:
+                        self.stdout.write(scan)
+                found += scans
+        if found:
+            raise CommandError(SCANS_FOUND.format(scans='\n\n'.join(found)))
@@ -0,0 +1,256 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from api.authentication import token_cache
+from api.counts import count_stats
+from api.events import bus
+from api.response_cache import response_cache_stats
+from foodgram.db import connection_stats
+
+BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+PHASES = ('total', 'db', 'serialize', 'render')
+UNRESOLVED_VIEW = 'unresolved'
+
+
+class Histogram:
+    """Накопительная гистограмма в формате Prometheus."""
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Метрики воркера: гистограммы длительности фаз запроса и счетчики
+    SQL-запросов по представлениям. Каждый воркер gunicorn собирает
+    свои метрики, поэтому в выдаче они помечены pid процесса.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._queries = {}
+
+    def record(self, view, method, timings, queries):
+        with self._lock:
+            for phase, seconds in timings.items():
+                key = (view, method, phase)
+                if key not in self._histograms:
+                    self._histograms[key] = Histogram()
+                self._histograms[key].observe(seconds)
+            key = (view, method)
+            self._queries[key] = self._queries.get(key, 0) + queries
+
+    def render(self):
+        """Выдача метрик в текстовом формате Prometheus."""
+        pid = os.getpid()
+        lines = [
+            '# HELP foodgram_request_phase_seconds '
+            'Длительность фаз обработки запроса.',
+            '# TYPE foodgram_request_phase_seconds histogram',
+        ]
+        with self._lock:
+            for (view, method, phase), histogram in sorted(
+                self._histograms.items()
+            ):
+                labels = (
+                    f'view="{view}",method="{method}",'
+                    f'phase="{phase}",pid="{pid}"'
+                )
+                cumulative = 0
+                for bound, count in zip(
+                    (*BUCKETS, '+Inf'), histogram.counts
+                ):
+                    cumulative += count
+                    lines.append(
+                        'foodgram_request_phase_seconds_bucket'
+                        f'{{{labels},le="{bound}"}} {cumulative}'
+                    )
+                lines.append(
+                    f'foodgram_request_phase_seconds_sum{{{labels}}} '
+                    f'{histogram.sum:.6f}'
+                )
+                lines.append(
+                    f'foodgram_request_phase_seconds_count{{{labels}}} '
+                    f'{histogram.count}'
+                )
+            lines += [
+                '# HELP foodgram_db_queries_total '
+                'SQL-запросы по представлениям.',
+                '# TYPE foodgram_db_queries_total counter',
+            ]
+            for (view, method), count in sorted(self._queries.items()):
+                lines.append(
+                    f'foodgram_db_queries_total{{view="{view}",'
+                    f'method="{method}",pid="{pid}"}} {count}'
+                )
+        stats = token_cache.stats()
+        lines += [
+            '# TYPE foodgram_token_cache_hits_total counter',
+            f'foodgram_token_cache_hits_total{{pid="{pid}"}} '
+            f'{stats["hits"]}',
+            '# TYPE foodgram_token_cache_misses_total counter',
+            f'foodgram_token_cache_misses_total{{pid="{pid}"}} '
+            f'{stats["misses"]}',
+        ]
+        connections_stats = connection_stats.snapshot()
+        lines += [
+            '# HELP foodgram_db_connections_open '
+            'Открытые соединения с базами данных.',
+            '# TYPE foodgram_db_connections_open gauge',
+            f'foodgram_db_connections_open{{pid="{pid}"}} '
+            f'{connections_stats["open"]}',
+        ]
+        for field, description in (
+            ('opened', 'Новые соединения с базами данных.'),
+            ('reused', 'Повторно использованные соединения.'),
+            ('broken', 'Соединения, не прошедшие проверку перед '
+                       'повторным использованием.'),
+            ('closed', 'Закрытые соединения.'),
+        ):
+            lines += [
+                f'# HELP foodgram_db_connections_{field}_total '
+                f'{description}',
+                f'# TYPE foodgram_db_connections_{field}_total counter',
+                f'foodgram_db_connections_{field}_total{{pid="{pid}"}} '
+                f'{connections_stats[field]}',
+            ]
+        for field, count in response_cache_stats.snapshot().items():
+            lines += [
+                f'# HELP foodgram_response_cache_{field}_total '
+                f'Кэш ответов анонимным пользователям: {field}.',
+                f'# TYPE foodgram_response_cache_{field}_total counter',
+                f'foodgram_response_cache_{field}_total{{pid="{pid}"}} '
+                f'{count}',
+            ]
+        for field, count in count_stats.snapshot().items():
+            lines += [
+                f'# HELP foodgram_count_cache_{field}_total '
+                f'Кэш количеств для пагинации и фасетов: {field}.',
+                f'# TYPE foodgram_count_cache_{field}_total counter',
+                f'foodgram_count_cache_{field}_total{{pid="{pid}"}} '
+                f'{count}',
+            ]
+        events_stats = bus.stats()
+        lines += [
+            '# HELP foodgram_sse_connections Открытые SSE-соединения.',
+            '# TYPE foodgram_sse_connections gauge',
+            f'foodgram_sse_connections{{pid="{pid}"}} '
+            f'{events_stats["connections"]}',
+            '# HELP foodgram_events_published_total Опубликованные события.',
+            '# TYPE foodgram_events_published_total counter',
+            f'foodgram_events_published_total{{pid="{pid}"}} '
+            f'{events_stats["published"]}',
+            '# HELP foodgram_events_dropped_total События, замененные '
+            'на resync у медленных клиентов.',
+            '# TYPE foodgram_events_dropped_total counter',
+            f'foodgram_events_dropped_total{{pid="{pid}"}} '
+            f'{events_stats["dropped"]}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+# Активные замеры (вложенные, например замер бенчмарка вокруг замера
+# middleware). Переменная контекста доходит и до потоков, в которых
+# асинхронные представления работают с базой.
+current_timings = ContextVar('current_timings', default=())
+
+
+def execute_with_timing(execute, sql, params, many, context):
+    for timing in current_timings.get():
+        execute = partial(timing, execute)
+    return execute(sql, params, many, context)
+
+
+def install_timing_wrapper(connection, **kwargs):
+    if execute_with_timing not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_with_timing)
+
+
+connection_created.connect(install_timing_wrapper)
+
+
+class RequestTiming:
+    """Замеры одного запроса: число и время SQL-запросов, границы фаз."""
+
+    __slots__ = (
+        'started', 'view_started', 'view_finished', 'queries', 'db',
+        'view_db'
+    )
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.view_finished = None
+        self.queries = 0
+        self.db = 0.0
+        self.view_db = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db += time.perf_counter() - started
+
+    @contextmanager
+    def instrument_databases(self):
+        """Подключает замер к SQL-запросам текущего контекста."""
+        for connection in connections.all():
+            install_timing_wrapper(connection)
+        token = current_timings.set((*current_timings.get(), self))
+        try:
+            yield
+        finally:
+            current_timings.reset(token)
+
+    def view_start(self):
+        self.view_started = time.perf_counter()
+        self.view_db = self.db
+
+    def view_finish(self):
+        if self.view_started is not None and self.view_finished is None:
+            self.view_finished = time.perf_counter()
+            self.view_db = self.db - self.view_db
+
+    def phases(self):
+        finished = time.perf_counter()
+        timings = {'total': finished - self.started, 'db': self.db}
+        if self.view_finished is not None:
+            timings['serialize'] = max(
+                self.view_finished - self.view_started - self.view_db, 0.0
+            )
+            timings['render'] = finished - self.view_finished
+        return timings
+
+
+def server_timing_header(timings, queries):
+    """Значение заголовка Server-Timing в миллисекундах."""
+    return ', '.join(
+        f'{phase};dur={timings[phase] * 1000:.1f}'
+        + (f';desc="{queries} queries"' if phase == 'db' else '')
+        for phase in PHASES if phase in timings
+    )
@@ -0,0 +1,192 @@
+import asyncio
+from gzip import GzipFile, compress
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.regex_helper import _lazy_re_compile
+from django.utils.text import StreamingBuffer
+
+from api import replicas
+from api.metrics import (
+    UNRESOLVED_VIEW, RequestTiming, registry, server_timing_header
+)
+
+re_accepts_gzip = _lazy_re_compile(r'\bgzip\b')
+
+
+def compress_sequence(sequence, level):
+    """Потоковое gzip-сжатие с настраиваемым уровнем."""
+    buffer = StreamingBuffer()
+    with GzipFile(
+        mode='wb', compresslevel=level, fileobj=buffer, mtime=0
+    ) as zfile:
+        yield buffer.read()
+        for item in sequence:
+            zfile.write(item)
+            data = buffer.read()
+            if data:
+                yield data
+    yield buffer.read()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Сжимает gzip ответы API и файл списка покупок.
+    Ответы короче COMPRESSION_MIN_SIZE байт не сжимаются,
+    уровень сжатия задается в COMPRESSION_LEVEL.
+    """
+
+    def _should_compress(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return False
+        content_type = response.get('Content-Type', '').split(';')[0]
+        if content_type not in settings.COMPRESSION_CONTENT_TYPES:
+            return False
+        if response.streaming:
+            length = response.get('Content-Length')
+            if length and int(length) < settings.COMPRESSION_MIN_SIZE:
+                return False
+        elif len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return False
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return bool(re_accepts_gzip.search(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        ))
+
+    def process_response(self, request, response):
+        if not self._should_compress(request, response):
+            return response
+        if response.streaming:
+            response.streaming_content = compress_sequence(
+                response.streaming_content, settings.COMPRESSION_LEVEL
+            )
+            del response.headers['Content-Length']
+        else:
+            compressed_content = compress(
+                response.content,
+                compresslevel=settings.COMPRESSION_LEVEL,
+                mtime=0
+            )
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response.headers['Content-Length'] = str(len(response.content))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'gzip'
+        return response
+
+
+class SyncAndAsyncMiddleware:
+    """
+    Основа middleware, работающего и под WSGI, и под ASGI: при
+    асинхронной цепочке запрос идет через acall без перехода в поток,
+    иначе через call.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Как в MiddlewareMixin: Django должен видеть корутину.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.acall(request)
+        return self.call(request)
+
+
+class PerformanceMetricsMiddleware(SyncAndAsyncMiddleware):
+    """
+    Замеряет для каждого запроса число и время SQL-запросов, время кода
+    представления без БД (в основном сериализация) и время рендеринга.
+    Итог отдается в заголовке Server-Timing и копится в гистограммах
+    для /api/metrics/.
+    """
+
+    def call(self, request):
+        if not settings.PERFORMANCE_METRICS:
+            return self.get_response(request)
+        timing = RequestTiming()
+        request.timing = timing
+        with timing.instrument_databases():
+            response = self.get_response(request)
+        return self.record(request, timing, response)
+
+    async def acall(self, request):
+        if not settings.PERFORMANCE_METRICS:
+            return await self.get_response(request)
+        timing = RequestTiming()
+        request.timing = timing
+        with timing.instrument_databases():
+            response = await self.get_response(request)
+        return self.record(request, timing, response)
+
+    def record(self, request, timing, response):
+        timing.view_finish()
+        timings = timing.phases()
+        response['Server-Timing'] = server_timing_header(
+            timings, timing.queries
+        )
+        match = request.resolver_match
+        registry.record(
+            match.view_name if match else UNRESOLVED_VIEW,
+            request.method,
+            timings,
+            timing.queries
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if hasattr(request, 'timing'):
+            request.timing.view_start()
+
+    def process_template_response(self, request, response):
+        if hasattr(request, 'timing'):
+            request.timing.view_finish()
+        return response
+
+
+class ReplicaRoutingMiddleware(SyncAndAsyncMiddleware):
+    """
+    Разрешает чтение с реплик для безопасных запросов вне
+    REPLICA_EXCLUDED_PATHS. После небезопасного запроса пользователь
+    на REPLICA_PIN_SECONDS закрепляется за основной базой, чтобы сразу
+    видеть свои изменения.
+    """
+
+    def is_safe(self, request):
+        return request.method in ('GET', 'HEAD', 'OPTIONS') and not (
+            request.path.startswith(settings.REPLICA_EXCLUDED_PATHS)
+        )
+
+    def pin(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            replicas.pin_user(user.pk)
+
+    def call(self, request):
+        safe = self.is_safe(request)
+        with replicas.routing(safe):
+            response = self.get_response(request)
+        if not safe:
+            self.pin(request)
+        return response
+
+    async def acall(self, request):
+        safe = self.is_safe(request)
+        with replicas.routing(safe):
+            response = await self.get_response(request)
+        if not safe:
+            self.pin(request)
+        return response
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, DatabaseError):
+            replicas.replica_failed()
@@ -1,7 +1,31 @@
+import functools
+
+from django.conf import settings
 from rest_framework.pagination import PageNumberPagination
 
+import api.constants as const
+from api.counts import CachedCountPaginator, count_key
+
 
 class LimitPageNumberPagination(PageNumberPagination):
-    """Кастомная пагинация с измененным наименованием параметра."""
+    """
+    Кастомная пагинация с измененным наименованием параметра.
+    В списках представлений с count_models общее число записей берется
+    из кэша количеств (api.counts), а не считается на каждой странице.
+    """
     page_size = 6
-    page_size_query_param = 'limit'
+    page_size_query_param = const.LIMIT_PARAM
+
+    def paginate_queryset(self, queryset, request, view=None):
+        count_models = getattr(view, 'count_models', ())
+        if settings.COUNT_CACHE and count_models and (
+            getattr(view, 'action', None) == 'list'
+        ):
+            self.django_paginator_class = functools.partial(
+                CachedCountPaginator,
+                count_key=count_key(
+                    request, getattr(view, 'basename', type(view).__name__)
+                ),
+                count_models=count_models
+            )
+        return super().paginate_queryset(queryset, request, view)
@@ -0,0 +1,261 @@
+from api.fieldsets import FieldSelection, get_selection
+from recipes.models import (
+    FavoriteRecipes, FoodgramUser, Recipe, RecipeIngredient,
+    ShoppingCart, Subscription
+)
+
+RECIPE_FIELDS = ('name', 'image', 'text', 'cooking_time')
+AUTHOR_FIELDS = (
+    'username', 'first_name', 'last_name', 'id', 'email', 'avatar'
+)
+
+
+class RecipeListReader:
+    """
+    Чтение списка рецептов без создания экземпляров моделей и
+    без ModelSerializer. Строки забираются через values() фиксированным
+    числом запросов на страницу и собираются в словари той же формы,
+    что и у RecipeRetriveSerializer. Поля, отброшенные параметрами
+    fields/omit, не читаются из базы вовсе.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.user = request.user
+        self.selection = get_selection(request) or FieldSelection()
+        self.image_storage = Recipe._meta.get_field('image').storage
+        self.avatar_storage = FoodgramUser._meta.get_field('avatar').storage
+
+    def _file_url(self, storage, name):
+        if not name:
+            return None
+        return self.request.build_absolute_uri(storage.url(name))
+
+    def _user_recipe_ids(self, model, recipe_ids):
+        if not self.user.is_authenticated:
+            return set()
+        return set(model.objects.filter(
+            user=self.user, recipe_id__in=recipe_ids
+        ).values_list('recipe_id', flat=True))
+
+    def _authors(self, author_ids, selection):
+        selection = selection or FieldSelection()
+        subscribed = set()
+        if self.user.is_authenticated and selection.allows('is_subscribed'):
+            subscribed = set(Subscription.objects.filter(
+                user=self.user, author_id__in=author_ids
+            ).values_list('author_id', flat=True))
+        authors = {}
+        for row in FoodgramUser.objects.filter(
+            id__in=author_ids
+        ).values(*AUTHOR_FIELDS):
+            author = {
+                'username': row['username'],
+                'first_name': row['first_name'],
+                'last_name': row['last_name'],
+                'id': row['id'],
+                'email': row['email'],
+                'is_subscribed': row['id'] in subscribed,
+                'avatar': self._file_url(self.avatar_storage, row['avatar']),
+            }
+            authors[row['id']] = {
+                name: value for name, value in author.items()
+                if selection.allows(name)
+            }
+        return authors
+
+    def _tags(self, recipe_ids, selection):
+        selection = selection or FieldSelection()
+        tags = {recipe_id: [] for recipe_id in recipe_ids}
+        rows = Recipe.tags.through.objects.filter(
+            recipe_id__in=recipe_ids
+        )
+        for recipe_id, tag_id, name, slug in rows.values_list(
+            'recipe_id', 'tag_id', 'tag__name', 'tag__slug'
+        ).order_by('tag__name'):
+            tags[recipe_id].append({
+                field: value for field, value in (
+                    ('id', tag_id), ('name', name), ('slug', slug)
+                ) if selection.allows(field)
+            })
+        return tags
+
+    def _tag_ids(self, recipe_ids):
+        tags = {recipe_id: [] for recipe_id in recipe_ids}
+        for recipe_id, tag_id in Recipe.tags.through.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'tag_id').order_by('tag__name'):
+            tags[recipe_id].append(tag_id)
+        return tags
+
+    def _included_tags(self, recipe_ids, selection):
+        """id тегов по рецептам и каждый тег по одному разу."""
+        selection = selection or FieldSelection()
+        tag_ids = {recipe_id: [] for recipe_id in recipe_ids}
+        tags = {}
+        rows = Recipe.tags.through.objects.filter(recipe_id__in=recipe_ids)
+        for recipe_id, tag_id, name, slug in rows.values_list(
+            'recipe_id', 'tag_id', 'tag__name', 'tag__slug'
+        ).order_by('tag__name'):
+            tag_ids[recipe_id].append(tag_id)
+            if tag_id not in tags:
+                tags[tag_id] = {'id': tag_id, **{
+                    field: value for field, value in (
+                        ('name', name), ('slug', slug)
+                    ) if selection.allows(field)
+                }}
+        return tag_ids, list(tags.values())
+
+    def _ingredient_amounts(self, recipe_ids, selection):
+        """Продукты как id и количество: остальное есть в каталоге."""
+        selection = selection or FieldSelection()
+        ingredients = {recipe_id: [] for recipe_id in recipe_ids}
+        rows = RecipeIngredient.objects.filter(recipe_id__in=recipe_ids)
+        for recipe_id, ingredient_id, amount in rows.values_list(
+            'recipe_id', 'ingredient_id', 'amount'
+        ).order_by('id'):
+            ingredients[recipe_id].append(
+                {'id': ingredient_id, 'amount': amount}
+                if selection.allows('amount') else {'id': ingredient_id}
+            )
+        return ingredients
+
+    def _ingredients(self, recipe_ids, selection):
+        selection = selection or FieldSelection()
+        ingredients = {recipe_id: [] for recipe_id in recipe_ids}
+        for (
+            recipe_id, ingredient_id, name, measurement_unit, amount
+        ) in RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list(
+            'recipe_id', 'ingredient_id', 'ingredient__name',
+            'ingredient__measurement_unit', 'amount'
+        ).order_by('id'):
+            ingredients[recipe_id].append({
+                field: value for field, value in (
+                    ('id', ingredient_id),
+                    ('name', name),
+                    ('measurement_unit', measurement_unit),
+                    ('amount', amount),
+                ) if selection.allows(field)
+            })
+        return ingredients
+
+    def _ingredient_ids(self, recipe_ids):
+        ingredients = {recipe_id: [] for recipe_id in recipe_ids}
+        for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id').order_by('id'):
+            ingredients[recipe_id].append(ingredient_id)
+        return ingredients
+
+    def read_statuses(self, recipe_ids):
+        """
+        Только пользовательские флаги рецептов: по одному запросу
+        на избранное, корзину и подписки на авторов.
+        """
+        favorited = self._user_recipe_ids(FavoriteRecipes, recipe_ids)
+        in_cart = self._user_recipe_ids(ShoppingCart, recipe_ids)
+        subscribed = set()
+        if self.user.is_authenticated:
+            subscribed = set(Recipe.objects.filter(
+                id__in=recipe_ids, author__authors__user=self.user
+            ).values_list('id', flat=True))
+        return [
+            {
+                'id': recipe_id,
+                'is_favorited': recipe_id in favorited,
+                'is_in_shopping_cart': recipe_id in in_cart,
+                'is_subscribed': recipe_id in subscribed,
+            }
+            for recipe_id in recipe_ids
+        ]
+
+    def _related(self, name, recipe_ids, read, read_ids):
+        """Вложенные объекты, их id в режиме ссылки или None."""
+        if not self.selection.allows(name):
+            return None
+        if self.selection.is_reference(name):
+            return read_ids(recipe_ids)
+        return read(recipe_ids, self.selection.child(name))
+
+    def read(self, recipe_ids, included=None):
+        """
+        Возвращает рецепты в порядке переданных id. Если передан словарь
+        included, ответ нормализуется: рецепты ссылаются на авторов и
+        теги по id, а сами авторы и теги по одному разу попадают
+        в included['users'] и included['tags'].
+        """
+        recipe_ids = list(recipe_ids)
+        selection = self.selection
+        normalized = included is not None
+        rows = {
+            row['id']: row for row in Recipe.objects.filter(
+                id__in=recipe_ids
+            ).values('id', 'author_id', *(
+                name for name in RECIPE_FIELDS if selection.allows(name)
+            ))
+        }
+        authors = None
+        if selection.allows('author') and (
+            normalized or not selection.is_reference('author')
+        ):
+            authors = self._authors(
+                {row['author_id'] for row in rows.values()},
+                selection.child('author')
+            )
+        if normalized:
+            if authors is not None:
+                # Без id объекты из included не связать с рецептами.
+                included['users'] = [
+                    {'id': author_id, **author}
+                    for author_id, author in authors.items()
+                ]
+                authors = None
+            tags = ingredients = None
+            if selection.allows('tags'):
+                tags, included['tags'] = self._included_tags(
+                    recipe_ids, selection.child('tags')
+                )
+            if selection.allows('ingredients'):
+                ingredients = self._ingredient_amounts(
+                    recipe_ids, selection.child('ingredients')
+                )
+        else:
+            tags = self._related(
+                'tags', recipe_ids, self._tags, self._tag_ids
+            )
+            ingredients = self._related(
+                'ingredients', recipe_ids,
+                self._ingredients, self._ingredient_ids
+            )
+        favorited = in_cart = set()
+        if selection.allows('is_favorited'):
+            favorited = self._user_recipe_ids(FavoriteRecipes, recipe_ids)
+        if selection.allows('is_in_shopping_cart'):
+            in_cart = self._user_recipe_ids(ShoppingCart, recipe_ids)
+        recipes = []
+        for recipe_id in recipe_ids:
+            if recipe_id not in rows:
+                continue
+            row = rows[recipe_id]
+            recipe = {
+                'id': recipe_id,
+                'tags': tags and tags[recipe_id],
+                'author': (
+                    authors[row['author_id']] if authors is not None
+                    else row['author_id']
+                ),
+                'ingredients': ingredients and ingredients[recipe_id],
+                'is_favorited': recipe_id in favorited,
+                'is_in_shopping_cart': recipe_id in in_cart,
+                'name': row.get('name'),
+                'image': self._file_url(self.image_storage, row.get('image')),
+                'text': row.get('text'),
+                'cooking_time': row.get('cooking_time'),
+            }
+            recipes.append({
+                name: value for name, value in recipe.items()
+                if selection.allows(name)
+            })
+        return recipes
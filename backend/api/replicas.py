@@ -0,0 +1,178 @@
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PIN_KEY = 'replica:pin:{user_id}'
+HEALTH_CHECK_SQL = 'SELECT 1 FROM django_migrations LIMIT 1'
+POSTGRES_LAG_SQL = (
+    'SELECT COALESCE(EXTRACT(EPOCH FROM '
+    'now() - pg_last_xact_replay_timestamp()), 0)'
+)
+
+
+class RoutingState:
+    """Решение о чтении с реплики в рамках одного запроса."""
+
+    __slots__ = ('use_replica', 'alias')
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.alias = None
+
+
+_state = ContextVar('replica_routing', default=RoutingState(False))
+
+
+def replica_aliases():
+    return [
+        alias for alias in settings.DATABASES
+        if alias.startswith(settings.REPLICA_ALIAS_PREFIX)
+    ]
+
+
+class ReplicaHealth:
+    """
+    Состояние реплик в памяти процесса. Реплика проверяется не чаще
+    раза в REPLICA_HEALTH_INTERVAL секунд: доступность, наличие схемы
+    и, для PostgreSQL, отставание репликации не больше REPLICA_MAX_LAG.
+    """
+
+    def __init__(self):
+        self._checked = {}
+        self._lock = threading.Lock()
+
+    def _check(self, alias):
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(HEALTH_CHECK_SQL)
+                if connection.vendor == 'postgresql':
+                    cursor.execute(POSTGRES_LAG_SQL)
+                    lag, = cursor.fetchone()
+                    if lag > settings.REPLICA_MAX_LAG:
+                        logger.warning(
+                            'Реплика %s отстает на %.1f с', alias, lag
+                        )
+                        return False
+        except DatabaseError as error:
+            logger.warning('Реплика %s недоступна: %s', alias, error)
+            connection.close()
+            return False
+        return True
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        with self._lock:
+            healthy, checked_at = self._checked.get(alias, (True, None))
+            if (
+                checked_at is not None
+                and now - checked_at < settings.REPLICA_HEALTH_INTERVAL
+            ):
+                return healthy
+            # Пока идет проверка, остальные потоки видят прежний результат.
+            self._checked[alias] = (healthy, now)
+        healthy = self._check(alias)
+        with self._lock:
+            self._checked[alias] = (healthy, time.monotonic())
+        return healthy
+
+    def mark_unhealthy(self, alias):
+        with self._lock:
+            self._checked[alias] = (False, time.monotonic())
+
+
+replica_health = ReplicaHealth()
+
+
+def choose_replica():
+    """Реплика для чтения в текущем запросе или None."""
+    state = _state.get()
+    if not state.use_replica:
+        return None
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return None
+    if state.alias is None:
+        healthy = [
+            alias for alias in replica_aliases()
+            if replica_health.is_healthy(alias)
+        ]
+        if not healthy:
+            state.use_replica = False
+            return None
+        # Одна реплика на весь запрос, чтобы его чтения были согласованы.
+        state.alias = random.choice(healthy)
+    return state.alias
+
+
+@contextmanager
+def routing(use_replica):
+    token = _state.set(RoutingState(use_replica and bool(replica_aliases())))
+    try:
+        yield _state.get()
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def primary():
+    """Направляет все чтения внутри блока на основную базу."""
+    with routing(False):
+        yield
+
+
+def pin_user(user_id):
+    """Закрепляет пользователя за основной базой после записи."""
+    if settings.REPLICA_PIN_SECONDS and replica_aliases():
+        cache.set(
+            PIN_KEY.format(user_id=user_id), True,
+            settings.REPLICA_PIN_SECONDS
+        )
+
+
+def user_authenticated(user_id):
+    """
+    Отключает реплики до конца запроса, если пользователь недавно
+    писал в базу и реплика могла еще не получить его изменения.
+    """
+    state = _state.get()
+    if state.use_replica and state.alias is None and cache.get(
+        PIN_KEY.format(user_id=user_id)
+    ):
+        state.use_replica = False
+
+
+def replica_failed():
+    """Помечает реплику текущего запроса недоступной после ошибки."""
+    state = _state.get()
+    if state.alias is not None:
+        replica_health.mark_unhealthy(state.alias)
+        state.use_replica = False
+        state.alias = None
+
+
+class ReplicaRouter:
+    """
+    Запись и миграции идут в основную базу, чтения безопасных запросов,
+    отмеченных ReplicaRoutingMiddleware, - на исправную реплику.
+    """
+
+    def db_for_read(self, model, **hints):
+        return choose_replica() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
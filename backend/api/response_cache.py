@@ -0,0 +1,203 @@
+import functools
+import hashlib
+import threading
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+import api.constants as const
+from recipes.cache import get_generations
+
+RESPONSE_KEY = 'response:{scope}:{digest}'
+LOCK_SUFFIX = ':lock'
+CACHE_HEADER = 'X-Cache'
+CACHEABLE_STATUSES = (200, 404)
+CONDITIONAL_META = ('HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE')
+NOT_MODIFIED_HEADERS = ('ETag', 'Last-Modified', 'Vary')
+WAIT_STEP = 0.05
+
+
+class ResponseCacheStats:
+    """Счетчики кэша ответов в процессе."""
+
+    FIELDS = ('hits', 'stale', 'misses', 'waits')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+
+    def count(self, field):
+        with self._lock:
+            self._counts[field] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+
+response_cache_stats = ResponseCacheStats()
+
+
+def is_cacheable_request(request):
+    """
+    Безопасный запрос анонимного пользователя за JSON: ответ у всех таких
+    запросов одинаковый. Запросы с заголовком Authorization, даже
+    неверным, проходят мимо кэша.
+    """
+    return (
+        request.method in ('GET', 'HEAD')
+        and 'HTTP_AUTHORIZATION' not in request.META
+        and 'text/html' not in request.META.get('HTTP_ACCEPT', '')
+        and const.FORMAT_PARAM not in request.GET
+    )
+
+
+def normalize_query(query, ignored=()):
+    """
+    Параметры запроса без пустых значений, page=1 и параметров ignored,
+    отсортированные вместе со значениями: ?tags=b&tags=a&page=1
+    и ?tags=a&tags=b дают один ключ.
+    """
+    return urlencode(sorted(
+        (name, value)
+        for name, values in query.lists()
+        if name not in ignored
+        for value in values
+        if value and not (name == const.PAGE_PARAM and value == '1')
+    ))
+
+
+def cache_key(request, scope):
+    # Хост входит в ключ: ссылки пагинации в ответе абсолютные.
+    return RESPONSE_KEY.format(scope=scope, digest=hashlib.md5(
+        '{}://{}{}?{}'.format(
+            request.scheme, request.get_host(), request.path,
+            normalize_query(request.GET)
+        ).encode()
+    ).hexdigest())
+
+
+def make_entry(response, generations):
+    return {
+        'generations': generations,
+        'expires': time.time() + settings.RESPONSE_CACHE_TTL,
+        'status': response.status_code,
+        'content': response.content,
+        'headers': list(response.items()),
+    }
+
+
+def response_from_entry(request, entry, state):
+    headers = dict(entry['headers'])
+    etag = headers.get('ETag')
+    last_modified = parse_http_date_safe(headers.get('Last-Modified', ''))
+    response = None
+    if entry['status'] == 200 and (etag or last_modified):
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            for name in NOT_MODIFIED_HEADERS:
+                if name in headers:
+                    response[name] = headers[name]
+    if response is None:
+        response = HttpResponse(entry['content'], status=entry['status'])
+        for name, value in entry['headers']:
+            response[name] = value
+    response[CACHE_HEADER] = state
+    return response
+
+
+def render_and_store(key, generations, render):
+    response = render()
+    # 304 из conditional_response - обычный HttpResponse без render().
+    if hasattr(response, 'render'):
+        response.render()
+    if response.status_code in CACHEABLE_STATUSES and (
+        getattr(response, 'accepted_media_type', None)
+        == const.CACHED_MEDIA_TYPE
+    ):
+        cache.set(
+            key, make_entry(response, generations),
+            settings.RESPONSE_CACHE_TTL + settings.RESPONSE_CACHE_STALE_TTL
+        )
+    response_cache_stats.count('misses')
+    response[CACHE_HEADER] = 'MISS'
+    return response
+
+
+def serve(request, scope, models, render):
+    """
+    Ответ из общего кэша или от render(). Запись действительна, пока
+    не сменилось поколение данных моделей models и не истек
+    RESPONSE_CACHE_TTL. Устаревшую запись перестраивает один воркер,
+    получивший блокировку, остальные тем временем отдают ее же;
+    без записи они ждут ответа этого воркера до RESPONSE_CACHE_WAIT.
+    """
+    key = cache_key(request, scope)
+    lock = key + LOCK_SUFFIX
+    generations = get_generations(*models)
+    entry = cache.get(key)
+    if entry is not None and entry['generations'] == generations and (
+        entry['expires'] > time.time()
+    ):
+        response_cache_stats.count('hits')
+        return response_from_entry(request, entry, 'HIT')
+    if any(name in request.META for name in CONDITIONAL_META):
+        # Ответ на условный запрос может быть 304 - такой не кэшируется,
+        # а по устаревшей записи не проверить, изменились ли данные.
+        response_cache_stats.count('misses')
+        return render()
+    deadline = time.monotonic() + settings.RESPONSE_CACHE_WAIT
+    while True:
+        if cache.add(lock, 1, settings.RESPONSE_CACHE_LOCK_TIMEOUT):
+            try:
+                return render_and_store(key, generations, render)
+            finally:
+                cache.delete(lock)
+        if entry is not None:
+            response_cache_stats.count('stale')
+            return response_from_entry(request, entry, 'STALE')
+        if time.monotonic() > deadline:
+            response_cache_stats.count('misses')
+            return render()
+        response_cache_stats.count('waits')
+        time.sleep(WAIT_STEP)
+        entry = cache.get(key)
+        if entry is not None and entry['generations'] == generations:
+            response_cache_stats.count('hits')
+            return response_from_entry(request, entry, 'HIT')
+
+
+class ResponseCacheMixin:
+    """
+    Кэш полных ответов для анонимных безопасных запросов к действиям
+    response_cache_actions. Записи привязаны к поколениям данных
+    моделей или наборов данных вроде recipes.cache.AUTHOR_DATA из
+    response_cache_models (recipes.cache.bump_generation).
+    """
+
+    response_cache_actions = ('list', 'retrieve')
+    response_cache_models = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        action = getattr(self, 'action_map', {}).get(request.method.lower())
+        if not (
+            settings.RESPONSE_CACHE
+            and action in self.response_cache_actions
+            and is_cacheable_request(request)
+        ):
+            return super().dispatch(request, *args, **kwargs)
+        return serve(
+            request,
+            '{}:{}'.format(
+                getattr(self, 'basename', type(self).__name__), action
+            ),
+            self.response_cache_models,
+            functools.partial(super().dispatch, request, *args, **kwargs)
+        )
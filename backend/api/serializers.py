@@ -1,19 +1,23 @@
 from collections import Counter
 
 from django.core.validators import MinValueValidator
+from django.db import transaction
+from django.urls import reverse
 from djoser.serializers import UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
 import api.constants as const
+from api.fieldsets import SparseFieldsMixin
 from recipes.models import (
     FavoriteRecipes, Ingredient, Recipe, RecipeIngredient,
     ShoppingCart, Tag, FoodgramUser, Subscription
 )
 from recipes.constants import MIN_AMOUNT, MIN_TIME
+from recipes.pantry import mark_recipe_changed
 
 
-class FoodgramUserSerializer(UserSerializer):
+class FoodgramUserSerializer(SparseFieldsMixin, UserSerializer):
     """Сериализатор для чтения пользователя."""
     avatar = Base64ImageField()
     is_subscribed = serializers.SerializerMethodField()
@@ -26,23 +30,59 @@ class FoodgramUserSerializer(UserSerializer):
             'is_subscribed', 'avatar'
         )
 
-    def get_is_subscribed(self, user):
+    def get_is_subscribed(self, author):
+        if hasattr(author, 'is_subscribed_annotated'):
+            return author.is_subscribed_annotated
         user = self.context['request'].user
         return (
             user.is_authenticated and Subscription.objects.filter(
                 user=user,
-                author=user
+                author=author
             ).exists()
         )
 
 
-class RecipesSubscriptionSerializer(serializers.ModelSerializer):
+class RecipesSubscriptionSerializer(
+    SparseFieldsMixin, serializers.ModelSerializer
+):
     """Сериализатор для отображения рецепта в подписках."""
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для массового изменения избранного и корзины."""
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=const.BATCH_MAX_RECIPES
+    )
+
+
+class BatchItemSerializer(serializers.Serializer):
+    """Подзапрос пакетного запроса."""
+    method = serializers.ChoiceField(choices=const.BATCH_METHODS)
+    path = serializers.CharField()
+    body = serializers.JSONField(required=False, default=None)
+
+    def validate_path(self, path):
+        if not path.startswith(const.BATCH_PATH_PREFIX):
+            raise serializers.ValidationError(const.VALID_BATCH_PATH)
+        if path.split('?')[0] == reverse('api:batch'):
+            raise serializers.ValidationError(const.VALID_BATCH_NESTED)
+        return path
+
+
+class BatchSerializer(serializers.Serializer):
+    """Пакет подзапросов к API."""
+    requests = serializers.ListField(
+        child=BatchItemSerializer(),
+        allow_empty=False,
+        max_length=const.BATCH_MAX_REQUESTS
+    )
+
+
 class AvatarSerializer(serializers.ModelSerializer):
     """Сериализатор для аватарки."""
     avatar = Base64ImageField()
@@ -55,10 +95,7 @@ class AvatarSerializer(serializers.ModelSerializer):
 class SubscriptionSerializer(FoodgramUserSerializer):
     """Сериализатор для чтения подписок."""
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(
-        source='recipes.count',
-        read_only=True
-    )
+    recipes_count = serializers.SerializerMethodField()
 
     class Meta(FoodgramUserSerializer.Meta):
         model = FoodgramUser
@@ -68,16 +105,24 @@ class SubscriptionSerializer(FoodgramUserSerializer):
         )
 
     def get_recipes(self, user):
+        selection = self.selection
         return RecipesSubscriptionSerializer(
             Recipe.objects.filter(
                 author=user
             )[:int(self.context.get('request').GET.get(
                 'recipes_limit', 10**10
             ))],
-            many=True).data
+            many=True,
+            selection=selection and selection.child('recipes')
+        ).data
 
+    def get_recipes_count(self, user):
+        if hasattr(user, 'recipes_count'):
+            return user.recipes_count
+        return user.recipes.count()
 
-class TagSerializer(serializers.ModelSerializer):
+
+class TagSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор тегов."""
     class Meta:
         model = Tag
@@ -91,7 +136,9 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class RecipeIngredientRetriveSerializer(serializers.ModelSerializer):
+class RecipeIngredientRetriveSerializer(
+    SparseFieldsMixin, serializers.ModelSerializer
+):
     """Сериализатор для чтения связи рецепта и продукта."""
     id = serializers.ReadOnlyField(
         source='ingredient.id'
@@ -108,8 +155,20 @@ class RecipeIngredientRetriveSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
-class RecipeRetriveSerializer(serializers.ModelSerializer):
+class RecipeRetriveSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для чтения рецептов."""
+    reference_fields = {
+        'author': lambda: serializers.IntegerField(
+            source='author_id', read_only=True
+        ),
+        'tags': lambda: serializers.PrimaryKeyRelatedField(
+            many=True, read_only=True
+        ),
+        'ingredients': lambda: serializers.SlugRelatedField(
+            many=True, read_only=True,
+            slug_field='ingredient_id', source='recipe_ingredients'
+        ),
+    }
     tags = TagSerializer(
         many=True,
         read_only=True,
@@ -131,7 +190,9 @@ class RecipeRetriveSerializer(serializers.ModelSerializer):
             'name', 'image', 'text', 'cooking_time'
         )
 
-    def _get_is_in_user_list(self, recipe, model):
+    def _get_is_in_user_list(self, recipe, model, annotation):
+        if hasattr(recipe, annotation):
+            return getattr(recipe, annotation)
         user = self.context.get('request').user
         return (
             user.is_authenticated
@@ -143,16 +204,26 @@ class RecipeRetriveSerializer(serializers.ModelSerializer):
     def get_is_favorited(self, recipe):
         return self._get_is_in_user_list(
             recipe=recipe,
-            model=FavoriteRecipes
+            model=FavoriteRecipes,
+            annotation='is_favorited_annotated'
         )
 
     def get_is_in_shopping_cart(self, recipe):
         return self._get_is_in_user_list(
             recipe=recipe,
-            model=ShoppingCart
+            model=ShoppingCart,
+            annotation='is_in_shopping_cart_annotated'
         )
 
 
+class PantryRecipeSerializer(RecipeRetriveSerializer):
+    """Сериализатор рецепта с числом недостающих продуктов."""
+    missing_count = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeRetriveSerializer.Meta):
+        fields = (*RecipeRetriveSerializer.Meta.fields, 'missing_count')
+
+
 class RecipeIngredientWriteSerializer(serializers.ModelSerializer):
     """Сериализатор для создания и обновления связи рецепта и продукта."""
     id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
@@ -219,7 +290,11 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         return attrs
 
     def _create_ingredients(self, recipe, ingredients_data):
-        recipe.recipe_ingredients.all().delete()
+        # Без сигналов: обработчики RecipeIngredient обновляли бы рецепт
+        # и журнал кладовой на каждую удаленную строку, а рецепт и так
+        # сохраняется, и его изменение отмечается ниже один раз.
+        old = RecipeIngredient.objects.filter(recipe=recipe)
+        old._raw_delete(old.db)
         RecipeIngredient.objects.bulk_create(
             RecipeIngredient(
                 recipe=recipe,
@@ -228,6 +303,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             )
             for ingredient in ingredients_data
         )
+        transaction.on_commit(lambda: mark_recipe_changed(recipe.id))
 
     def create(self, validated_data):
         tags_data = validated_data.pop('tags', [])
@@ -0,0 +1,162 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_out
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import invalidate_user_tokens
+from api.conditional import bump_user_state
+from api.events import author_topic, bus, user_topic
+from recipes.cache import AUTHOR_DATA, bump_generation
+from recipes.models import (
+    FavoriteRecipes, Ingredient, Recipe, RecipeIngredient, ShoppingCart,
+    Subscription, Tag, recipes_deleted, user_recipes_changed
+)
+
+EVENT_TYPES = {
+    FavoriteRecipes: 'favorite',
+    ShoppingCart: 'shopping_cart',
+}
+
+
+def publish_on_commit(topic, event):
+    """Событие уходит клиентам только после фиксации транзакции."""
+    transaction.on_commit(lambda: bus.publish(topic, event))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Сбрасывает кэш токенов после выхода пользователя."""
+    invalidate_user_tokens(instance.user_id)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_changed(sender, instance, signal, update_fields=None, **kwargs):
+    """
+    Сбрасывает кэш токенов при смене пароля, is_active и других полей.
+    Поколение данных авторов, от которого зависит кэш рецептов, меняется
+    только при удалении пользователя или изменении полей, которые
+    выводятся в рецептах: регистрация, смена пароля и вход его не трогают.
+    """
+    invalidate_user_tokens(instance.pk)
+    if update_fields != frozenset({'last_login'}):
+        bump_generation_on_commit(sender)
+    if signal is post_delete or instance._author_data_changed:
+        bump_generation_on_commit(AUTHOR_DATA)
+
+
+@receiver(user_logged_out)
+def user_logged_out_handler(sender, user, **kwargs):
+    if user is not None:
+        invalidate_user_tokens(user.pk)
+
+
+@receiver(post_save, sender=FavoriteRecipes)
+@receiver(post_delete, sender=FavoriteRecipes)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def user_state_changed(sender, instance, **kwargs):
+    """Меняет ETag рецептов пользователя при изменении его флагов."""
+    bump_user_state(instance.user_id)
+
+
+def bump_generation_on_commit(model):
+    """
+    Поколение модели или набора данных (recipes.cache.generation_key)
+    меняется после фиксации транзакции: иначе параллельный
+    запрос мог бы сохранить в кэше старые данные с новым поколением.
+    """
+    transaction.on_commit(lambda: bump_generation(model))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def generation_changed(sender, **kwargs):
+    bump_generation_on_commit(sender)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_relations_changed(sender, action=None, **kwargs):
+    if action is None or action.startswith('post_'):
+        bump_generation_on_commit(Recipe)
+
+
+@receiver(user_recipes_changed)
+def user_recipes_changed_handler(sender, user_id, **kwargs):
+    bump_user_state(user_id)
+
+
+@receiver(user_recipes_changed)
+def user_recipes_event(sender, user_id, recipe_ids, added, **kwargs):
+    publish_on_commit(user_topic(user_id), {
+        'type': EVENT_TYPES[sender], 'recipes': recipe_ids, 'added': added
+    })
+
+
+@receiver(post_save, sender=FavoriteRecipes)
+@receiver(post_delete, sender=FavoriteRecipes)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def user_recipe_event(sender, instance, signal, **kwargs):
+    """Изменения через ORM и админку: по одному рецепту."""
+    if kwargs.get('created') is False:
+        return
+    publish_on_commit(user_topic(instance.user_id), {
+        'type': EVENT_TYPES[sender],
+        'recipes': [instance.recipe_id],
+        'added': signal is post_save,
+    })
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def subscription_event(sender, instance, signal, **kwargs):
+    if kwargs.get('created') is False:
+        return
+    publish_on_commit(user_topic(instance.user_id), {
+        'type': 'subscription',
+        'author': instance.author_id,
+        'added': signal is post_save,
+    })
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_event(sender, instance, signal, **kwargs):
+    """Рецепт автора: его подписчикам (лента) и ему самому."""
+    if instance.is_deleted:
+        # Об удалении уже сообщил recipes_deleted_event.
+        return
+    if signal is post_delete:
+        action = 'deleted'
+    else:
+        action = 'created' if kwargs['created'] else 'updated'
+    publish_recipe_event(instance.pk, instance.author_id, action)
+
+
+@receiver(recipes_deleted)
+def recipes_deleted_event(sender, author_id, recipe_ids, **kwargs):
+    """Рецепты пропадают из выдачи, когда их помечают удаленными."""
+    for recipe_id in recipe_ids:
+        publish_recipe_event(recipe_id, author_id, 'deleted')
+
+
+def publish_recipe_event(recipe_id, author_id, action):
+    event = {
+        'type': 'recipe',
+        'id': recipe_id,
+        'author': author_id,
+        'action': action,
+    }
+    publish_on_commit(author_topic(author_id), event)
+    publish_on_commit(user_topic(author_id), event)
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import secrets
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import AuthenticationFailed
+
+import api.constants as const
+from api.authentication import CachedTokenAuthentication
+from api.events import author_topic, bus, user_topic
+from foodgram.db.pool import database_sync_to_async
+from recipes.models import FoodgramUser, Subscription
+
+TICKET_KEY = 'sse:ticket:{ticket}'
+
+HEADERS = [
+    (b'content-type', b'text/event-stream; charset=utf-8'),
+    (b'cache-control', b'no-cache'),
+    # nginx не должен буферизовать поток событий.
+    (b'x-accel-buffering', b'no'),
+]
+
+
+def issue_ticket(user_id):
+    """
+    Одноразовый билет на поток событий, действует SSE_TICKET_TTL секунд.
+    EventSource не умеет передавать заголовки, а токен в адресе остался
+    бы в журналах сервера и прокси.
+    """
+    ticket = secrets.token_urlsafe(32)
+    cache.set(
+        TICKET_KEY.format(ticket=ticket), user_id, settings.SSE_TICKET_TTL
+    )
+    return ticket
+
+
+def redeem_ticket(ticket):
+    """id пользователя по билету или None; второй раз билет не принимается."""
+    key = TICKET_KEY.format(ticket=ticket)
+    user_id = cache.get(key)
+    if user_id is None or not cache.delete(key):
+        return None
+    return user_id
+
+
+def get_credentials(scope):
+    """Токен из заголовка Authorization и билет из параметра ticket."""
+    token = None
+    for name, value in scope['headers']:
+        if name == b'authorization':
+            keyword, _, key = value.decode('latin-1').partition(' ')
+            if keyword == 'Token' and key:
+                token = key
+    tickets = parse_qs(scope['query_string'].decode('latin-1')).get(
+        const.SSE_TICKET_PARAM
+    )
+    return token, tickets[0] if tickets else None
+
+
+@database_sync_to_async
+def get_user_topics(token, ticket):
+    """Темы событий пользователя с токеном или билетом, иначе None."""
+    if token is not None:
+        try:
+            user, _ = CachedTokenAuthentication().authenticate_credentials(
+                token
+            )
+        except AuthenticationFailed:
+            return None
+        user_id = user.pk
+    else:
+        user_id = redeem_ticket(ticket)
+        if user_id is None or not FoodgramUser.objects.filter(
+            pk=user_id, is_active=True
+        ).exists():
+            return None
+    return [user_topic(user_id)] + [
+        author_topic(author_id)
+        for author_id in Subscription.objects.filter(
+            user_id=user_id
+        ).values_list('author_id', flat=True)
+    ]
+
+
+def format_event(event):
+    return 'event: {}\ndata: {}\n\n'.format(
+        event['type'], json.dumps(event, ensure_ascii=False)
+    ).encode()
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def unauthorized(send):
+    await send({
+        'type': 'http.response.start',
+        'status': 401,
+        'headers': [(b'content-type', b'application/json')],
+    })
+    await send({
+        'type': 'http.response.body',
+        'body': json.dumps(
+            {'detail': const.SSE_UNAUTHORIZED}, ensure_ascii=False
+        ).encode(),
+    })
+
+
+async def events_application(scope, receive, send):
+    """
+    ASGI-приложение потока событий /api/events/ (Server-Sent Events).
+    Соединение - одна корутина с очередью: тысячи простаивающих клиентов
+    не занимают ни потоков, ни соединений с базой. События: favorite,
+    shopping_cart (recipes, added), subscription (author, added),
+    recipe (id, author, action) по рецептам автора и подпискам,
+    resync - клиент пропустил события и должен перечитать списки.
+    """
+    token, ticket = get_credentials(scope)
+    topics = (
+        await get_user_topics(token, ticket) if token or ticket else None
+    )
+    if topics is None:
+        await unauthorized(send)
+        return
+    subscriber = bus.subscribe(topics)
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        await send({
+            'type': 'http.response.start', 'status': 200, 'headers': HEADERS
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': f'retry: {settings.SSE_RETRY_MS}\n\n'.encode(),
+            'more_body': True,
+        })
+        while not disconnect.done():
+            get = asyncio.ensure_future(subscriber.queue.get())
+            await asyncio.wait(
+                {get, disconnect},
+                timeout=settings.SSE_HEARTBEAT_SECONDS,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if get.done():
+                body = format_event(get.result())
+            else:
+                get.cancel()
+                # Комментарий держит соединение через прокси и NAT.
+                body = b': ping\n\n'
+            if not disconnect.done():
+                await send({
+                    'type': 'http.response.body',
+                    'body': body,
+                    'more_body': True,
+                })
+    finally:
+        subscriber.close()
+        disconnect.cancel()
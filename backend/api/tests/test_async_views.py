@@ -0,0 +1,55 @@
+import json
+
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory, TransactionTestCase
+
+from api.async_views import catalog_view
+from recipes.models import Ingredient, Tag
+
+
+class CatalogViewTest(TransactionTestCase):
+    """Асинхронные справочники отвечают так же, как представления DRF."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        Tag.objects.create(name='Завтрак', slug='breakfast')
+        Ingredient.objects.bulk_create([
+            Ingredient(name='Соль морская', measurement_unit='г'),
+            Ingredient(name='Сахар', measurement_unit='г'),
+            Ingredient(name='Соль поваренная', measurement_unit='кг'),
+        ])
+        self.ingredient = Ingredient.objects.get(name='Сахар')
+
+    def get(self, catalog, pk=None, query='', method='get'):
+        path = f'/api/{catalog}/' + (f'{pk}/' if pk else '')
+        request = getattr(self.factory, method)(path + query)
+        response = async_to_sync(catalog_view)(request, catalog, pk=pk)
+        # Ответы DRF рендерит обработчик Django, как и в ASGI.
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def assertSameResponse(self, catalog, pk=None, query=''):
+        expected = self.client.get(
+            f'/api/{catalog}/' + (f'{pk}/' if pk else '') + query
+        )
+        response = self.get(catalog, pk, query)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(json.loads(response.content), expected.json())
+
+    def test_filters(self):
+        for query in (
+            '', '?name=соль', '?search=морская', '?search=соль,кг',
+            '?name=соль&search=поваренная'
+        ):
+            with self.subTest(query=query):
+                self.assertSameResponse('ingredients', query=query)
+        self.assertSameResponse('tags')
+
+    def test_detail(self):
+        self.assertSameResponse('ingredients', self.ingredient.pk)
+        self.assertSameResponse('ingredients', 999)
+
+    def test_write_not_allowed(self):
+        response = self.get('tags', method='post')
+        self.assertEqual(response.status_code, 405)
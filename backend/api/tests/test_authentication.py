@@ -0,0 +1,57 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from api.authentication import token_cache
+from recipes.models import FoodgramUser
+
+
+@override_settings(RESPONSE_CACHE=False)
+class TokenCacheInvalidationTest(TestCase):
+    """Закэшированный токен не переживает выход, смену пароля и блокировку."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = FoodgramUser.objects.create_user(
+            username='user', email='user@example.com',
+            first_name='Имя', last_name='Фамилия', password='Pa55-word-old'
+        )
+        response = self.client.post('/api/auth/token/login/', {
+            'email': 'user@example.com', 'password': 'Pa55-word-old'
+        })
+        self.key = response.json()['auth_token']
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {self.key}'}
+        self.addCleanup(token_cache.discard, self.key)
+
+    def me(self):
+        return self.client.get('/api/users/me/', **self.auth)
+
+    def assertCached(self):
+        self.assertEqual(self.me().status_code, 200)
+        hits = token_cache.hits
+        self.assertEqual(self.me().status_code, 200)
+        self.assertEqual(token_cache.hits, hits + 1)
+
+    def test_logout(self):
+        self.assertCached()
+        response = self.client.post('/api/auth/token/logout/', **self.auth)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_password_change(self):
+        self.assertCached()
+        response = self.client.post('/api/users/set_password/', {
+            'current_password': 'Pa55-word-old',
+            'new_password': 'Pa55-word-new',
+        }, **self.auth)
+        self.assertEqual(response.status_code, 204)
+        misses = token_cache.misses
+        self.assertEqual(self.me().status_code, 200)
+        self.assertEqual(token_cache.misses, misses + 1)
+        user, _ = token_cache.get(self.key)
+        self.assertTrue(user.check_password('Pa55-word-new'))
+
+    def test_deactivation(self):
+        self.assertCached()
+        self.user.is_active = False
+        self.user.save(update_fields=('is_active',))
+        self.assertEqual(self.me().status_code, 401)
@@ -0,0 +1,63 @@
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from recipes.models import FoodgramUser, Recipe
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1Pe'
+    'AAAADElEQVR4nGNgYGAAAAAEAAH2FzhVAAAAAElFTkSuQmCC'
+)
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, RESPONSE_CACHE=False)
+class BatchMethodsTest(TestCase):
+    """Методы подзапросов пакетного запроса."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = FoodgramUser.objects.create_user(
+            username='user', email='user@example.com',
+            first_name='Имя', last_name='Фамилия', password='password'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.user, name='Рецепт', text='Текст',
+            image='recipe/image/recipe.png', cooking_time=10
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def batch(self, *requests):
+        response = self.client.post(
+            '/api/batch/', {'requests': list(requests)},
+            content_type='application/json',
+            HTTP_AUTHORIZATION='Token {}'.format(
+                Token.objects.create(user=self.user).key
+            )
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()['responses']
+
+    def test_put_avatar(self):
+        avatar, me = self.batch(
+            {
+                'method': 'PUT', 'path': '/api/users/me/avatar/',
+                'body': {'avatar': IMAGE}
+            },
+            {'method': 'GET', 'path': '/api/users/me/'},
+        )
+        self.assertEqual(avatar['status'], 200)
+        self.assertTrue(me['body']['avatar'])
+
+    def test_put_not_allowed_by_view(self):
+        response, = self.batch({
+            'method': 'PUT', 'path': f'/api/recipes/{self.recipe.pk}/',
+            'body': {}
+        })
+        self.assertEqual(response['status'], 405)
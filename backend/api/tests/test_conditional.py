@@ -0,0 +1,34 @@
+from django.test import TestCase, override_settings
+
+from recipes.models import FoodgramUser, Recipe
+
+
+class RecipeValidatorsTest(TestCase):
+    """Проверка id рецепта перед расчетом ETag."""
+
+    def test_not_a_number(self):
+        for path in ('/api/recipes/abc/', '/api/recipes/999/'):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 404)
+
+
+@override_settings(RESPONSE_CACHE=False, JOBS_EAGER=False)
+class AuthorChangeTest(TestCase):
+    """Изменение автора меняет ETag рецепта без воркеров очереди."""
+
+    def test_author_edit_changes_etag(self):
+        author = FoodgramUser.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Автор', last_name='Рецептов', password='password'
+        )
+        recipe = Recipe.objects.create(
+            author=author, name='Рецепт', text='Текст',
+            image='recipe/image/recipe.png', cooking_time=10
+        )
+        path = f'/api/recipes/{recipe.pk}/'
+        etag = self.client.get(path)['ETag']
+        author.first_name = 'Другое имя'
+        author.save()
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['author']['first_name'], 'Другое имя')
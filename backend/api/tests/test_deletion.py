@@ -0,0 +1,214 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from api.events import bus
+from jobs.models import Job
+from recipes.constants import DELETED_EMAIL, DELETED_USERNAME
+from recipes.deletion import delete_later
+from recipes.models import (
+    Deletion, FavoriteRecipes, FoodgramUser, Ingredient, Recipe,
+    RecipeIngredient, ShoppingCart, Subscription, Tag
+)
+from recipes.tasks import purge_deleted
+
+
+@override_settings(RESPONSE_CACHE=False)
+class DeleteLaterTest(TestCase):
+    """Рецепт, помеченный удаленным, до фонового удаления зависимых."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = FoodgramUser.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Автор', last_name='Рецептов', password='password'
+        )
+        cls.ingredient = Ingredient.objects.create(
+            name='Соль', measurement_unit='г'
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.author, name=f'Рецепт {number}', text='Текст',
+                image='recipe/image/recipe.png', cooking_time=10
+            )
+            for number in range(2)
+        ]
+        for recipe in cls.recipes:
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=cls.ingredient, amount=5
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.auth = {'HTTP_AUTHORIZATION': 'Token {}'.format(
+            Token.objects.create(user=self.author).key
+        )}
+
+    def what_to_cook(self):
+        return self.client.get(
+            f'/api/recipes/what_to_cook/?ingredients={self.ingredient.pk}',
+            **self.auth
+        ).json()
+
+    def test_pantry_and_events(self):
+        self.assertEqual(self.what_to_cook()['count'], 2)
+        deleted = self.recipes[0]
+        with mock.patch.object(bus, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.delete(
+                    f'/api/recipes/{deleted.pk}/', **self.auth
+                )
+        self.assertEqual(response.status_code, 204)
+        actions = {
+            event['action'] for _, event in (
+                call.args for call in publish.call_args_list
+            ) if event.get('type') == 'recipe'
+        }
+        self.assertEqual(actions, {'deleted'})
+        data = self.what_to_cook()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(
+            [recipe['id'] for recipe in data['results']],
+            [self.recipes[1].pk]
+        )
+
+
+class DeletedUserNameTest(TestCase):
+    """Логин и почту удаляемого пользователя нельзя занять заранее."""
+
+    def setUp(self):
+        self.user = FoodgramUser.objects.create_user(
+            username='user', email='user@example.com',
+            first_name='Имя', last_name='Фамилия', password='password'
+        )
+
+    def sign_up(self, username, email):
+        return self.client.post('/api/users/', {
+            'username': username, 'email': email,
+            'first_name': 'Имя', 'last_name': 'Фамилия',
+            'password': 'Pa55-word-long',
+        })
+
+    def test_placeholder_rejected(self):
+        response = self.sign_up(
+            DELETED_USERNAME.format(pk=self.user.pk),
+            DELETED_EMAIL.format(pk=self.user.pk)
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('username', response.json())
+        self.assertIn('email', response.json())
+
+    def test_similar_names_taken(self):
+        response = self.sign_up(
+            f'deleted-{self.user.pk}',
+            f'deleted-{self.user.pk}@deleted.invalid'
+        )
+        self.assertEqual(response.status_code, 201)
+        delete_later(self.user)
+        user = FoodgramUser.all_objects.get(pk=self.user.pk)
+        self.assertTrue(user.is_deleted)
+        self.assertEqual(
+            user.username, DELETED_USERNAME.format(pk=self.user.pk)
+        )
+
+
+@override_settings(JOBS_EAGER=False, DELETION_BATCH_SIZE=1)
+class PurgeTest(TestCase):
+    """Фоновое удаление зависимых записей пакетами."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.reader = (
+            FoodgramUser.objects.create_user(
+                username=name, email=f'{name}@example.com',
+                first_name='Имя', last_name='Фамилия', password='password'
+            )
+            for name in ('author', 'reader')
+        )
+        ingredient = Ingredient.objects.create(
+            name='Соль', measurement_unit='г'
+        )
+        tag = Tag.objects.create(name='Завтрак', slug='breakfast')
+        cls.recipes = []
+        for number in range(2):
+            recipe = Recipe.objects.create(
+                author=cls.author, name=f'Рецепт {number}', text='Текст',
+                image='recipe/image/recipe.png', cooking_time=10
+            )
+            recipe.tags.add(tag)
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=5
+            )
+            FavoriteRecipes.objects.create(user=cls.reader, recipe=recipe)
+            ShoppingCart.objects.create(user=cls.reader, recipe=recipe)
+            cls.recipes.append(recipe)
+        Subscription.objects.create(user=cls.reader, author=cls.author)
+
+    def get_jobs(self, deletion):
+        return Job.objects.filter(
+            name=purge_deleted.name, payload={'deletion_id': deletion.pk}
+        )
+
+    def purge(self, deletion):
+        purge_deleted(deletion_id=deletion.pk)
+        deletion.refresh_from_db()
+        return deletion
+
+    def test_user(self):
+        deletion = delete_later(self.author)
+        self.assertEqual(self.get_jobs(deletion).count(), 1)
+        deletion = self.purge(deletion)
+        self.assertIsNotNone(deletion.finished_at)
+        self.assertEqual(deletion.deleted, deletion.total)
+        self.assertEqual(deletion.total[Recipe._meta.label], 2)
+        self.assertEqual(deletion.total[FavoriteRecipes._meta.label], 2)
+        self.assertFalse(
+            FoodgramUser.all_objects.filter(pk=self.author.pk).exists()
+        )
+        for model in (
+            Recipe.all_objects, RecipeIngredient.objects,
+            Recipe.tags.through.objects, FavoriteRecipes.objects,
+            ShoppingCart.objects, Subscription.objects
+        ):
+            with self.subTest(model=model.model.__name__):
+                self.assertFalse(model.exists())
+        self.assertTrue(
+            FoodgramUser.objects.filter(pk=self.reader.pk).exists()
+        )
+        self.assertEqual(self.get_jobs(deletion).count(), 1)
+
+    def test_recipe(self):
+        deleted, kept = self.recipes
+        deletion = self.purge(delete_later(deleted))
+        self.assertIsNotNone(deletion.finished_at)
+        self.assertEqual(deletion.deleted, deletion.total)
+        self.assertEqual(deletion.total[Recipe._meta.label], 1)
+        self.assertFalse(Recipe.all_objects.filter(pk=deleted.pk).exists())
+        self.assertEqual(
+            list(RecipeIngredient.objects.values_list(
+                'recipe_id', flat=True
+            )),
+            [kept.pk]
+        )
+        self.assertEqual(
+            list(FavoriteRecipes.objects.values_list(
+                'recipe_id', flat=True
+            )),
+            [kept.pk]
+        )
+
+    def test_continuation(self):
+        with override_settings(DELETION_JOB_SECONDS=0):
+            deletion = self.purge(delete_later(self.recipes[0]))
+        self.assertIsNone(deletion.finished_at)
+        self.assertEqual(deletion.deleted, {})
+        self.assertEqual(deletion.total[Recipe._meta.label], 1)
+        self.assertEqual(self.get_jobs(deletion).count(), 2)
+        deletion = self.purge(deletion)
+        self.assertIsNotNone(deletion.finished_at)
+        self.assertEqual(deletion.deleted, deletion.total)
+        self.assertEqual(Deletion.objects.filter(
+            finished_at__isnull=True
+        ).count(), 0)
@@ -0,0 +1,68 @@
+from django.test import TestCase
+
+from recipes.models import FoodgramUser, Ingredient, Recipe, RecipeIngredient
+
+
+class IngredientFilterTest(TestCase):
+    """Разбор списков продуктов в фильтрах рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = FoodgramUser.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Автор', last_name='Рецептов', password='password'
+        )
+        cls.ingredient = Ingredient.objects.create(
+            name='Соль', measurement_unit='г'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=author, name='Рецепт', text='Текст',
+            image='recipe/image/recipe.png', cooking_time=10
+        )
+        RecipeIngredient.objects.create(
+            recipe=cls.recipe, ingredient=cls.ingredient, amount=5
+        )
+
+    def get_count(self, query):
+        response = self.client.get(f'/api/recipes/?{query}')
+        return response.status_code, response.json().get('count')
+
+    def test_invalid_ids(self):
+        for name in ('ingredients', 'exclude_ingredients'):
+            for value in ('1e30', '9223372036854775808', '1.5', '0', 'a'):
+                with self.subTest(name=name, value=value):
+                    self.assertEqual(
+                        self.get_count(f'{name}={value}')[0], 400
+                    )
+
+    def test_empty_items(self):
+        for name in ('ingredients', 'exclude_ingredients'):
+            with self.subTest(name=name):
+                self.assertEqual(self.get_count(f'{name}=,'), (200, 1))
+
+    def test_valid_ids(self):
+        ingredient_id = self.ingredient.pk
+        self.assertEqual(
+            self.get_count(f'ingredients={ingredient_id},'), (200, 1)
+        )
+        self.assertEqual(
+            self.get_count(f'exclude_ingredients={ingredient_id}'),
+            (200, 0)
+        )
+
+    def test_cooking_time_range(self):
+        for path in ('/api/recipes/', '/api/recipes/facets/'):
+            for query in (
+                'cooking_time_max=99999999999999999999',
+                'cooking_time_min=1.5', 'cooking_time_max=-1',
+                'cooking_time_min=a'
+            ):
+                with self.subTest(path=path, query=query):
+                    self.assertEqual(
+                        self.client.get(f'{path}?{query}').status_code, 400
+                    )
+        self.assertEqual(
+            self.get_count('cooking_time_min=10&cooking_time_max=10'),
+            (200, 1)
+        )
+        self.assertEqual(self.get_count('cooking_time_max=9'), (200, 0))
@@ -0,0 +1,64 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from recipes import pantry
+from recipes.cache import bump_version, get_version
+from recipes.models import FoodgramUser, Ingredient, Recipe, RecipeIngredient
+
+
+class PantryJournalTest(TestCase):
+    """Журнал изменений индекса кладовой при гонке за поколение."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = FoodgramUser.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Автор', last_name='Рецептов', password='password'
+        )
+        cls.salt, cls.sugar = (
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('Соль', 'Сахар')
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=author, name=f'Рецепт {number}', text='Текст',
+                image='recipe/image/recipe.png', cooking_time=10
+            )
+            for number in range(2)
+        ]
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=recipe, ingredient=cls.salt, amount=5)
+            for recipe in cls.recipes
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.index = pantry.PantryIndex()
+        self.index.sync()
+
+    def test_generation_collision(self):
+        first, second = self.recipes
+        RecipeIngredient.objects.update(ingredient=self.sugar)
+        # Первый воркер записал изменение, второй прочитал поколение
+        # до его incr и получил то же значение.
+        pantry.mark_recipe_changed(first.pk)
+        stale = iter([get_version(pantry.GENERATION_KEY)])
+
+        def racing_bump(key, delta=1):
+            return next(stale, None) or bump_version(key, delta)
+
+        with mock.patch.object(pantry, 'bump_version', racing_bump):
+            with mock.patch.object(
+                pantry, 'mark_all_recipes_changed',
+                wraps=pantry.mark_all_recipes_changed
+            ) as mark_all:
+                pantry.mark_recipe_changed(second.pk)
+        mark_all.assert_called_once()
+        self.assertEqual(
+            sorted(recipe_id for recipe_id, _ in self.index.match(
+                [self.sugar.pk]
+            )),
+            [first.pk, second.pk]
+        )
@@ -0,0 +1,40 @@
+import io
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from recipes.models import Ingredient, Tag
+
+
+class QueryPlansTest(TestCase):
+    """
+    check_query_plans на небольшой синтетической базе: полное чтение
+    таблицы в основных эндпоинтах - ошибка теста.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for number in range(3):
+            Tag.objects.create(name=f'Метка {number}', slug=f'tag{number}')
+        for number in range(40):
+            Ingredient.objects.create(
+                name=f'Продукт {number}', measurement_unit='г'
+            )
+        call_command(
+            'seed_synthetic', users=40, recipes=200, favorites=5,
+            carts=3, subscriptions=3, stdout=io.StringIO()
+        )
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # На маленьких таблицах PostgreSQL и так выбирает Seq Scan;
+            # без него полное чтение остается только там, где нет
+            # подходящего индекса.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def test_no_full_scans(self):
+        call_command(
+            'check_query_plans', min_rows=100, stdout=io.StringIO()
+        )
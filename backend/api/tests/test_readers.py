@@ -0,0 +1,79 @@
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.readers import RecipeListReader
+from api.serializers import RecipeRetriveSerializer
+from recipes.models import (
+    FavoriteRecipes, FoodgramUser, Ingredient, Recipe, RecipeIngredient,
+    ShoppingCart, Subscription, Tag
+)
+
+
+class RecipeListReaderParityTest(TestCase):
+    """RecipeListReader отдает то же, что и RecipeRetriveSerializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = FoodgramUser.objects.create_user(
+            username='reader', email='reader@example.com',
+            first_name='Читатель', last_name='Рецептов', password='password'
+        )
+        authors = [
+            FoodgramUser.objects.create_user(
+                username=f'author{number}',
+                email=f'author{number}@example.com',
+                first_name='Автор', last_name=str(number),
+                password='password',
+                avatar='avatar/image/author.png' if number else None
+            )
+            for number in range(2)
+        ]
+        tags = [
+            Tag.objects.create(name=name, slug=slug)
+            for name, slug in (('Завтрак', 'breakfast'), ('Ужин', 'dinner'))
+        ]
+        ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('Соль', 'Мука', 'Сахар')
+        ]
+        for number in range(4):
+            recipe = Recipe.objects.create(
+                author=authors[number % 2], name=f'Рецепт {number}',
+                text='Текст', image='recipe/image/recipe.png',
+                cooking_time=number + 1
+            )
+            recipe.tags.set(tags[:number % 3])
+            for amount, ingredient in enumerate(ingredients[:number], 1):
+                RecipeIngredient.objects.create(
+                    recipe=recipe, ingredient=ingredient, amount=amount
+                )
+            if number % 2:
+                FavoriteRecipes.objects.create(user=cls.reader, recipe=recipe)
+            if number > 1:
+                ShoppingCart.objects.create(user=cls.reader, recipe=recipe)
+        Subscription.objects.create(user=cls.reader, author=authors[1])
+
+    def render_both(self, user, query=''):
+        request = APIRequestFactory().get(f'/api/recipes/{query}')
+        request.user = user
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        renderer = JSONRenderer()
+        return (
+            renderer.render(RecipeRetriveSerializer(
+                Recipe.objects.filter(id__in=recipe_ids), many=True,
+                context={'request': request}
+            ).data),
+            renderer.render(RecipeListReader(request).read(recipe_ids)),
+        )
+
+    def test_parity(self):
+        for user in (AnonymousUser(), self.reader):
+            for query in ('', '?fields=id,name,author', '?omit=text'):
+                with self.subTest(user=user, query=query):
+                    serialized, read = self.render_both(user, query)
+                    self.assertEqual(serialized, read)
+        serialized, _ = self.render_both(self.reader)
+        self.assertIn(b'"is_favorited":true', serialized)
+        self.assertIn(b'"is_subscribed":true', serialized)
@@ -0,0 +1,83 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from recipes import pantry
+from recipes.models import FoodgramUser, Ingredient, Recipe, Tag
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1Pe'
+    'AAAADElEQVR4nGNgYGAAAAAEAAH2FzhVAAAAAElFTkSuQmCC'
+)
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, RESPONSE_CACHE=False)
+class RecipeUpdateTest(TestCase):
+    """Изменение рецепта отмечается один раз, а не на каждый продукт."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = FoodgramUser.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Автор', last_name='Рецептов', password='password'
+        )
+        cls.tag = Tag.objects.create(name='Завтрак', slug='breakfast')
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Продукт {number}', measurement_unit='г'
+            )
+            for number in range(6)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.auth = {'HTTP_AUTHORIZATION': 'Token {}'.format(
+            Token.objects.create(user=self.author).key
+        )}
+
+    def send(self, method, path, ingredients):
+        return getattr(self.client, method)(path, {
+            'ingredients': [
+                {'id': ingredient.pk, 'amount': 5}
+                for ingredient in ingredients
+            ],
+            'tags': [self.tag.pk], 'image': IMAGE, 'name': 'Рецепт',
+            'text': 'Текст', 'cooking_time': 10,
+        }, content_type='application/json', **self.auth)
+
+    def test_update(self):
+        response = self.send('post', '/api/recipes/', self.ingredients)
+        self.assertEqual(response.status_code, 201)
+        recipe = Recipe.objects.get(pk=response.json()['id'])
+        with mock.patch.object(
+            pantry, 'bump_version', wraps=pantry.bump_version
+        ) as bump, CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.send(
+                    'patch', f'/api/recipes/{recipe.pk}/',
+                    self.ingredients[:2]
+                )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(bump.call_count, 1)
+        touches = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE "recipes_recipe"')
+            and '"updated_at"' in query['sql']
+        ]
+        self.assertLessEqual(len(touches), 1)
+        self.assertEqual(
+            sorted(recipe.recipe_ingredients.values_list(
+                'ingredient_id', flat=True
+            )),
+            [ingredient.pk for ingredient in self.ingredients[:2]]
+        )
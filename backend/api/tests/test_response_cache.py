@@ -0,0 +1,107 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.response_cache import CACHE_HEADER
+from recipes.cache import bump_generation
+from recipes.models import FoodgramUser, Recipe
+
+
+@override_settings(RESPONSE_CACHE=True)
+class ResponseCacheRevalidationTest(TestCase):
+    """Условные запросы анонимов к устаревшим записям кэша ответов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = FoodgramUser.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Автор', last_name='Рецептов', password='password'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=author, name='Рецепт', text='Текст',
+            image='recipe/image/recipe.png', cooking_time=10
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, path, make_stale):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        make_stale()
+        return self.client.get(path, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_stale_generation(self):
+        for path in ('/api/recipes/', f'/api/recipes/{self.recipe.pk}/'):
+            with self.subTest(path=path):
+                response = self.revalidate(
+                    path, lambda: bump_generation(Recipe)
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_expired_entry(self):
+        with override_settings(RESPONSE_CACHE_TTL=0):
+            for path in (
+                '/api/recipes/', f'/api/recipes/{self.recipe.pk}/'
+            ):
+                with self.subTest(path=path):
+                    response = self.revalidate(path, lambda: None)
+                    self.assertEqual(response.status_code, 304)
+
+
+@override_settings(RESPONSE_CACHE=True)
+class AuthorDataGenerationTest(TestCase):
+    """Кэш рецептов сбрасывают только изменения данных авторов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = FoodgramUser.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Автор', last_name='Рецептов', password='password'
+        )
+        Recipe.objects.create(
+            author=cls.author, name='Рецепт', text='Текст',
+            image='recipe/image/recipe.png', cooking_time=10
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.author.refresh_from_db()
+
+    def get_cache_status(self, change):
+        self.client.get('/api/recipes/')
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        return self.client.get('/api/recipes/')[CACHE_HEADER]
+
+    def sign_up(self):
+        FoodgramUser.objects.create_user(
+            username='reader', email='reader@example.com',
+            first_name='Читатель', last_name='Рецептов', password='password'
+        )
+
+    def change_password(self):
+        self.author.set_password('new-password')
+        self.author.save()
+
+    def log_in(self):
+        self.author.last_login = timezone.now()
+        self.author.save(update_fields=('last_login',))
+
+    def rename(self):
+        self.author.first_name = 'Повар'
+        self.author.save()
+
+    def change_avatar(self):
+        self.author.avatar = 'avatar/image/avatar.png'
+        self.author.save(update_fields=('avatar',))
+
+    def test_unrelated_changes(self):
+        for change in (self.sign_up, self.change_password, self.log_in):
+            with self.subTest(change=change.__name__):
+                self.assertEqual(self.get_cache_status(change), 'HIT')
+
+    def test_author_data_changes(self):
+        for change in (self.rename, self.change_avatar):
+            with self.subTest(change=change.__name__):
+                self.assertEqual(self.get_cache_status(change), 'MISS')
@@ -0,0 +1,61 @@
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.core.cache import cache
+from django.test import TransactionTestCase
+from rest_framework.authtoken.models import Token
+
+from api.sse import events_application
+from recipes.models import FoodgramUser
+
+
+class EventTicketTest(TransactionTestCase):
+    """Подключение к потоку событий по одноразовому билету."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = FoodgramUser.objects.create_user(
+            username='user', email='user@example.com',
+            first_name='Имя', last_name='Фамилия', password='password'
+        )
+        self.token = Token.objects.create(user=self.user).key
+
+    def get_ticket(self, **headers):
+        return self.client.post('/api/events/ticket/', **headers)
+
+    @async_to_sync
+    async def connect(self, query='', headers=()):
+        communicator = ApplicationCommunicator(events_application, {
+            'type': 'http', 'method': 'GET', 'path': '/api/events/',
+            'query_string': query.encode(), 'headers': list(headers),
+        })
+        await communicator.send_input({'type': 'http.request'})
+        start = await communicator.receive_output(timeout=5)
+        await communicator.send_input({'type': 'http.disconnect'})
+        await communicator.wait(timeout=5)
+        return start['status']
+
+    def test_ticket_requires_token(self):
+        self.assertEqual(self.get_ticket().status_code, 401)
+
+    def test_single_use(self):
+        response = self.get_ticket(HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(response.status_code, 201)
+        query = 'ticket={}'.format(response.json()['ticket'])
+        self.assertEqual(self.connect(query), 200)
+        self.assertEqual(self.connect(query), 401)
+
+    def test_token_not_accepted_in_query(self):
+        self.assertEqual(self.connect(f'token={self.token}'), 401)
+        self.assertEqual(self.connect('ticket=unknown'), 401)
+
+    def test_header_token(self):
+        self.assertEqual(self.connect(headers=[
+            (b'authorization', f'Token {self.token}'.encode())
+        ]), 200)
+
+    def test_inactive_user(self):
+        ticket = self.get_ticket(
+            HTTP_AUTHORIZATION=f'Token {self.token}'
+        ).json()['ticket']
+        FoodgramUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.connect(f'ticket={ticket}'), 401)
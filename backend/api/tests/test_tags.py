@@ -0,0 +1,139 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from recipes.models import FoodgramUser, Recipe, Tag
+from recipes.tags import tag_bit, tags_mask
+
+
+@override_settings(RESPONSE_CACHE=False, COUNT_CACHE=False)
+class TagsMaskTest(TestCase):
+    """Маска меток Recipe.tags_mask совпадает со связями рецепта."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = FoodgramUser.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Автор', last_name='Рецептов', password='password'
+        )
+        cls.breakfast, cls.lunch, cls.dinner = (
+            Tag.objects.create(name=slug, slug=slug)
+            for slug in ('breakfast', 'lunch', 'dinner')
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=author, name=f'Рецепт {number}', text='Текст',
+                image='recipe/image/recipe.png', cooking_time=10
+            )
+            for number in range(2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def assertMasksInSync(self):
+        for recipe in Recipe.objects.all():
+            with self.subTest(recipe=recipe.pk):
+                self.assertEqual(recipe.tags_mask, tags_mask(
+                    recipe.tags.values_list('id', flat=True)
+                ))
+
+    def filtered(self, *slugs):
+        query = '&'.join(f'tags={slug}' for slug in slugs)
+        return sorted(
+            recipe['id'] for recipe in self.client.get(
+                f'/api/recipes/?{query}'
+            ).json()['results']
+        )
+
+    def expected(self, *slugs):
+        return sorted(Recipe.objects.filter(
+            tags__slug__in=slugs
+        ).distinct().values_list('pk', flat=True))
+
+    def test_set(self):
+        first, second = self.recipes
+        first.tags.set([self.breakfast, self.lunch])
+        second.tags.set([self.lunch])
+        self.assertMasksInSync()
+        first.tags.set([self.dinner])
+        first.tags.remove(self.dinner)
+        second.tags.clear()
+        self.assertMasksInSync()
+
+    def test_reverse_side(self):
+        self.lunch.recipes.add(*self.recipes)
+        self.assertMasksInSync()
+        self.lunch.recipes.remove(self.recipes[0])
+        self.assertMasksInSync()
+        self.lunch.recipes.clear()
+        self.assertMasksInSync()
+        self.assertEqual(self.filtered('lunch'), [])
+
+    def admin_save(self, recipe, tags):
+        admin = FoodgramUser.objects.create_superuser(
+            username='admin', email='admin@example.com',
+            first_name='Админ', last_name='Сайта', password='password'
+        )
+        self.client.force_login(admin)
+        url = reverse('admin:recipes_recipe_change', args=(recipe.pk,))
+        response = self.client.get(url)
+        data = {
+            'name': recipe.name, 'author': recipe.author_id,
+            'text': recipe.text, 'cooking_time': recipe.cooking_time,
+        }
+        for inline in response.context['inline_admin_formsets']:
+            formset = inline.formset
+            forms = formset.initial_forms
+            rows = tags if formset.model is Recipe.tags.through else []
+            data.update({
+                f'{formset.prefix}-TOTAL_FORMS': len(forms) + len(rows),
+                f'{formset.prefix}-INITIAL_FORMS': len(forms),
+            })
+            for index, form in enumerate(forms):
+                data[f'{formset.prefix}-{index}-id'] = form.instance.pk
+                data[f'{formset.prefix}-{index}-DELETE'] = 'on'
+            for index, tag in enumerate(rows, len(forms)):
+                data[f'{formset.prefix}-{index}-tag'] = tag.pk
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+
+    def test_admin_inline(self):
+        recipe = self.recipes[0]
+        recipe.tags.set([self.breakfast])
+        self.admin_save(recipe, [self.lunch, self.dinner])
+        self.assertEqual(
+            set(recipe.tags.all()), {self.lunch, self.dinner}
+        )
+        self.assertMasksInSync()
+        self.assertEqual(self.filtered('breakfast'), [])
+
+    def test_tag_delete(self):
+        first, second = self.recipes
+        first.tags.set([self.breakfast, self.dinner])
+        second.tags.set([self.dinner])
+        self.dinner.delete()
+        self.assertMasksInSync()
+        self.assertEqual(self.filtered('breakfast'), [first.pk])
+
+    def test_filter_matches_join(self):
+        first, second = self.recipes
+        first.tags.set([self.breakfast])
+        second.tags.set([self.lunch, self.dinner])
+        for slugs in (
+            ('breakfast',), ('lunch',), ('breakfast', 'dinner')
+        ):
+            with self.subTest(slugs=slugs):
+                self.assertEqual(self.filtered(*slugs), self.expected(*slugs))
+
+    def test_tag_without_bit(self):
+        wide = Tag.objects.create(id=64, name='wide', slug='wide')
+        self.assertEqual(tag_bit(wide.pk), 0)
+        first, second = self.recipes
+        first.tags.set([wide])
+        second.tags.set([self.lunch])
+        self.assertMasksInSync()
+        self.assertEqual(self.filtered('wide'), [first.pk])
+        self.assertEqual(
+            self.filtered('wide', 'lunch'), [first.pk, second.pk]
+        )
@@ -1,9 +1,10 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework import routers
 
 from api.views import (
-    FoodgramUserViewSet, IngredientsViewSet,
-    RecipeViewSet, SubscriptionListView, TagsViewSet
+    BatchView, EventTicketView, FoodgramUserViewSet, IngredientsViewSet,
+    MetricsView, RecipeViewSet, SubscriptionListView, TagsViewSet
 )
 
 app_name = 'api'
@@ -14,7 +15,27 @@ router.register(r'tags', TagsViewSet, basename='tags')
 router.register(r'users', FoodgramUserViewSet, basename='user')
 router.register(r'ingredients', IngredientsViewSet, basename='ingredients')
 
-urlpatterns = [
+urlpatterns = []
+
+if settings.ASGI:
+    # Асинхронные версии маршрутов роутера: объявлены раньше и
+    # перехватывают запросы с числовым id.
+    from api.async_views import catalog_view, recipe_detail
+
+    urlpatterns += [
+        path('recipes/<int:pk>/', recipe_detail),
+        path('tags/', catalog_view, {'catalog': 'tags'}),
+        path('tags/<int:pk>/', catalog_view, {'catalog': 'tags'}),
+        path('ingredients/', catalog_view, {'catalog': 'ingredients'}),
+        path(
+            'ingredients/<int:pk>/', catalog_view, {'catalog': 'ingredients'}
+        ),
+    ]
+
+urlpatterns += [
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('batch/', BatchView.as_view(), name='batch'),
+    path('events/ticket/', EventTicketView.as_view(), name='events-ticket'),
     path(
         'users/subscriptions/',
         SubscriptionListView.as_view(),
@@ -1,40 +1,66 @@
-from django.db.models import Count, Exists, OuterRef, Sum
+from io import BytesIO
+
+from django.conf import settings
+from django.db.models import (
+    BooleanField, Count, Exists, Max, OuterRef, Q, Sum, Value
+)
 from django_filters import rest_framework as django_filters
-from django.http import FileResponse
+from django.http import FileResponse, HttpResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django.utils import timezone
 
 from rest_framework import generics, filters, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import (
+    AllowAny, IsAdminUser, IsAuthenticated
+)
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.exceptions import ValidationError, NotFound
 
 from djoser.views import UserViewSet
 
 import api.constants as const
+from api.batch import run_subrequest
+from api.conditional import (
+    conditional_response, make_etag, recipe_validators,
+    set_conditional_headers
+)
+from api.counts import count_key, tag_facets
+from api.fieldsets import get_selection, selection_key
 from api.filters import (
     RecipesFilterSet, UserFilterSet, IngredientFilter
 )
+from api.metrics import registry
 from api.paginations import LimitPageNumberPagination
 from api.permissions import AuthorOrSafeMethodPermission
+from api.readers import RecipeListReader
+from api.response_cache import ResponseCacheMixin
 from api.serializers import (
-    IngredientSerializer, RecipeWriteSerializer, RecipeRetriveSerializer,
+    BatchSerializer,
+    IngredientSerializer, PantryRecipeSerializer, RecipeIdsSerializer,
+    RecipeWriteSerializer, RecipeRetriveSerializer,
     TagSerializer, RecipesSubscriptionSerializer, FoodgramUserSerializer,
     SubscriptionSerializer
 )
+from api.sse import issue_ticket
 from api.utils import get_shoplist_text
 from recipes.models import (
     FavoriteRecipes, Ingredient, Recipe,
     ShoppingCart, Tag, FoodgramUser, Subscription
 )
+from recipes.cache import AUTHOR_DATA
 from recipes.constants import RECIPE_NOT_FOUND
+from recipes.deletion import delete_later
+from recipes.pantry import pantry_index
 
 
-class FoodgramUserViewSet(UserViewSet):
+class FoodgramUserViewSet(ResponseCacheMixin, UserViewSet):
     """Представление для пользователя."""
     queryset = FoodgramUser.objects.all()
+    response_cache_models = (FoodgramUser,)
+    count_models = (FoodgramUser,)
     serializer_class = FoodgramUserSerializer
     pagination_class = LimitPageNumberPagination
     filterset_class = UserFilterSet
@@ -42,16 +68,20 @@ class FoodgramUserViewSet(UserViewSet):
 
     def get_queryset(self):
         queryset = self.queryset
-        if self.request.user.is_anonymous:
+        selection = get_selection(self.request)
+        if self.request.user.is_anonymous or (
+            selection is not None and not selection.allows('is_subscribed')
+        ):
             return queryset
         subscribe = self.request.user.subscribers.filter(
             author=OuterRef('pk')
         )
-        queryset = queryset.annotate(
-            is_subscribed_annotated=Exists(subscribe),
-            recipes_count=Count('recipes')
+        return queryset.annotate(
+            is_subscribed_annotated=Exists(subscribe)
         ).order_by(*FoodgramUser._meta.ordering)
-        return queryset
+
+    def perform_destroy(self, instance):
+        delete_later(instance)
 
     @action(detail=False, methods=['put', 'delete'], url_path='me/avatar')
     def avatar(self, request):
@@ -111,27 +141,46 @@ class SubscriptionListView(generics.ListAPIView):
     serializer_class = SubscriptionSerializer
 
     def get_queryset(self):
-        return FoodgramUser.objects.filter(
+        queryset = FoodgramUser.objects.filter(
             authors__user=self.request.user
         ).annotate(
-            recipes_count=Count('recipes')
+            is_subscribed_annotated=Value(True, output_field=BooleanField())
         ).order_by(*FoodgramUser._meta.ordering)
+        selection = get_selection(self.request)
+        if selection is None or selection.allows('recipes_count'):
+            queryset = queryset.annotate(recipes_count=Count(
+                'recipes', filter=Q(recipes__is_deleted=False)
+            ))
+        return queryset
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ResponseCacheMixin, viewsets.ModelViewSet):
     """Представление для рецептов."""
     queryset = Recipe.objects.all()
+    response_cache_actions = ('list', 'retrieve', 'facets')
+    response_cache_models = (Recipe, Tag, Ingredient, AUTHOR_DATA)
+    count_models = (Recipe, Tag)
     http_method_names = const.HTTP_METHOD_NAMES
     permission_classes = [AuthorOrSafeMethodPermission]
     filterset_class = RecipesFilterSet
 
     def get_queryset(self):
         queryset = super().get_queryset()
+        selection = get_selection(self.request)
+        if selection is not None and not selection.allows('text'):
+            queryset = queryset.defer('text')
         if self.request.user.is_authenticated:
-            for model_class, annotation_name in [
-                (ShoppingCart, 'is_in_shopping_cart_annotated'),
-                (FavoriteRecipes, 'is_favorited_annotated')
+            for model_class, field_name in [
+                (ShoppingCart, 'is_in_shopping_cart'),
+                (FavoriteRecipes, 'is_favorited')
             ]:
+                # В списке аннотации нужны фильтрам, даже если поле
+                # не попадает в ответ.
+                if self.action != 'list' and selection is not None and (
+                    not selection.allows(field_name)
+                ):
+                    continue
+                annotation_name = f'{field_name}_annotated'
                 is_in_list_exists = Exists(
                     model_class.objects.filter(
                         recipe=OuterRef('pk'),
@@ -143,30 +192,136 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 )
         return queryset
 
+    def _prefetch(self, queryset):
+        """Связанные объекты только для полей, попавших в ответ."""
+        selection = get_selection(self.request)
+        if selection is None or (
+            selection.allows('author')
+            and not selection.is_reference('author')
+        ):
+            queryset = queryset.select_related('author')
+        for name, lookup in (
+            ('tags', 'tags'),
+            ('ingredients', 'recipe_ingredients__ingredient'),
+        ):
+            if selection is None or selection.allows(name):
+                queryset = queryset.prefetch_related(lookup)
+        return queryset
+
+    def _read_page(self, request, page):
+        if settings.RECIPE_LIST_VALUES_READER:
+            return RecipeListReader(request).read(page)
+        recipes = self._prefetch(self.get_queryset()).in_bulk(page)
+        return self.get_serializer(
+            [recipes[recipe_id] for recipe_id in page if recipe_id in recipes],
+            many=True
+        ).data
+
+    def list(self, request, *args, **kwargs):
+        page = list(self.paginate_queryset(
+            self.filter_queryset(self.get_queryset()).values_list(
+                'id', flat=True
+            )
+        ))
+        normalized = request.query_params.get(
+            const.NORMALIZE_PARAM, ''
+        ).lower() in const.TRUE_VALUES
+        etag = make_etag(
+            request,
+            selection_key(request),
+            normalized,
+            self.paginator.page.paginator.count,
+            *page,
+            Recipe.objects.filter(id__in=page).aggregate(
+                Max('updated_at')
+            )['updated_at__max']
+        )
+        response = conditional_response(request, etag)
+        if response is None and normalized:
+            included = {}
+            response = self.get_paginated_response(
+                RecipeListReader(request).read(page, included)
+            )
+            response.data['included'] = included
+        elif response is None:
+            response = self.get_paginated_response(
+                self._read_page(request, page)
+            )
+        return set_conditional_headers(response, etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        etag, last_modified = recipe_validators(request, kwargs['pk'])
+        response = conditional_response(request, etag, last_modified)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        return set_conditional_headers(response, etag, last_modified)
+
     def _favorite_or_shopping_cart_action(
             self, request, model, user, recipe_pk, message
     ):
-        recipe = get_object_or_404(Recipe, pk=recipe_pk)
+        try:
+            recipe_ids = [int(recipe_pk)]
+        except ValueError:
+            raise NotFound(RECIPE_NOT_FOUND.format(id=recipe_pk))
         if request.method == 'DELETE':
-            get_object_or_404(model, user=user, recipe=recipe).delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        _, created = model.objects.get_or_create(user=user, recipe=recipe)
-        if not created:
+            if model.objects.remove_recipes(user.id, recipe_ids):
+                return Response(status=status.HTTP_204_NO_CONTENT)
+            get_object_or_404(Recipe.objects.only('id'), pk=recipe_pk)
+            raise ValidationError(const.RECIPE_NOT_IN_LIST.format(
+                message_text=message
+            ))
+        if not model.objects.add_recipes(user.id, recipe_ids):
+            get_object_or_404(Recipe.objects.only('id'), pk=recipe_pk)
             raise ValidationError(const.RECIPE_ALREADY.format(
                 message_text=message
             ))
         return Response(RecipesSubscriptionSerializer(
-            recipe
+            get_object_or_404(Recipe, pk=recipe_pk)
         ).data, status=status.HTTP_201_CREATED)
 
+    def _batch_action(self, request, model):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = sorted(set(serializer.validated_data['recipes']))
+        if request.method == 'DELETE':
+            changed = model.objects.remove_recipes(request.user.id, recipe_ids)
+        else:
+            changed = model.objects.add_recipes(request.user.id, recipe_ids)
+        return Response({'recipes': sorted(changed)})
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def perform_destroy(self, instance):
+        delete_later(instance)
+
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return RecipeRetriveSerializer
         return RecipeWriteSerializer
 
+    @action(detail=False, methods=['get'], url_path='facets')
+    def facets(self, request):
+        """
+        Число рецептов с каждой меткой при остальных фильтрах запроса:
+        сколько рецептов останется, если добавить метку в фильтр.
+        """
+        params = request.query_params.copy()
+        params.pop(const.TAGS_PARAM, None)
+        filterset = self.filterset_class(
+            params, queryset=self.get_queryset(), request=request
+        )
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        return Response({'tags': tag_facets(
+            filterset.qs,
+            count_key(
+                request, f'{self.basename}:facets',
+                const.COUNT_IGNORED_PARAMS + (const.TAGS_PARAM,)
+            ),
+            self.count_models
+        )})
+
     @action(detail=True, methods=['get'], url_path='get-link')
     def get_short_link(self, request, pk):
         """Возвращает короткую ссылку."""
@@ -204,6 +359,103 @@ class RecipeViewSet(viewsets.ModelViewSet):
             message=const.SHOPCART
         )
 
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='favorite/batch',
+        url_name='favorite-batch',
+        permission_classes=[IsAuthenticated]
+    )
+    def favorite_batch(self, request):
+        """
+        Добавляет (POST) или удаляет (DELETE) рецепты из тела запроса
+        {"recipes": [id, ...]} в Избранном; возвращает id измененных.
+        """
+        return self._batch_action(request, FavoriteRecipes)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='shopping_cart/batch',
+        url_name='shopping-cart-batch',
+        permission_classes=[IsAuthenticated]
+    )
+    def shopping_cart_batch(self, request):
+        """То же для Корзины."""
+        return self._batch_action(request, ShoppingCart)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path='status',
+        permission_classes=[IsAuthenticated]
+    )
+    def user_status(self, request):
+        """
+        Флаги is_favorited, is_in_shopping_cart и is_subscribed (подписка
+        на автора) для рецептов из ?ids=1,2,3 без тел рецептов.
+        """
+        try:
+            recipe_ids = list(dict.fromkeys(
+                int(recipe_id)
+                for value in request.query_params.getlist(
+                    const.STATUS_IDS_PARAM
+                )
+                for recipe_id in value.split(',') if recipe_id
+            ))
+        except ValueError:
+            raise ValidationError(const.VALID_STATUS_IDS)
+        if not 0 < len(recipe_ids) <= const.BATCH_MAX_RECIPES:
+            raise ValidationError(const.VALID_STATUS_IDS)
+        etag = make_etag(request, *recipe_ids)
+        response = conditional_response(request, etag)
+        if response is None:
+            response = Response(
+                RecipeListReader(request).read_statuses(recipe_ids)
+            )
+        return set_conditional_headers(response, etag)
+
+    def _get_pantry_params(self, request):
+        try:
+            ingredient_ids = {
+                int(ingredient_id)
+                for value in request.query_params.getlist(
+                    const.PANTRY_INGREDIENTS_PARAM
+                )
+                for ingredient_id in value.split(',') if ingredient_id
+            }
+        except ValueError:
+            raise ValidationError(const.VALID_PANTRY_IDS)
+        if not ingredient_ids:
+            raise ValidationError(const.VALID_PANTRY_IDS)
+        try:
+            max_missing = int(request.query_params.get(
+                const.PANTRY_MISSING_PARAM, 0
+            ))
+        except ValueError:
+            raise ValidationError(const.VALID_PANTRY_MISSING)
+        if not 0 <= max_missing <= const.PANTRY_MAX_MISSING:
+            raise ValidationError(const.VALID_PANTRY_MISSING)
+        return ingredient_ids, max_missing
+
+    @action(detail=False, methods=['get'], url_path='what_to_cook')
+    def what_to_cook(self, request):
+        """Рецепты, которые можно приготовить из имеющихся продуктов."""
+        matches = self.paginate_queryset(
+            pantry_index.match(*self._get_pantry_params(request))
+        )
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _ in matches]
+        )
+        page = []
+        for recipe_id, missing_count in matches:
+            if recipe_id in recipes:
+                recipes[recipe_id].missing_count = missing_count
+                page.append(recipes[recipe_id])
+        return self.get_paginated_response(PantryRecipeSerializer(
+            page, many=True, context=self.get_serializer_context()
+        ).data)
+
     @action(
         detail=False,
         methods=['get'],
@@ -213,11 +465,13 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def get_shopping_cart(self, request):
         """Реализует получение пользователем файла со списком покупок."""
         return FileResponse(
-            get_shoplist_text(
+            BytesIO(get_shoplist_text(
                 Recipe.objects.filter(
                     shoppingcarts__user=self.request.user
                 ).distinct(),
-                self.request.user.shoppingcarts.prefetch_related(
+                self.request.user.shoppingcarts.filter(
+                    recipe__is_deleted=False
+                ).prefetch_related(
                     'recipe__ingredients'
                 ).values(
                     'recipe__ingredients__name',
@@ -226,7 +480,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 ).annotate(
                     total_amount=Sum('recipe__recipe_ingredients__amount')
                 ).order_by('recipe__ingredients__name').distinct()
-            ),
+            ).encode()),
             as_attachment=True,
             filename=const.FILE_NAME.format(
                 unique_name=timezone.now().strftime('%Y-%m-%d_%H-%M-%S')
@@ -235,17 +489,21 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
 
-class TagsViewSet(viewsets.ReadOnlyModelViewSet):
+class TagsViewSet(ResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
     """Представление для тегов."""
     queryset = Tag.objects.all()
+    response_cache_models = (Tag,)
     serializer_class = TagSerializer
     pagination_class = None
     permission_classes = [AuthorOrSafeMethodPermission]
 
 
-class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientsViewSet(
+    ResponseCacheMixin, viewsets.ReadOnlyModelViewSet
+):
     """Представление для игредиентов."""
     queryset = Ingredient.objects.all()
+    response_cache_models = (Ingredient,)
     serializer_class = IngredientSerializer
     pagination_class = None
     filter_backends = (
@@ -255,3 +513,43 @@ class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_class = IngredientFilter
     search_fields = ('name',)
     permission_classes = [AuthorOrSafeMethodPermission]
+
+
+class BatchView(APIView):
+    """
+    Выполняет до BATCH_MAX_REQUESTS подзапросов к API за один запрос:
+    {"requests": [{"method": "GET", "path": "/api/tags/"}, ...]}.
+    Подзапросы идут по порядку через обычные представления, со своими
+    правами доступа и статусами, но с общей аутентификацией.
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({'responses': [
+            run_subrequest(request, **item)
+            for item in serializer.validated_data['requests']
+        ]})
+
+
+class EventTicketView(APIView):
+    """Одноразовый билет для подключения к /api/events/?ticket=..."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        return Response(
+            {'ticket': issue_ticket(request.user.pk)},
+            status=status.HTTP_201_CREATED
+        )
+
+
+class MetricsView(APIView):
+    """Метрики производительности воркера в формате Prometheus."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(
+            registry.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
@@ -0,0 +1,357 @@
+"""
+Нагрузочный прогон API по запросам из postman-коллекции.
+
+GET-запросы коллекции превращаются во взвешенные сценарии и
+отправляются на запущенный сервер (gunicorn или uvicorn) асинхронным
+HTTP/1.1-клиентом с заданной конкурентностью и частотой запросов.
+В конце печатается пропускная способность, перцентили задержки и доля
+ошибок по каждому маршруту.
+
+Пример:
+    python benchmarks/load_replay.py --base-url http://127.0.0.1:8000 \\
+        --credentials user@example.com:password --concurrency 50 \\
+        --rate 200 --duration 60 --weight "/api/recipes/=5"
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import re
+import time
+from collections import defaultdict
+from urllib.parse import quote, urlsplit
+
+DEFAULT_COLLECTION = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    '..', '..', 'postman_collection', 'foodgram.postman_collection.json'
+)
+SKIPPED_FOLDERS = ('bad_requests',)
+VARIABLE = re.compile(r'{{(\w+)}}')
+ROW = (
+    '{route:<62}{count:>8}{errors:>8}'
+    '{rps:>9.1f}{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}'
+)
+HEADER = '{:<62}{:>8}{:>8}{:>9}{:>9}{:>9}{:>9}'.format(
+    'Маршрут', 'Запросы', 'Ошибки', 'RPS', 'p50 мс', 'p95 мс', 'p99 мс'
+)
+
+
+class HTTPConnection:
+    """Минимальное keep-alive соединение HTTP/1.1 поверх asyncio."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def _read_body(self, headers):
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await self.reader.readline()
+                    return b''.join(chunks)
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+        if 'content-length' in headers:
+            return await self.reader.readexactly(
+                int(headers['content-length'])
+            )
+        body = await self.reader.read()
+        self.close()
+        return body
+
+    async def _send(self, method, path, headers, body):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+        lines = [
+            f'{method} {path} HTTP/1.1',
+            f'Host: {self.host}:{self.port}',
+            f'Content-Length: {len(body)}',
+            *(f'{name}: {value}' for name, value in headers.items()),
+        ]
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+        await self.writer.drain()
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('Соединение закрыто сервером.')
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, value = line.decode('latin-1').split(':', 1)
+            response_headers[name.strip().lower()] = value.strip()
+        response_body = await self._read_body(response_headers)
+        if response_headers.get('connection', '').lower() == 'close':
+            self.close()
+        return int(status_line.split()[1]), response_body
+
+    async def request(self, method, path, headers=None, body=b''):
+        reused = self.writer is not None
+        try:
+            return await self._send(method, path, headers or {}, body)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            self.close()
+            if not reused:
+                raise
+            return await self._send(method, path, headers or {}, body)
+
+
+def iter_requests(items, auth=None, folders=()):
+    """Обходит коллекцию с наследованием авторизации от папок."""
+    for item in items:
+        item_auth = item.get('auth') or item.get('request', {}).get('auth')
+        if 'item' in item:
+            yield from iter_requests(
+                item['item'], item_auth or auth, (*folders, item['name'])
+            )
+        else:
+            yield item['request'], item_auth or auth, folders
+
+
+def load_scenarios(path):
+    with open(path, encoding='utf-8') as f:
+        collection = json.load(f)
+    variables = {
+        variable['key']: variable['value']
+        for variable in collection.get('variable', [])
+    }
+    scenarios = []
+    for request, auth, folders in iter_requests(
+        collection['item'], collection.get('auth')
+    ):
+        if request['method'] != 'GET' or any(
+            skipped in folder
+            for folder in folders for skipped in SKIPPED_FOLDERS
+        ):
+            continue
+        url = request['url']['raw'] if isinstance(
+            request['url'], dict
+        ) else request['url']
+        authorized = bool(auth) and auth.get('type') == 'apikey'
+        scenarios.append({
+            'route': '{} {}'.format(
+                'auth' if authorized else 'anon',
+                url.replace('{{baseUrl}}', '')
+            ),
+            'url': url,
+            'authorized': authorized,
+        })
+    unique = {}
+    for scenario in scenarios:
+        unique.setdefault(scenario['route'], {**scenario, 'weight': 0})
+        unique[scenario['route']]['weight'] += 1
+    return list(unique.values()), variables
+
+
+async def get_json(connection, path, token=None):
+    headers = {'Authorization': f'Token {token}'} if token else {}
+    status, body = await connection.request('GET', path, headers)
+    if status != 200:
+        raise RuntimeError(f'{path}: статус {status}')
+    return json.loads(body)
+
+
+async def login(connection, credentials):
+    email, password = credentials.split(':', 1)
+    status, body = await connection.request(
+        'POST', '/api/auth/token/login/',
+        {'Content-Type': 'application/json'},
+        json.dumps({'email': email, 'password': password}).encode()
+    )
+    if status != 200:
+        raise RuntimeError(f'Не удалось войти как {email}: статус {status}')
+    return json.loads(body)['auth_token']
+
+
+async def resolve_variables(connection, token):
+    """Заполняет переменные, которые коллекция получает из ответов."""
+    me = await get_json(connection, '/api/users/me/', token)
+    tags = await get_json(connection, '/api/tags/')
+    ingredients = await get_json(connection, '/api/ingredients/')
+    recipes = (
+        await get_json(connection, '/api/recipes/?limit=5')
+    )['results']
+    variables = {'userToken': token, 'userId': me['id']}
+    for index, name in enumerate(('first', 'second', 'third')):
+        if index < len(tags):
+            variables[f'{name}TagId'] = tags[index]['id']
+            variables[f'{name}TagSlug'] = tags[index]['slug']
+    for index, name in enumerate(('first', 'second')):
+        if index < len(ingredients):
+            variables[f'{name}IndredientId'] = ingredients[index]['id']
+    if ingredients:
+        variables['ingredientNameFirstLatter'] = quote(
+            ingredients[0]['name'][0]
+        )
+    for index, name in enumerate(
+        ('first', 'second', 'third', 'fourth', 'fifth')
+    ):
+        if index < len(recipes):
+            variables[f'{name}RecipeId'] = recipes[index]['id']
+    return variables
+
+
+def render_path(scenario, variables):
+    """Путь запроса с подставленными переменными или None."""
+    missing = [
+        name for name in VARIABLE.findall(scenario['url'])
+        if name != 'baseUrl' and name not in variables
+    ]
+    if missing:
+        return None
+    return VARIABLE.sub(
+        lambda match: str(variables[match[1]]),
+        scenario['url'].replace('{{baseUrl}}', '')
+    ) or '/'
+
+
+async def run_worker(
+    host, port, scenarios, weights, token, rng, deadline,
+    slots, rate, started, results
+):
+    connection = HTTPConnection(host, port)
+    try:
+        while True:
+            scheduled = time.perf_counter()
+            if rate:
+                scheduled = started + next(slots) / rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            if scheduled >= deadline:
+                return
+            scenario = rng.choices(scenarios, weights)[0]
+            headers = (
+                {'Authorization': f'Token {token}'}
+                if scenario['authorized'] else {}
+            )
+            try:
+                status, _ = await connection.request(
+                    'GET', scenario['path'], headers
+                )
+                error = status >= 400
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                connection.close()
+                error = True
+            # При заданной частоте задержка считается от запланированного
+            # времени старта, чтобы очередь на клиенте тоже попадала
+            # в замер.
+            results[scenario['route']].append(
+                ((time.perf_counter() - scheduled) * 1000, error)
+            )
+    finally:
+        connection.close()
+
+
+def percentile(values, share):
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def report(results, elapsed):
+    print(HEADER)
+    total = []
+    for route, samples in sorted(results.items()) + [('ИТОГО', None)]:
+        samples = total if samples is None else samples
+        if samples is not total:
+            total += samples
+        if not samples:
+            continue
+        latencies = sorted(latency for latency, _ in samples)
+        print(ROW.format(
+            route=route[:61],
+            count=len(samples),
+            errors=sum(error for _, error in samples),
+            rps=len(samples) / elapsed,
+            p50=percentile(latencies, 0.5),
+            p95=percentile(latencies, 0.95),
+            p99=percentile(latencies, 0.99),
+        ))
+
+
+def parse_weights(values):
+    weights = {}
+    for value in values:
+        route, weight = value.rsplit('=', 1)
+        weights[route] = float(weight)
+    return weights
+
+
+async def main(options):
+    url = urlsplit(options.base_url)
+    host, port = url.hostname, url.port or 80
+    scenarios, variables = load_scenarios(options.collection)
+    setup = HTTPConnection(host, port)
+    tokens = [
+        await login(setup, credentials)
+        for credentials in options.credentials
+    ]
+    if tokens:
+        variables.update(await resolve_variables(setup, tokens[0]))
+    setup.close()
+    overrides = parse_weights(options.weight)
+    active = []
+    for scenario in scenarios:
+        if scenario['authorized'] and not tokens:
+            continue
+        scenario['path'] = render_path(scenario, variables)
+        if scenario['path'] is None:
+            print(f'Пропущен {scenario["route"]}: не хватает переменных.')
+            continue
+        for route, weight in overrides.items():
+            if route in scenario['route']:
+                scenario['weight'] = weight
+        active.append(scenario)
+    weights = [scenario['weight'] for scenario in active]
+    results = defaultdict(list)
+    slots = itertools.count()
+    started = time.perf_counter()
+    deadline = started + options.duration
+    await asyncio.gather(*(
+        run_worker(
+            host, port, active, weights,
+            tokens[index % len(tokens)] if tokens else None,
+            random.Random(f'{options.seed}:{index}'),
+            deadline, slots, options.rate, started, results
+        )
+        for index in range(options.concurrency)
+    ))
+    report(results, time.perf_counter() - started)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--collection', default=DEFAULT_COLLECTION)
+    parser.add_argument(
+        '--credentials', action='append', default=[],
+        help='email:password пользователя; можно указать несколько раз.'
+    )
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument(
+        '--rate', type=float, default=0,
+        help='Запросов в секунду на всех клиентов; 0 - без ограничения.'
+    )
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument(
+        '--weight', action='append', default=[],
+        help='Вес маршрутов, содержащих подстроку: "/api/recipes/=5".'
+    )
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,202 @@
+"""
+Пропускная способность WSGI и ASGI при медленных клиентах.
+
+Скрипт по очереди запускает gunicorn с синхронными воркерами
+(foodgram.wsgi) и с воркерами uvicorn (foodgram.asgi, ASGI=True)
+с одинаковым числом процессов. В каждом режиме часть клиентов держит
+соединения, передавая заголовки запроса по строке раз в несколько
+секунд (как клиенты на плохой мобильной сети или long-polling), а
+быстрые клиенты в это время измеряют пропускную способность и
+задержку обычных запросов.
+
+Синхронный воркер занят медленным клиентом целиком, поэтому уже
+несколько таких клиентов останавливают обслуживание; в режиме ASGI
+медленное соединение - это ожидающая корутина. За nginx, который
+буферизует запросы, эффект меньше, но сохраняется для долгих ответов
+вроде потока событий /api/events/.
+
+Запуск из каталога backend с настройками базы в окружении:
+    python benchmarks/slow_clients.py --workers 2 --slow-clients 50 \\
+        --concurrency 10 --duration 15
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from load_replay import HTTPConnection, percentile
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+MODES = {'wsgi': 'False', 'asgi': 'True'}
+ROW = (
+    '{mode:<8}{slow:>10}{count:>10}{errors:>8}'
+    '{rps:>9.1f}{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}'
+)
+HEADER = '{:<8}{:>10}{:>10}{:>8}{:>9}{:>9}{:>9}{:>9}'.format(
+    'Режим', 'Медленных', 'Запросы', 'Ошибки',
+    'RPS', 'p50 мс', 'p95 мс', 'p99 мс'
+)
+
+
+def start_server(mode, options):
+    env = {**os.environ, 'ASGI': MODES[mode]}
+    return subprocess.Popen(
+        [
+            sys.executable, '-m', 'gunicorn',
+            '--config', 'gunicorn.conf.py',
+            '--bind', f'{options.host}:{options.port}',
+            '--workers', str(options.workers),
+            '--log-level', 'error',
+        ],
+        cwd=BACKEND_DIR, env=env
+    )
+
+
+async def wait_ready(options, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        connection = HTTPConnection(options.host, options.port)
+        try:
+            status, _ = await connection.request('GET', options.paths[0])
+            if status == 200:
+                return
+        except OSError:
+            pass
+        finally:
+            connection.close()
+        await asyncio.sleep(0.2)
+    raise RuntimeError('Сервер не запустился.')
+
+
+async def slow_client(options, deadline, connected):
+    """Передает заголовки запроса по одному до конца замера."""
+    try:
+        reader, writer = await asyncio.open_connection(
+            options.host, options.port
+        )
+    except OSError:
+        return
+    connected.append(writer)
+    try:
+        writer.write(
+            f'GET {options.paths[0]} HTTP/1.1\r\n'
+            f'Host: {options.host}\r\n'.encode()
+        )
+        while time.monotonic() < deadline:
+            await asyncio.sleep(options.trickle_interval)
+            writer.write(b'X-Slow: 1\r\n')
+            await writer.drain()
+    except OSError:
+        pass
+    finally:
+        writer.close()
+
+
+async def fast_client(index, options, deadline, results):
+    connection = HTTPConnection(options.host, options.port)
+    shift = index % len(options.paths)
+    paths = itertools.cycle(options.paths[shift:] + options.paths[:shift])
+    try:
+        while time.monotonic() < deadline:
+            path = next(paths)
+            started = time.perf_counter()
+            try:
+                status, _ = await asyncio.wait_for(
+                    connection.request('GET', path), options.timeout
+                )
+                error = status >= 400
+            except (OSError, asyncio.IncompleteReadError,
+                    asyncio.TimeoutError):
+                connection.close()
+                error = True
+            results.append(((time.perf_counter() - started) * 1000, error))
+    finally:
+        connection.close()
+
+
+async def measure(mode, options):
+    server = start_server(mode, options)
+    try:
+        await wait_ready(options)
+        deadline = time.monotonic() + options.duration
+        connected = []
+        slow = [
+            asyncio.ensure_future(slow_client(options, deadline, connected))
+            for _ in range(options.slow_clients)
+        ]
+        # Медленные клиенты успевают занять воркеры до начала замера.
+        await asyncio.sleep(1)
+        results = []
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            fast_client(index, options, deadline, results)
+            for index in range(options.concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+        await asyncio.gather(*slow)
+    finally:
+        server.terminate()
+        server.wait()
+    latencies = sorted(latency for latency, _ in results) or [0.0]
+    print(ROW.format(
+        mode=mode,
+        slow=len(connected),
+        count=len(results),
+        errors=sum(error for _, error in results),
+        rps=sum(not error for _, error in results) / elapsed,
+        p50=percentile(latencies, 0.5),
+        p95=percentile(latencies, 0.95),
+        p99=percentile(latencies, 0.99),
+    ), flush=True)
+
+
+def free_port(host):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+async def main(options):
+    options.port = options.port or free_port(options.host)
+    print(HEADER, flush=True)
+    for mode in options.modes:
+        await measure(mode, options)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--slow-clients', type=int, default=50)
+    parser.add_argument(
+        '--trickle-interval', type=float, default=2,
+        help='Секунд между строками заголовков медленного клиента.'
+    )
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument(
+        '--timeout', type=float, default=5,
+        help='Запрос быстрого клиента дольше этого считается ошибкой.'
+    )
+    parser.add_argument(
+        '--path', dest='paths', action='append',
+        help='Пути быстрых клиентов; по умолчанию справочники и рецепт.'
+    )
+    parser.add_argument(
+        '--mode', dest='modes', action='append', choices=list(MODES)
+    )
+    options = parser.parse_args()
+    options.paths = options.paths or [
+        '/api/tags/', '/api/ingredients/?name=%D1%81', '/api/recipes/?limit=6'
+    ]
+    options.modes = options.modes or list(MODES)
+    return options
+
+
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
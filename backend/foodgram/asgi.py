@@ -13,4 +13,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Поток событий не проходит через Django: в Django 3.2 нет асинхронных
+# потоковых ответов, а соединение с клиентом может жить часами.
+from api.constants import EVENTS_PATH  # noqa: E402
+from api.sse import events_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == EVENTS_PATH:
+        return await events_application(scope, receive, send)
+    return await django_application(scope, receive, send)
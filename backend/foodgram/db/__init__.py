@@ -0,0 +1,64 @@
+import threading
+
+
+class ConnectionStats:
+    """Счетчики соединений с базами данных в процессе."""
+
+    FIELDS = ('opened', 'reused', 'broken', 'closed')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+
+    def count(self, field):
+        with self._lock:
+            self._counts[field] += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self._counts)
+        counts['open'] = counts['opened'] - counts['closed']
+        return counts
+
+
+connection_stats = ConnectionStats()
+
+
+class PersistentConnectionMixin:
+    """
+    Постоянные соединения (CONN_MAX_AGE) с проверкой перед повторным
+    использованием: в начале и конце запроса Django закрывает
+    устаревшие соединения, а оставшиеся помечаются для проверки, которая
+    выполняется при первом обращении к базе в следующем запросе.
+    Так соединение, разорванное сервером, pgbouncer или сетью за время
+    простоя, заменяется новым, а не приводит к ошибке запроса.
+    """
+
+    health_check_pending = False
+
+    def connect(self):
+        super().connect()
+        self.health_check_pending = False
+        connection_stats.count('opened')
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            connection_stats.count('closed')
+
+    def close_if_unusable_or_obsolete(self):
+        # Собственные обращения Django к соединению здесь не проверяются.
+        self.health_check_pending = False
+        super().close_if_unusable_or_obsolete()
+        self.health_check_pending = self.connection is not None
+
+    def ensure_connection(self):
+        if self.health_check_pending and self.connection is not None:
+            self.health_check_pending = False
+            if self.in_atomic_block or self.is_usable():
+                connection_stats.count('reused')
+            else:
+                connection_stats.count('broken')
+                self.close()
+        super().ensure_connection()
@@ -0,0 +1,29 @@
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+db_executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_DB_THREADS,
+    thread_name_prefix='foodgram-db'
+)
+
+
+def database_sync_to_async(func):
+    """
+    Синхронная работа с базой из асинхронного кода в ограниченном пуле
+    потоков: число соединений процесса с базой не превышает
+    ASYNC_DB_THREADS, сколько бы запросов ни ждало ответа. Вызов
+    обрамляется close_old_connections, как запрос в WSGI.
+    """
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False, executor=db_executor)
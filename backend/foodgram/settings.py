@@ -27,10 +27,14 @@ INSTALLED_APPS = [
     'corsheaders',
     'recipes.apps.RecipesConfig',
     'api.apps.ApiConfig',
+    'jobs.apps.JobsConfig',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
+    'api.middleware.PerformanceMetricsMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -61,25 +65,75 @@ TEMPLATES = [
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
 
+# Время жизни соединения с базой в секундах; 0 - новое на каждый запрос.
+CONN_MAX_AGE = int(os.getenv('CONN_MAX_AGE', 60))
+
 if os.getenv('USE_SQLITE', 'False').lower() == 'true':
     DATABASES = {
         'default': {
-            'ENGINE': 'django.db.backends.sqlite3',
+            'ENGINE': 'foodgram.db.sqlite3',
             'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+            'CONN_MAX_AGE': CONN_MAX_AGE,
         }
     }
 else:
     DATABASES = {
         'default': {
-            'ENGINE': 'django.db.backends.postgresql',
+            'ENGINE': 'foodgram.db.postgresql',
             'NAME': os.getenv('POSTGRES_DB', 'django'),
             'USER': os.getenv('POSTGRES_USER', 'django'),
             'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
             'HOST': os.getenv('DB_HOST', ''),
             'PORT': os.getenv('DB_PORT', 5432),
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            # pgbouncer в режиме transaction не сохраняет курсоры между
+            # транзакциями, поэтому серверные курсоры отключаются.
+            'DISABLE_SERVER_SIDE_CURSORS': os.getenv(
+                'PGBOUNCER_TRANSACTION_MODE', 'False'
+            ).lower() == 'true',
         }
     }
 
+# Реплики только для чтения: пути к копиям SQLite или хосты PostgreSQL
+# через запятую. Миграции применяются только к основной базе.
+REPLICA_ALIAS_PREFIX = 'replica'
+if DATABASES['default']['ENGINE'].endswith('sqlite3'):
+    for index, path in enumerate(filter(None, os.getenv(
+        'SQLITE_REPLICAS', ''
+    ).split(','))):
+        DATABASES[f'{REPLICA_ALIAS_PREFIX}{index}'] = {
+            'ENGINE': 'foodgram.db.sqlite3',
+            'NAME': f'file:{path.strip()}?mode=ro',
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    for index, host in enumerate(filter(None, os.getenv(
+        'DB_REPLICA_HOSTS', ''
+    ).split(','))):
+        host, _, port = host.strip().partition(':')
+        DATABASES[f'{REPLICA_ALIAS_PREFIX}{index}'] = {
+            **DATABASES['default'],
+            'HOST': host,
+            'PORT': port or DATABASES['default']['PORT'],
+            'TEST': {'MIRROR': 'default'},
+        }
+
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+REPLICA_HEALTH_INTERVAL = int(os.getenv('REPLICA_HEALTH_INTERVAL', 5))
+REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', 10))
+REPLICA_EXCLUDED_PATHS = ('/admin/',)
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -127,7 +181,18 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ],
+
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 
     'DEFAULT_FILTER_BACKENDS': (
@@ -139,6 +204,61 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
 }
 
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 300))
+
+RECIPE_LIST_VALUES_READER = os.getenv(
+    'RECIPE_LIST_VALUES_READER', 'True'
+).lower() == 'true'
+
+PERFORMANCE_METRICS = os.getenv(
+    'PERFORMANCE_METRICS', 'True'
+).lower() == 'true'
+
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_LEVEL = int(os.getenv('COMPRESSION_LEVEL', 6))
+COMPRESSION_CONTENT_TYPES = (
+    'application/json',
+    'text/plain',
+)
+
+RESPONSE_CACHE = os.getenv('RESPONSE_CACHE', 'True').lower() == 'true'
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 30))
+RESPONSE_CACHE_STALE_TTL = int(os.getenv('RESPONSE_CACHE_STALE_TTL', 300))
+RESPONSE_CACHE_LOCK_TIMEOUT = int(os.getenv('RESPONSE_CACHE_LOCK_TIMEOUT', 10))
+RESPONSE_CACHE_WAIT = float(os.getenv('RESPONSE_CACHE_WAIT', 2))
+
+COUNT_CACHE = os.getenv('COUNT_CACHE', 'True').lower() == 'true'
+COUNT_CACHE_TTL = int(os.getenv('COUNT_CACHE_TTL', 300))
+COUNT_ESTIMATE_THRESHOLD = int(
+    os.getenv('COUNT_ESTIMATE_THRESHOLD', 1000000)
+)
+RECIPE_FILTER_MATERIALIZE_LIMIT = int(
+    os.getenv('RECIPE_FILTER_MATERIALIZE_LIMIT', 500)
+)
+
+ASGI = os.getenv('ASGI', 'False').lower() == 'true'
+ASYNC_DB_THREADS = int(os.getenv('ASYNC_DB_THREADS', 8))
+
+SSE_HEARTBEAT_SECONDS = int(os.getenv('SSE_HEARTBEAT_SECONDS', 20))
+SSE_RETRY_MS = int(os.getenv('SSE_RETRY_MS', 5000))
+SSE_QUEUE_SIZE = int(os.getenv('SSE_QUEUE_SIZE', 100))
+SSE_TICKET_TTL = int(os.getenv('SSE_TICKET_TTL', 30))
+EVENTS_SOCKET_DIR = os.getenv('EVENTS_SOCKET_DIR', '')
+
+JOBS_EAGER = os.getenv('JOBS_EAGER', 'False').lower() == 'true'
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 5))
+JOB_RETRY_DELAY = int(os.getenv('JOB_RETRY_DELAY', 10))
+JOB_RETRY_MAX_DELAY = int(os.getenv('JOB_RETRY_MAX_DELAY', 3600))
+JOB_LOCK_TIMEOUT = int(os.getenv('JOB_LOCK_TIMEOUT', 600))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 1))
+JOB_HOUSEKEEPING_INTERVAL = int(os.getenv('JOB_HOUSEKEEPING_INTERVAL', 60))
+JOB_KEEP_DONE_DAYS = int(os.getenv('JOB_KEEP_DONE_DAYS', 7))
+JOB_WORKER_THREADS = int(os.getenv('JOB_WORKER_THREADS', 4))
+
+DELETION_BATCH_SIZE = int(os.getenv('DELETION_BATCH_SIZE', 1000))
+DELETION_JOB_SECONDS = int(os.getenv('DELETION_JOB_SECONDS', 60))
+
 DJOSER = {
     'USER_CREATE_PASSWORD_RETYPE': False,
     'SERIALIZERS': {
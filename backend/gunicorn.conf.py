@@ -0,0 +1,15 @@
+"""
+Настройки gunicorn. По умолчанию - синхронные WSGI-воркеры, с ASGI=True -
+воркеры uvicorn с foodgram.asgi: асинхронные представления, поток
+событий /api/events/ и работа с базой в ограниченном пуле потоков.
+"""
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:9000')
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+
+if os.getenv('ASGI', 'False').lower() == 'true':
+    wsgi_app = 'foodgram.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'foodgram.wsgi:application'
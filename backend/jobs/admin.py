@@ -0,0 +1,29 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from . import constants as const
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Админка для просмотра очереди и перезапуска упавших задач."""
+    list_display = (
+        'id', 'name', 'status', 'priority', 'attempts', 'run_at',
+        'locked_by', 'finished_at'
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'last_error')
+    readonly_fields = (
+        'attempts', 'locked_by', 'locked_at', 'last_error', 'created_at',
+        'finished_at'
+    )
+    actions = ('requeue',)
+
+    @admin.action(description=const.REQUEUE_ACTION)
+    def requeue(self, request, queryset):
+        count = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now(),
+            locked_by='', locked_at=None, finished_at=None
+        )
+        self.message_user(request, const.JOBS_REQUEUED.format(count=count))
@@ -0,0 +1,11 @@
+UNKNOWN_TASK = 'Задача {name} не зарегистрирована.'
+DUPLICATE_TASK = 'Задача {name} уже зарегистрирована.'
+QUEUE_UNAVAILABLE = 'Очередь задач недоступна.'
+JOB_FAILED = 'Задача {name} (#{id}) завершилась ошибкой, попытка {attempt}.'
+WORKERS_STARTED = (
+    'Запущено процессов: {processes}, потоков в процессе: {threads}.'
+)
+WORKER_DIED = 'Процесс воркера {pid} завершился с кодом {code}.'
+WORKERS_STOPPED = 'Выполнено задач: {done}, с ошибкой: {failed}.'
+REQUEUE_ACTION = 'Перезапустить'
+JOBS_REQUEUED = 'Поставлено в очередь задач: {count}.'
@@ -0,0 +1,94 @@
+import multiprocessing
+import queue
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.constants import WORKER_DIED, WORKERS_STARTED, WORKERS_STOPPED
+from jobs.worker import WorkerPool
+
+HELP = (
+    'Воркеры очереди фоновых задач: процессы с пулом потоков в каждом. '
+    'SIGTERM и SIGINT останавливают их после текущих задач.'
+)
+
+
+def serve(threads, burst, results=None):
+    """Пул потоков процесса до сигнала остановки."""
+    pool = WorkerPool(threads, burst)
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: pool.stop.set())
+    counts = pool.run()
+    if results is not None:
+        results.put(counts)
+    return counts
+
+
+def collect_counts(workers, results):
+    """
+    Счетчики процессов воркеров. Процесс, завершившийся аварийно до
+    отправки счетчиков, не заставляет ждать их вечно: ожидание
+    заканчивается, когда живых процессов не осталось.
+    """
+    counts = []
+    while len(counts) < len(workers):
+        try:
+            counts.append(results.get(timeout=settings.JOB_POLL_INTERVAL))
+        except queue.Empty:
+            if not any(worker.is_alive() for worker in workers):
+                break
+    return counts
+
+
+class Command(BaseCommand):
+    help = HELP
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument(
+            '--threads', type=int, default=settings.JOB_WORKER_THREADS
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Завершиться, когда готовых к запуску задач не останется.'
+        )
+
+    def handle(self, *args, **options):
+        processes, threads = options['processes'], options['threads']
+        self.stdout.write(WORKERS_STARTED.format(
+            processes=processes, threads=threads
+        ))
+        if processes == 1:
+            counts = [serve(threads, options['burst'])]
+        else:
+            # Соединения с базой не должны достаться дочерним процессам.
+            connections.close_all()
+            results = multiprocessing.Queue()
+            workers = [
+                multiprocessing.Process(
+                    target=serve, args=(threads, options['burst'], results)
+                )
+                for _ in range(processes)
+            ]
+            for worker in workers:
+                worker.start()
+
+            def stop(*args):
+                for worker in workers:
+                    worker.terminate()
+
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, stop)
+            counts = collect_counts(workers, results)
+            for worker in workers:
+                worker.join()
+                if worker.exitcode:
+                    self.stderr.write(WORKER_DIED.format(
+                        pid=worker.pid, code=worker.exitcode
+                    ))
+        self.stdout.write(WORKERS_STOPPED.format(
+            done=sum(count['done'] for count in counts),
+            failed=sum(count['failed'] for count in counts),
+        ))
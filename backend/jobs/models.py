@@ -0,0 +1,92 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    Отложенная задача в очереди на основной базе данных. Воркеры
+    (run_workers) забирают задачи с большим приоритетом первыми,
+    среди равных - по времени запуска.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(
+        max_length=128,
+        verbose_name='Задача',
+    )
+    payload = models.JSONField(
+        default=dict,
+        verbose_name='Аргументы',
+    )
+    priority = models.SmallIntegerField(
+        default=0,
+        verbose_name='Приоритет',
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=STATUSES,
+        default=QUEUED,
+        verbose_name='Статус',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попытки',
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Максимум попыток',
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Запуск не раньше',
+    )
+    locked_by = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name='Воркер',
+    )
+    locked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Взята в работу',
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка',
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Создана',
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Завершена',
+    )
+
+    class Meta:
+        ordering = ('-created_at',)
+        verbose_name = 'задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            # Частичный индекс: выполненные задачи его не раздувают.
+            models.Index(
+                fields=('-priority', 'run_at'),
+                condition=models.Q(status='queued'),
+                name='job_queued'
+            ),
+            models.Index(
+                fields=('status', 'locked_at'), name='job_status_locked_at'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.status})'
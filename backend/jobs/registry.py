@@ -0,0 +1,64 @@
+import functools
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .constants import DUPLICATE_TASK
+from .models import Job
+
+tasks = {}
+
+
+class Task:
+    """Функция, которую можно выполнить сразу или поставить в очередь."""
+
+    def __init__(self, func, name, priority, max_attempts):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+        functools.update_wrapper(self, func)
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, priority=None, delay=0, **payload):
+        """
+        Ставит задачу в очередь в текущей транзакции: воркеры увидят ее
+        только после фиксации, а при откате задачи не будет. Аргументы
+        передаются именованными и должны сериализоваться в JSON.
+        """
+        job = Job.objects.create(
+            name=self.name,
+            payload=payload,
+            priority=self.priority if priority is None else priority,
+            max_attempts=self.max_attempts or settings.JOB_MAX_ATTEMPTS,
+            run_at=timezone.now() + timedelta(seconds=delay),
+        )
+        if settings.JOBS_EAGER and not delay:
+            from .worker import run_job
+            transaction.on_commit(functools.partial(run_job, job.pk))
+        return job
+
+
+def task(name=None, priority=0, max_attempts=None):
+    """
+    Регистрирует функцию модуля tasks как задачу очереди:
+
+        @task(priority=10)
+        def rebuild(recipe_id): ...
+
+        rebuild.enqueue(recipe_id=recipe.id)
+
+    Чем больше priority, тем раньше задача выполняется.
+    """
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        if task_name in tasks:
+            raise ValueError(DUPLICATE_TASK.format(name=task_name))
+        tasks[task_name] = Task(func, task_name, priority, max_attempts)
+        return tasks[task_name]
+
+    return decorator
@@ -0,0 +1,121 @@
+import io
+import multiprocessing
+import sys
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from jobs.management.commands.run_workers import collect_counts
+from jobs.models import Job
+from jobs.registry import task
+from jobs.worker import LOCK_EXPIRED, claim, execute, recover_stale_jobs
+
+calls = []
+
+
+@task(name='jobs.tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task(name='jobs.tests.broken', max_attempts=2)
+def broken():
+    raise RuntimeError('broken')
+
+
+@override_settings(JOBS_EAGER=False)
+class QueueTest(TestCase):
+    """Выбор задач, повторы и возврат зависших задач в очередь."""
+
+    def test_claim_order(self):
+        low = record.enqueue(value='low')
+        high = record.enqueue(priority=5, value='high')
+        record.enqueue(delay=60, value='later')
+        first, second = claim('worker'), claim('worker')
+        self.assertEqual((first.pk, second.pk), (high.pk, low.pk))
+        self.assertEqual(first.status, Job.RUNNING)
+        self.assertEqual(first.attempts, 1)
+        self.assertEqual(first.locked_by, 'worker')
+        self.assertIsNone(claim('worker'))
+
+    def test_retry_with_backoff(self):
+        job = broken.enqueue()
+        started = timezone.now()
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            self.assertFalse(execute(claim('worker')))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('RuntimeError', job.last_error)
+        self.assertGreaterEqual(job.run_at, started + timedelta(
+            seconds=settings.JOB_RETRY_DELAY / 2
+        ))
+        self.assertIsNone(claim('worker'))
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            self.assertFalse(execute(claim('worker')))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_unknown_task_not_retried(self):
+        job = Job.objects.create(name='jobs.tests.missing', max_attempts=5)
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            self.assertFalse(execute(claim('worker')))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_recover_stale_jobs(self):
+        stale = record.enqueue(value='stale')
+        exhausted = record.enqueue(value='exhausted')
+        fresh = record.enqueue(value='fresh')
+        for job in (stale, exhausted, fresh):
+            claim('worker', pk=job.pk)
+        locked_at = timezone.now() - timedelta(
+            seconds=settings.JOB_LOCK_TIMEOUT + 1
+        )
+        Job.objects.filter(pk__in=(stale.pk, exhausted.pk)).update(
+            locked_at=locked_at
+        )
+        Job.objects.filter(pk=exhausted.pk).update(attempts=5)
+        recover_stale_jobs()
+        statuses = dict(Job.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[stale.pk], Job.QUEUED)
+        self.assertEqual(statuses[exhausted.pk], Job.FAILED)
+        self.assertEqual(statuses[fresh.pk], Job.RUNNING)
+        self.assertEqual(
+            Job.objects.get(pk=stale.pk).last_error, LOCK_EXPIRED
+        )
+
+
+@override_settings(JOBS_EAGER=False)
+class RunWorkersTest(TransactionTestCase):
+    """run_workers --burst выполняет готовые задачи и завершается."""
+
+    def test_burst(self):
+        calls.clear()
+        for value in range(3):
+            record.enqueue(value=value)
+        broken.enqueue()
+        record.enqueue(delay=60, value='later')
+        out = io.StringIO()
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            call_command(
+                'run_workers', '--burst', '--threads', '1', stdout=out
+            )
+        self.assertEqual(sorted(calls), [0, 1, 2])
+        self.assertIn('Выполнено задач: 3, с ошибкой: 1.', out.getvalue())
+        self.assertEqual(
+            Job.objects.filter(status=Job.QUEUED).count(), 2
+        )
+
+    @override_settings(JOB_POLL_INTERVAL=0.1)
+    def test_dead_process(self):
+        results = multiprocessing.Queue()
+        worker = multiprocessing.Process(target=sys.exit, args=(3,))
+        worker.start()
+        self.assertEqual(collect_counts([worker], results), [])
+        worker.join()
+        self.assertEqual(worker.exitcode, 3)
@@ -0,0 +1,211 @@
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import (
+    DatabaseError, close_old_connections, connections, router, transaction
+)
+from django.db.models import F
+from django.utils import timezone
+
+from .constants import JOB_FAILED, QUEUE_UNAVAILABLE, UNKNOWN_TASK
+from .models import Job
+from .registry import tasks
+
+logger = logging.getLogger(__name__)
+
+LOCK_EXPIRED = 'Воркер не завершил задачу за JOB_LOCK_TIMEOUT.'
+
+
+def worker_name(index):
+    return f'{socket.gethostname()}:{os.getpid()}:{index}'[-64:]
+
+
+def retry_delay(attempt):
+    """
+    Экспоненциальная задержка перед повтором с разбросом: задачи,
+    упавшие вместе, не повторяются одновременно.
+    """
+    delay = min(
+        settings.JOB_RETRY_MAX_DELAY,
+        settings.JOB_RETRY_DELAY * 2 ** (attempt - 1)
+    )
+    return delay * random.uniform(0.5, 1)
+
+
+def jobs():
+    return Job.objects.using(router.db_for_write(Job))
+
+
+def claim(worker, pk=None):
+    """
+    Забирает следующую задачу очереди или None. На PostgreSQL строка
+    выбирается SELECT ... FOR UPDATE SKIP LOCKED: воркеры не ждут
+    блокировок друг друга. Задачу закрепляет условный UPDATE, поэтому
+    и на базах без SKIP LOCKED одну задачу не возьмут дважды:
+    проигравший гонку воркер ищет следующую.
+    """
+    alias = router.db_for_write(Job)
+    while True:
+        now = timezone.now()
+        with transaction.atomic(using=alias):
+            queued = jobs().filter(status=Job.QUEUED, run_at__lte=now)
+            if pk is not None:
+                queued = queued.filter(pk=pk)
+            if connections[alias].features.has_select_for_update_skip_locked:
+                queued = queued.select_for_update(skip_locked=True)
+            job = queued.order_by('-priority', 'run_at', 'pk').only(
+                'pk'
+            ).first()
+            if job is None:
+                return None
+            if jobs().filter(pk=job.pk, status=Job.QUEUED).update(
+                status=Job.RUNNING,
+                locked_by=worker,
+                locked_at=now,
+                attempts=F('attempts') + 1,
+            ):
+                return jobs().get(pk=job.pk)
+
+
+def fail(job, error, retry=True):
+    """Возвращает задачу в очередь с задержкой или отмечает упавшей."""
+    now = timezone.now()
+    if retry and job.attempts < job.max_attempts:
+        jobs().filter(pk=job.pk).update(
+            status=Job.QUEUED,
+            run_at=now + timedelta(seconds=retry_delay(job.attempts)),
+            locked_by='',
+            locked_at=None,
+            last_error=error,
+        )
+    else:
+        jobs().filter(pk=job.pk).update(
+            status=Job.FAILED, finished_at=now, last_error=error
+        )
+
+
+def execute(job):
+    """Выполняет взятую задачу; True, если она завершилась успешно."""
+    task = tasks.get(job.name)
+    try:
+        if task is None:
+            raise LookupError(UNKNOWN_TASK.format(name=job.name))
+        task.func(**job.payload)
+    except Exception:
+        logger.exception(JOB_FAILED.format(
+            name=job.name, id=job.pk, attempt=job.attempts
+        ))
+        fail(job, traceback.format_exc(), retry=task is not None)
+        return False
+    jobs().filter(pk=job.pk).update(
+        status=Job.DONE, finished_at=timezone.now(), last_error=''
+    )
+    return True
+
+
+def run_job(pk):
+    """Выполняет задачу pk сразу, в текущем потоке (JOBS_EAGER)."""
+    job = claim(worker_name('eager'), pk=pk)
+    if job is not None:
+        execute(job)
+
+
+def recover_stale_jobs():
+    """
+    Задачи воркеров, остановившихся посреди выполнения, возвращаются
+    в очередь, а исчерпавшие попытки отмечаются упавшими.
+    """
+    now = timezone.now()
+    expired = jobs().filter(
+        status=Job.RUNNING,
+        locked_at__lt=now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    )
+    expired.filter(attempts__lt=F('max_attempts')).update(
+        status=Job.QUEUED, run_at=now, locked_by='', locked_at=None,
+        last_error=LOCK_EXPIRED
+    )
+    expired.update(
+        status=Job.FAILED, finished_at=now, last_error=LOCK_EXPIRED
+    )
+
+
+def delete_finished_jobs():
+    """Выполненные задачи хранятся JOB_KEEP_DONE_DAYS, упавшие - всегда."""
+    jobs().filter(
+        status=Job.DONE,
+        finished_at__lt=timezone.now() - timedelta(
+            days=settings.JOB_KEEP_DONE_DAYS
+        )
+    ).delete()
+
+
+class WorkerPool:
+    """
+    Потоки одного процесса, выбирающие задачи из очереди до остановки.
+    Поток 0 заодно возвращает в очередь зависшие задачи и удаляет
+    старые выполненные. В режиме burst поток завершается, когда
+    готовых к запуску задач не осталось.
+    """
+
+    def __init__(self, threads, burst=False):
+        self.threads = threads
+        self.burst = burst
+        self.stop = threading.Event()
+        self._lock = threading.Lock()
+        self.counts = {'done': 0, 'failed': 0}
+
+    def _housekeeping(self):
+        recover_stale_jobs()
+        delete_finished_jobs()
+
+    def work(self, index):
+        name = worker_name(index)
+        next_housekeeping = 0
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                try:
+                    if index == 0 and time.monotonic() >= next_housekeeping:
+                        self._housekeeping()
+                        next_housekeeping = (
+                            time.monotonic()
+                            + settings.JOB_HOUSEKEEPING_INTERVAL
+                        )
+                    job = claim(name)
+                    if job is not None:
+                        result = 'done' if execute(job) else 'failed'
+                except DatabaseError:
+                    # Задача, которую не удалось отметить, вернется
+                    # в очередь через JOB_LOCK_TIMEOUT.
+                    logger.exception(QUEUE_UNAVAILABLE)
+                    self.stop.wait(settings.JOB_POLL_INTERVAL)
+                    continue
+                if job is None:
+                    if self.burst:
+                        return
+                    self.stop.wait(settings.JOB_POLL_INTERVAL)
+                    continue
+                with self._lock:
+                    self.counts[result] += 1
+        finally:
+            connections.close_all()
+
+    def run(self):
+        threads = [
+            threading.Thread(
+                target=self.work, args=(index,), name=f'foodgram-job-{index}'
+            )
+            for index in range(self.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.counts
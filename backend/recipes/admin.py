@@ -6,10 +6,12 @@ from django.urls import reverse
 from django.utils.safestring import mark_safe
 
 from . import constants as const
+from .deletion import delete_later
 from .models import (
-    FavoriteRecipes, FoodgramUser, Ingredient, Recipe,
+    Deletion, FavoriteRecipes, FoodgramUser, Ingredient, Recipe,
     RecipeIngredient, ShoppingCart, Subscription, Tag
 )
+from .tags import refresh_tags_masks
 
 user = get_user_model()
 
@@ -42,8 +44,36 @@ class TagInline(admin.TabularInline):
     verbose_name_plural = 'Метки'
 
 
+class DeleteLaterMixin:
+    """
+    Удаление из админки через delete_later: объект сразу помечается
+    удаленным, каскад удаляется в фоне. Страница подтверждения не
+    собирает все зависимые записи, а только перечисляет сами объекты.
+    """
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        opts = self.model._meta
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(opts.verbose_name)
+        return (
+            [*(str(obj) for obj in objs), const.DELETION_ADMIN_TXT],
+            {opts.verbose_name_plural: len(objs)},
+            perms_needed,
+            [],
+        )
+
+    def delete_model(self, request, obj):
+        delete_later(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            delete_later(obj)
+
+
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(DeleteLaterMixin, admin.ModelAdmin):
     """Админка для рецепта."""
     list_display = (
         'id', 'name', 'author',
@@ -69,6 +99,12 @@ class RecipeAdmin(admin.ModelAdmin):
     )
     readonly_fields = ('image_display',)
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Строки TagInline - автоматически созданная модель связи:
+        # Django не отправляет для нее post_save и post_delete.
+        refresh_tags_masks([form.instance.pk])
+
     @admin.display(description='В избранном')
     def favorited_count(self, recipe):
         """Метод для подсчета общего количества добавлений в избранное."""
@@ -114,7 +150,7 @@ class IngredientAdmin(admin.ModelAdmin):
 
 
 @admin.register(FoodgramUser)
-class FoodgramUserAdmin(BaseUserAdmin):
+class FoodgramUserAdmin(DeleteLaterMixin, BaseUserAdmin):
     search_fields = ('first_name', 'last_name', 'username', 'email')
     list_display = (
         'username', 'get_full_name',
@@ -212,4 +248,28 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     list_filter = ('user',)
 
 
+@admin.register(Deletion)
+class DeletionAdmin(admin.ModelAdmin):
+    """Админка для хода фоновых удалений."""
+    list_display = (
+        'name', 'kind', 'object_id', 'progress_display', 'created_at',
+        'finished_at'
+    )
+    list_filter = ('kind',)
+    search_fields = ('name',)
+    readonly_fields = (
+        'kind', 'object_id', 'name', 'total', 'deleted', 'created_at',
+        'finished_at'
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description='Выполнено')
+    def progress_display(self, deletion):
+        if deletion.progress is None:
+            return ''
+        return f'{deletion.progress:.0%}'
+
+
 admin.site.unregister(Group)
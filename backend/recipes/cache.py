@@ -0,0 +1,51 @@
+from django.core.cache import cache
+
+MODEL_GENERATION_KEY = 'generation:{model}'
+# Поколение данных авторов, которые выводятся в рецептах: в отличие от
+# поколения FoodgramUser не меняется при регистрации, смене пароля и
+# других изменениях пользователей, не видных в рецептах.
+AUTHOR_DATA = 'recipes.author'
+
+
+def get_version(key):
+    """Текущая версия счетчика в общем кэше."""
+    return cache.get(key, 0)
+
+
+def bump_version(key, delta=1):
+    """
+    Увеличивает версию счетчика в общем кэше, чтобы его увидели все
+    воркеры. Атомарно только там, где атомарен incr бэкенда (Redis,
+    Memcached, LocMemCache в пределах процесса); у FileBasedCache
+    и DatabaseCache это чтение и запись, и параллельные вызовы могут
+    вернуть одно значение.
+    """
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        cache.set(key, delta, timeout=None)
+        return delta
+
+
+def generation_key(model):
+    """Ключ поколения модели или набора данных вроде AUTHOR_DATA."""
+    if not isinstance(model, str):
+        model = model._meta.label_lower
+    return MODEL_GENERATION_KEY.format(model=model)
+
+
+def get_generations(*models):
+    """Поколения данных моделей одним обращением к кэшу."""
+    keys = [generation_key(model) for model in models]
+    generations = cache.get_many(keys)
+    return tuple(generations.get(key, 0) for key in keys)
+
+
+def bump_generation(model):
+    """
+    Меняет поколение данных модели: от него зависят ETag справочников
+    и записи кэша ответов. Нужна и после bulk_create, который не
+    отправляет сигналы.
+    """
+    bump_version(generation_key(model))
@@ -20,9 +20,33 @@ VALID_USERNAME = (
 DATA_JOINED = 'Все {name} созданы.'
 DATA_FAIL = 'Ошибка при обработке файла {file}: {e}'
 
+# Битов в Recipe.tags_mask (BigIntegerField без знакового бита).
+TAG_MASK_BITS = 63
+
 INGREDIENTS = 'продукты'
 TAGS = 'метки'
 
+# Поля пользователя, которые выводятся в рецептах как данные автора.
+AUTHOR_FIELDS = ('username', 'email', 'first_name', 'last_name', 'avatar')
+
 USERNAME_VALIDATION_PATTERN = r'^[\w.@+-]+$'
+USERNAME_INVALID_CHARACTER = r'[^\w.@+-]'
 
 RECIPE_NOT_FOUND = 'Рецепт с ID {id} не найден.'
+
+# Логин и почта удаляемого пользователя: двоеточие не пропускают
+# username_validator и проверка почты, поэтому их не занять заранее.
+DELETED_USERNAME = 'deleted:{pk}'
+DELETED_EMAIL = 'deleted:{pk}@deleted.invalid'
+DELETION_PROGRESS = 'Удаление {deletion} (#{id}): {deleted} из {total}.'
+DELETION_ADMIN_TXT = (
+    'Зависимые записи будут удалены в фоне, ход удаления - '
+    'в разделе «Удаления».'
+)
+
+SEED_NO_CATALOG = (
+    'Сначала загрузите продукты и метки: '
+    'import_ingredients и import_tags.'
+)
+SEED_PHASE_DONE = 'Этап {name} завершен за {seconds:.1f} с.'
+SEED_DONE = 'Создано пользователей: {users}, рецептов: {recipes}.'
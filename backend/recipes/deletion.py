@@ -0,0 +1,158 @@
+import logging
+import time
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import bump_generation
+from .constants import DELETED_EMAIL, DELETED_USERNAME, DELETION_PROGRESS
+from .models import (
+    Deletion, FavoriteRecipes, FoodgramUser, Recipe, RecipeIngredient,
+    ShoppingCart, Subscription, recipes_deleted
+)
+
+logger = logging.getLogger(__name__)
+
+
+def delete_later(obj):
+    """
+    Помечает пользователя или рецепт удаленным и ставит удаление
+    зависимых записей в очередь. Объект сразу пропадает из менеджеров
+    по умолчанию, но запрос не ждет каскада и не загружает его в память.
+    Рецепты пользователя скрываются одним UPDATE по индексу автора,
+    чтобы в выдаче не осталось рецептов без автора.
+    """
+    from .tasks import purge_deleted
+
+    name = str(obj)[:256]
+    with transaction.atomic():
+        if isinstance(obj, FoodgramUser):
+            kind = Deletion.USER
+            obj.is_deleted = True
+            obj.is_active = False
+            # Логин и почта освобождаются сразу, не дожидаясь удаления.
+            obj.username = DELETED_USERNAME.format(pk=obj.pk)
+            obj.email = DELETED_EMAIL.format(pk=obj.pk)
+            obj.save(update_fields=(
+                'is_deleted', 'is_active', 'username', 'email'
+            ))
+            recipes = Recipe.objects.filter(author=obj)
+            recipe_ids = list(recipes.values_list('pk', flat=True))
+            recipes.update(is_deleted=True, updated_at=timezone.now())
+            transaction.on_commit(partial(bump_generation, Recipe))
+            author_id = obj.pk
+        else:
+            kind = Deletion.RECIPE
+            obj.is_deleted = True
+            obj.save(update_fields=('is_deleted', 'updated_at'))
+            recipe_ids = [obj.pk]
+            author_id = obj.author_id
+        recipes_deleted.send(
+            sender=Recipe, author_id=author_id, recipe_ids=recipe_ids
+        )
+        deletion = Deletion.objects.create(
+            kind=kind, object_id=obj.pk, name=name
+        )
+        purge_deleted.enqueue(deletion_id=deletion.pk)
+    return deletion
+
+
+def get_steps(deletion):
+    """
+    Шаги удаления: (запрос, без сигналов). Сначала удаляются записи,
+    которые видят другие пользователи, последним - сам объект, когда
+    каскаду Django уже почти нечего собирать. Продукты и метки удаляемых
+    рецептов удаляются без сигналов: пересчитывать updated_at и маски
+    меток рецептов, которые тоже будут удалены, незачем.
+    """
+    if deletion.kind == Deletion.USER:
+        user_id = deletion.object_id
+        return (
+            (FavoriteRecipes.objects.filter(user_id=user_id), False),
+            (ShoppingCart.objects.filter(user_id=user_id), False),
+            (Subscription.objects.filter(user_id=user_id), False),
+            (Subscription.objects.filter(author_id=user_id), False),
+            (FavoriteRecipes.objects.filter(
+                recipe__author_id=user_id
+            ), False),
+            (ShoppingCart.objects.filter(recipe__author_id=user_id), False),
+            (RecipeIngredient.objects.filter(
+                recipe__author_id=user_id
+            ), True),
+            (Recipe.tags.through.objects.filter(
+                recipe__author_id=user_id
+            ), True),
+            (Recipe.all_objects.filter(author_id=user_id), False),
+            (FoodgramUser.all_objects.filter(pk=user_id), False),
+        )
+    recipe_id = deletion.object_id
+    return (
+        (FavoriteRecipes.objects.filter(recipe_id=recipe_id), False),
+        (ShoppingCart.objects.filter(recipe_id=recipe_id), False),
+        (RecipeIngredient.objects.filter(recipe_id=recipe_id), True),
+        (Recipe.tags.through.objects.filter(recipe_id=recipe_id), True),
+        (Recipe.all_objects.filter(pk=recipe_id), False),
+    )
+
+
+def count_steps(steps):
+    """Число записей к удалению по моделям: COUNT без загрузки строк."""
+    total = {}
+    for queryset, _ in steps:
+        label = queryset.model._meta.label
+        total[label] = total.get(label, 0) + queryset.count()
+    return total
+
+
+def delete_batch(queryset, raw):
+    """
+    Удаляет до DELETION_BATCH_SIZE записей запроса; число удаленных
+    записей по моделям, пустой словарь, если удалять больше нечего.
+    Каскад Django собирает только записи пакета.
+    """
+    pks = list(queryset.order_by().values_list('pk', flat=True)[
+        :settings.DELETION_BATCH_SIZE
+    ])
+    if not pks:
+        return {}
+    batch = queryset.model._base_manager.filter(pk__in=pks)
+    if raw:
+        return {queryset.model._meta.label: batch._raw_delete(batch.db)}
+    return batch.delete()[1]
+
+
+def purge(deletion):
+    """
+    Удаляет зависимые записи пакетами, каждый в своей транзакции, пока
+    не истечет DELETION_JOB_SECONDS. True, если удаление завершено.
+    Прерванное удаление продолжается с того же места: шаги выбирают
+    только оставшиеся записи.
+    """
+    started = time.monotonic()
+    steps = get_steps(deletion)
+    if not deletion.total:
+        deletion.total = count_steps(steps)
+        deletion.save(update_fields=('total',))
+    for queryset, raw in steps:
+        while True:
+            if time.monotonic() - started >= settings.DELETION_JOB_SECONDS:
+                return False
+            with transaction.atomic():
+                deleted = delete_batch(queryset, raw)
+                if not deleted:
+                    break
+                for label, count in deleted.items():
+                    deletion.deleted[label] = (
+                        deletion.deleted.get(label, 0) + count
+                    )
+                deletion.save(update_fields=('deleted',))
+            logger.info(DELETION_PROGRESS.format(
+                deletion=deletion, id=deletion.pk,
+                deleted=sum(deletion.deleted.values()),
+                total=sum(deletion.total.values())
+            ))
+    deletion.finished_at = timezone.now()
+    deletion.save(update_fields=('finished_at',))
+    return True
@@ -5,6 +5,7 @@ from django.conf import settings
 from django.core.management.base import BaseCommand
 
 import recipes.constants as const
+from recipes.cache import bump_generation
 
 HELP = 'Импорт данных из JSON файлов'
 
@@ -25,6 +26,7 @@ class ImportDataBaseCommand(BaseCommand):
                     (self.model(**row) for row in json.load(f)),
                     ignore_conflicts=True
                 )
+                bump_generation(self.model)
                 self.stdout.write(self.style.SUCCESS(
                     const.DATA_JOINED.format(name=self.data_name)
                 ))
@@ -8,6 +8,7 @@ from django.db import models
 from django.shortcuts import get_object_or_404
 
 from recipes import constants as const
+from recipes.cache import bump_generation
 from recipes.models import Ingredient
 
 HELP = 'Импорт данных из CSV-файлов для Foodgram.'
@@ -53,6 +54,7 @@ class Command(BaseCommand):
                     ingredients.append(Ingredient(**data))
                 try:
                     Ingredient.objects.bulk_create(ingredients)
+                    bump_generation(Ingredient)
                     self.stdout.write(self.style.SUCCESS(
                         const.DATA_JOINED.format(
                             name=data['name']
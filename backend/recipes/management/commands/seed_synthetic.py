@@ -0,0 +1,275 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from functools import lru_cache
+from itertools import accumulate
+from multiprocessing import Pool
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from recipes import constants as const
+from recipes.models import (
+    FavoriteRecipes, FoodgramUser, Ingredient, Recipe,
+    RecipeIngredient, ShoppingCart, Subscription, Tag
+)
+from recipes.pantry import mark_all_recipes_changed
+from recipes.tags import tags_mask
+
+HELP = (
+    'Генерация синтетических данных для нагрузочных замеров: '
+    'пользователи, рецепты, избранное, корзины и подписки.'
+)
+SYNTHETIC_PASSWORD = 'synthetic-password'
+SYNTHETIC_IMAGE = 'recipe/image/synthetic.png'
+PUB_DATE_SPREAD = timedelta(days=3 * 365)
+WORDS = (
+    'нарежьте', 'обжарьте', 'добавьте', 'перемешайте', 'посолите',
+    'варите', 'запекайте', 'остудите', 'подавайте', 'тушите',
+    'лук', 'морковь', 'масло', 'соус', 'тесто', 'сковороду',
+    'кастрюлю', 'духовку', 'минут', 'до', 'готовности', 'на',
+    'среднем', 'огне', 'с', 'и', 'в', 'после', 'этого', 'затем',
+)
+
+
+@lru_cache(maxsize=None)
+def zipf_weights(size, exponent):
+    """Накопленные веса распределения Ципфа для рангов 0..size-1."""
+    return list(accumulate(
+        1 / (rank ** exponent) for rank in range(1, size + 1)
+    ))
+
+
+def zipf_sample(rng, size, exponent, count):
+    """count различных рангов, выбранных по распределению Ципфа."""
+    count = min(count, size)
+    weights = zipf_weights(size, exponent)
+    ranks = set()
+    while len(ranks) < count:
+        ranks.update(rng.choices(
+            range(size), cum_weights=weights, k=count - len(ranks)
+        ))
+    return ranks
+
+
+@contextmanager
+def explicit_recipe_dates():
+    """Позволяет задать pub_date и updated_at рецептов вручную."""
+    pub_date = Recipe._meta.get_field('pub_date')
+    updated_at = Recipe._meta.get_field('updated_at')
+    pub_date.auto_now_add = updated_at.auto_now = False
+    try:
+        yield
+    finally:
+        pub_date.auto_now_add = updated_at.auto_now = True
+
+
+def chunk_ids(start, total, chunk, batch_size):
+    return range(
+        start + chunk * batch_size,
+        start + min((chunk + 1) * batch_size, total)
+    )
+
+
+def seed_users(plan, chunk):
+    FoodgramUser.objects.bulk_create(
+        FoodgramUser(
+            id=user_id,
+            username=f'synthetic{user_id}',
+            email=f'synthetic{user_id}@example.com',
+            first_name='Имя',
+            last_name=f'Фамилия{user_id}',
+            password=plan['password'],
+        )
+        for user_id in chunk_ids(
+            plan['user_start'], plan['users'], chunk, plan['batch_size']
+        )
+    )
+
+
+def seed_recipes(plan, chunk):
+    rng = random.Random(f'{plan["seed"]}:recipes:{chunk}')
+    now = timezone.now()
+    recipes, recipe_ingredients, recipe_tags = [], [], []
+    for recipe_id in chunk_ids(
+        plan['recipe_start'], plan['recipes'], chunk, plan['batch_size']
+    ):
+        author_rank, = zipf_sample(rng, plan['users'], plan['zipf'], 1)
+        pub_date = now - rng.random() * PUB_DATE_SPREAD
+        recipes.append(Recipe(
+            id=recipe_id,
+            author_id=plan['user_start'] + author_rank,
+            name=f'Рецепт {recipe_id}',
+            image=SYNTHETIC_IMAGE,
+            text=' '.join(rng.choices(WORDS, k=rng.randint(20, 200))),
+            cooking_time=max(1, int(rng.lognormvariate(3.3, 0.6))),
+            pub_date=pub_date,
+            updated_at=pub_date,
+        ))
+        for rank in zipf_sample(
+            rng,
+            len(plan['ingredient_ids']),
+            plan['zipf'],
+            round(rng.triangular(3, 15, 7))
+        ):
+            recipe_ingredients.append(RecipeIngredient(
+                recipe_id=recipe_id,
+                ingredient_id=plan['ingredient_ids'][rank],
+                amount=rng.randint(1, 500),
+            ))
+        tag_ids = rng.sample(
+            plan['tag_ids'], min(rng.randint(1, 3), len(plan['tag_ids']))
+        )
+        recipes[-1].tags_mask = tags_mask(tag_ids)
+        for tag_id in tag_ids:
+            recipe_tags.append(Recipe.tags.through(
+                recipe_id=recipe_id, tag_id=tag_id
+            ))
+    with explicit_recipe_dates(), transaction.atomic():
+        Recipe.objects.bulk_create(recipes)
+        RecipeIngredient.objects.bulk_create(recipe_ingredients)
+        Recipe.tags.through.objects.bulk_create(recipe_tags)
+
+
+def seed_user_lists(plan, chunk):
+    rng = random.Random(f'{plan["seed"]}:lists:{chunk}')
+    lists = {FavoriteRecipes: [], ShoppingCart: []}
+    for user_id in chunk_ids(
+        plan['user_start'], plan['users'], chunk, plan['batch_size']
+    ):
+        for model, average in (
+            (FavoriteRecipes, plan['favorites']),
+            (ShoppingCart, plan['carts']),
+        ):
+            for rank in zipf_sample(
+                rng, plan['recipes'], plan['zipf'],
+                rng.randint(0, 2 * average)
+            ):
+                lists[model].append(model(
+                    user_id=user_id, recipe_id=plan['recipe_start'] + rank
+                ))
+    with transaction.atomic():
+        for model, rows in lists.items():
+            model.objects.bulk_create(rows)
+
+
+def seed_subscriptions(plan, chunk):
+    rng = random.Random(f'{plan["seed"]}:subscriptions:{chunk}')
+    subscriptions = []
+    for user_id in chunk_ids(
+        plan['user_start'], plan['users'], chunk, plan['batch_size']
+    ):
+        for rank in zipf_sample(
+            rng, plan['users'], plan['zipf'],
+            rng.randint(0, 2 * plan['subscriptions'])
+        ):
+            if plan['user_start'] + rank != user_id:
+                subscriptions.append(Subscription(
+                    user_id=user_id, author_id=plan['user_start'] + rank
+                ))
+    Subscription.objects.bulk_create(subscriptions)
+
+
+def run_chunk(task):
+    function, plan, chunk = task
+    function(plan, chunk)
+
+
+PHASES = (
+    ('users', seed_users, 'users'),
+    ('recipes', seed_recipes, 'recipes'),
+    ('favorites/carts', seed_user_lists, 'users'),
+    ('subscriptions', seed_subscriptions, 'users'),
+)
+
+
+class Command(BaseCommand):
+    help = HELP
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--favorites', type=int, default=10,
+            help='Среднее число рецептов в избранном у пользователя.'
+        )
+        parser.add_argument(
+            '--carts', type=int, default=3,
+            help='Среднее число рецептов в корзине у пользователя.'
+        )
+        parser.add_argument(
+            '--subscriptions', type=int, default=5,
+            help='Среднее число подписок у пользователя.'
+        )
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Показатель распределения Ципфа для популярности.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Число процессов (для SQLite всегда 1).'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        ingredient_ids = list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)
+        )
+        tag_ids = list(Tag.objects.order_by('id').values_list('id', flat=True))
+        if not ingredient_ids or not tag_ids:
+            raise CommandError(const.SEED_NO_CATALOG)
+        plan = {
+            'users': options['users'],
+            'recipes': options['recipes'],
+            'favorites': options['favorites'],
+            'carts': options['carts'],
+            'subscriptions': options['subscriptions'],
+            'zipf': options['zipf'],
+            'batch_size': options['batch_size'],
+            'seed': options['seed'],
+            'ingredient_ids': ingredient_ids,
+            'tag_ids': tag_ids,
+            'password': make_password(SYNTHETIC_PASSWORD),
+            'user_start': (
+                FoodgramUser.objects.aggregate(Max('id'))['id__max'] or 0
+            ) + 1,
+            'recipe_start': (
+                Recipe.objects.aggregate(Max('id'))['id__max'] or 0
+            ) + 1,
+        }
+        workers = options['workers']
+        if connection.vendor == 'sqlite':
+            workers = 1
+        for name, function, size_key in PHASES:
+            started = time.monotonic()
+            tasks = [
+                (function, plan, chunk)
+                for chunk in range(
+                    -(-plan[size_key] // plan['batch_size'])
+                )
+            ]
+            if workers > 1:
+                connections.close_all()
+                with Pool(workers) as pool:
+                    pool.map(run_chunk, tasks)
+            else:
+                for task in tasks:
+                    run_chunk(task)
+            self.stdout.write(const.SEED_PHASE_DONE.format(
+                name=name, seconds=time.monotonic() - started
+            ))
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [FoodgramUser, Recipe]
+            ):
+                cursor.execute(sql)
+        mark_all_recipes_changed()
+        self.stdout.write(self.style.SUCCESS(const.SEED_DONE.format(
+            users=plan['users'], recipes=plan['recipes']
+        )))
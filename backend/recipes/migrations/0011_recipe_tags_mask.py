@@ -0,0 +1,36 @@
+# Generated by Django 3.2.3 on 2026-10-19 13:23
+
+from django.db import migrations, models
+
+TAG_MASK_BITS = 63
+BATCH_SIZE = 1000
+
+
+def fill_tags_masks(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    masks = {}
+    for recipe_id, tag_id in Recipe.tags.through.objects.filter(
+        tag_id__lte=TAG_MASK_BITS
+    ).values_list('recipe_id', 'tag_id').iterator():
+        masks[recipe_id] = masks.get(recipe_id, 0) | 1 << (tag_id - 1)
+    Recipe.objects.bulk_update(
+        [Recipe(pk=pk, tags_mask=mask) for pk, mask in masks.items()],
+        ['tags_mask'],
+        batch_size=BATCH_SIZE
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='tags_mask',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Маска меток'),
+        ),
+        migrations.RunPython(fill_tags_masks, migrations.RunPython.noop),
+    ]
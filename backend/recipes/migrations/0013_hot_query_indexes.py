@@ -0,0 +1,29 @@
+# Generated by Django 3.2.3 on 2026-10-19 13:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipe_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favoriterecipes',
+            index=models.Index(fields=['user', 'recipe'], name='favoriterecipes_user_recipe'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-pub_date'], name='recipe_pub_date'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date'], name='recipe_author_pub_date'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingcart',
+            index=models.Index(fields=['user', 'recipe'], name='shoppingcart_user_recipe'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 3.2.3 on 2026-10-19 13:38
+
+import django.contrib.auth.models
+from django.db import migrations, models
+import recipes.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Deletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('user', 'Пользователь'), ('recipe', 'Рецепт')], max_length=16, verbose_name='Объект')),
+                ('object_id', models.BigIntegerField(verbose_name='ID объекта')),
+                ('name', models.CharField(max_length=256, verbose_name='Название')),
+                ('total', models.JSONField(default=dict, verbose_name='Записей к удалению')),
+                ('deleted', models.JSONField(default=dict, verbose_name='Удалено записей')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Начато')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+            ],
+            options={
+                'verbose_name': 'удаление',
+                'verbose_name_plural': 'Удаления',
+                'ordering': ('-created_at',),
+            },
+        ),
+        migrations.AlterModelManagers(
+            name='foodgramuser',
+            managers=[
+                ('objects', recipes.models.FoodgramUserManager()),
+                ('all_objects', django.contrib.auth.models.UserManager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='foodgramuser',
+            name='is_deleted',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Удаляется'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='is_deleted',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Удаляется'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['is_deleted'], name='recipe_is_deleted'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.3 on 2026-10-19 14:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_deletion'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='recipe',
+            name='recipe_cooking_time_pub_date',
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['cooking_time', 'pub_date', 'is_deleted'], name='recipe_cooking_deleted_date'),
+        ),
+    ]
@@ -1,14 +1,36 @@
 import os
 
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connections, models, router
+from django.dispatch import Signal
 
 from .validators import username_validator
 
 MIN_TIME = int(os.getenv('MIN_TIME', 1))
 MIN_AMOUNT = int(os.getenv('MIN_AMOUNT', 1))
 
+# Массовые изменения избранного и корзины без post_save/post_delete:
+# sender - модель, аргументы user_id, recipe_ids и added.
+user_recipes_changed = Signal()
+# Рецепты помечены удаленными (recipes.deletion.delete_later):
+# sender - Recipe, аргументы author_id и recipe_ids.
+recipes_deleted = Signal()
+
+
+class VisibleManager(models.Manager):
+    """
+    Менеджер по умолчанию без объектов, помеченных удаленными: их
+    зависимые записи удаляются в фоне (recipes.deletion).
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
+class FoodgramUserManager(VisibleManager, UserManager):
+    pass
+
 
 class FoodgramUser(AbstractUser):
     """Модель пользователя с дополнительным
@@ -38,6 +60,14 @@ class FoodgramUser(AbstractUser):
         verbose_name='Аватар',
         upload_to='avatar/image'
     )
+    is_deleted = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Удаляется',
+    )
+
+    objects = FoodgramUserManager()
+    all_objects = UserManager()
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -157,6 +187,13 @@ class Recipe(models.Model):
         Tag,
         verbose_name='Теги',
     )
+    # Метки рецепта одним числом (recipes.tags.tag_bit): фильтр по
+    # меткам без соединения с таблицей связей и DISTINCT.
+    tags_mask = models.BigIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Маска меток',
+    )
     cooking_time = models.PositiveIntegerField(
         verbose_name='Время готовки (мин.)',
         default=MIN_TIME,
@@ -166,12 +203,41 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата создания'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
+    is_deleted = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Удаляется',
+    )
+
+    objects = VisibleManager()
+    all_objects = models.Manager()
 
     class Meta:
         default_related_name = 'recipes'
         ordering = ('-pub_date',)
         verbose_name = 'рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            # Лента: первые рецепты по дате без сортировки всей таблицы.
+            models.Index(fields=('-pub_date',), name='recipe_pub_date'),
+            # Количество рецептов без удаляемых - по индексу, без чтения
+            # таблицы.
+            models.Index(fields=('is_deleted',), name='recipe_is_deleted'),
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='recipe_author_pub_date'
+            ),
+            # Фильтр по времени готовки со списком по дате; is_deleted
+            # в конце - чтобы индекс оставался покрывающим.
+            models.Index(
+                fields=('cooking_time', 'pub_date', 'is_deleted'),
+                name='recipe_cooking_deleted_date'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.name[:30]}, автор {self.author}'
@@ -208,12 +274,76 @@ class RecipeIngredient(models.Model):
                 name='unique_ingredient_per_recipe'
             )
         ]
+        indexes = [
+            # Рецепты с продуктом без чтения таблицы: фильтр ingredients.
+            models.Index(
+                fields=('ingredient', 'recipe'),
+                name='recipeingredient_ingr_recipe'
+            ),
+        ]
 
     def __str__(self):
         return (f'{self.amount} {self.ingredient.measurement_unit} '
                 f'{self.ingredient} в {self.recipe.name[:20]}')
 
 
+class RecipeUserManager(models.Manager):
+    """
+    Добавление и удаление рецептов одним SQL-запросом.
+    Конкурентные повторные запросы не приводят к IntegrityError:
+    уже добавленные и несуществующие рецепты просто пропускаются.
+    """
+
+    def _execute(self, sql, user_id, recipe_ids, *params):
+        connection = connections[router.db_for_write(self.model)]
+        opts = self.model._meta
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(sql.format(
+                table=connection.ops.quote_name(opts.db_table),
+                user=connection.ops.quote_name(opts.get_field('user').column),
+                recipe=connection.ops.quote_name(
+                    opts.get_field('recipe').column
+                ),
+                recipes=connection.ops.quote_name(Recipe._meta.db_table),
+                deleted=connection.ops.quote_name(
+                    Recipe._meta.get_field('is_deleted').column
+                ),
+                ids=placeholders,
+            ), [user_id, *recipe_ids, *params])
+            return [recipe_id for recipe_id, in cursor.fetchall()]
+
+    def _changed(self, user_id, recipe_ids, added):
+        if recipe_ids:
+            user_recipes_changed.send(
+                sender=self.model, user_id=user_id,
+                recipe_ids=recipe_ids, added=added
+            )
+        return recipe_ids
+
+    def add_recipes(self, user_id, recipe_ids):
+        """INSERT ... ON CONFLICT DO NOTHING; id добавленных рецептов."""
+        if not recipe_ids:
+            return []
+        return self._changed(user_id, self._execute(
+            'INSERT INTO {table} ({user}, {recipe}) '
+            'SELECT %s, id FROM {recipes} WHERE id IN ({ids}) '
+            'AND {deleted} = %s '
+            'ON CONFLICT DO NOTHING RETURNING {recipe}',
+            user_id, recipe_ids, False
+        ), added=True)
+
+    def remove_recipes(self, user_id, recipe_ids):
+        """DELETE ... RETURNING; id удаленных рецептов."""
+        if not recipe_ids:
+            return []
+        return self._changed(user_id, self._execute(
+            'DELETE FROM {table} WHERE {user} = %s AND {recipe} IN ({ids}) '
+            'RETURNING {recipe}',
+            user_id, recipe_ids
+        ), added=False)
+
+
 class BaseRecipeUserModel(models.Model):
     """Базовая модель для связи рецепта с пользователем."""
     user = models.ForeignKey(
@@ -227,6 +357,8 @@ class BaseRecipeUserModel(models.Model):
         verbose_name='Рецепт'
     )
 
+    objects = RecipeUserManager()
+
     class Meta:
         abstract = True
         default_related_name = '%(class)ss'
@@ -236,6 +368,12 @@ class BaseRecipeUserModel(models.Model):
                 name='unique_%(class)s_recipe_per_user'
             )
         ]
+        indexes = [
+            # Списки пользователя только по индексу.
+            models.Index(
+                fields=('user', 'recipe'), name='%(class)s_user_recipe'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user} добавил {self.recipe.name[:20]}'
@@ -259,3 +397,65 @@ class ShoppingCart(BaseRecipeUserModel):
     class Meta(BaseRecipeUserModel.Meta):
         verbose_name = 'рецепт в корзине'
         verbose_name_plural = 'Рецепты в корзине'
+
+
+class Deletion(models.Model):
+    """
+    Фоновое удаление пользователя или рецепта: сам объект уже помечен
+    удаленным, зависимые записи удаляются пакетами (recipes.deletion).
+    """
+    USER = 'user'
+    RECIPE = 'recipe'
+    KINDS = (
+        (USER, 'Пользователь'),
+        (RECIPE, 'Рецепт'),
+    )
+
+    kind = models.CharField(
+        max_length=16,
+        choices=KINDS,
+        verbose_name='Объект',
+    )
+    object_id = models.BigIntegerField(
+        verbose_name='ID объекта',
+    )
+    name = models.CharField(
+        max_length=256,
+        verbose_name='Название',
+    )
+    total = models.JSONField(
+        default=dict,
+        verbose_name='Записей к удалению',
+    )
+    deleted = models.JSONField(
+        default=dict,
+        verbose_name='Удалено записей',
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Начато',
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Завершено',
+    )
+
+    class Meta:
+        ordering = ('-created_at',)
+        verbose_name = 'удаление'
+        verbose_name_plural = 'Удаления'
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.name}'
+
+    @property
+    def progress(self):
+        """Доля удаленных записей от 0 до 1; None, пока их не сосчитали."""
+        if self.finished_at is not None:
+            return 1
+        if not self.total:
+            return None
+        return min(
+            1, sum(self.deleted.values()) / max(1, sum(self.total.values()))
+        )
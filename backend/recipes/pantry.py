@@ -0,0 +1,155 @@
+import threading
+
+from django.core.cache import cache
+
+from .cache import bump_version
+from .models import RecipeIngredient
+
+GENERATION_KEY = 'pantry:generation'
+CHANGE_KEY = 'pantry:change:{generation}'
+CHANGE_TIMEOUT = 60 * 60
+MAX_CHANGES_TO_REPLAY = 500
+
+
+def popcount(number):
+    """Количество единичных битов в числе (Python 3.9 без int.bit_count)."""
+    return bin(number).count('1')
+
+
+class PantryIndex:
+    """
+    Индекс рецептов в памяти процесса для поиска
+    «что приготовить из имеющихся продуктов».
+
+    Набор продуктов каждого рецепта хранится битовой маской:
+    каждому id продукта выделяется свой бит. Недостающие продукты
+    считаются одной операцией над целыми числами:
+    popcount(рецепт & ~кладовая).
+
+    Согласованность между воркерами gunicorn обеспечивается журналом
+    изменений в общем кэше: каждое изменение рецепта увеличивает
+    поколение и записывает id рецепта под ключом этого поколения
+    (с LocMemCache кэш у каждого процесса свой, и изменения в других
+    воркерах не видны).
+    Перед поиском воркер догоняет журнал и перечитывает только
+    изменившиеся рецепты, а при разрыве журнала строит индекс заново.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        self._bits = {}
+        self._recipes = {}
+        self._by_size = []
+
+    def _bit(self, ingredient_id):
+        if ingredient_id not in self._bits:
+            self._bits[ingredient_id] = 1 << len(self._bits)
+        return self._bits[ingredient_id]
+
+    def _load(self, recipe_ids=None):
+        # Помеченные удаленными рецепты выпадают из индекса сразу,
+        # не дожидаясь фонового удаления их продуктов.
+        rows = RecipeIngredient.objects.filter(
+            recipe__is_deleted=False
+        ).values_list('recipe_id', 'ingredient_id')
+        if recipe_ids is not None:
+            rows = rows.filter(recipe_id__in=recipe_ids)
+            for recipe_id in recipe_ids:
+                self._recipes.pop(recipe_id, None)
+        masks = {}
+        for recipe_id, ingredient_id in rows.iterator():
+            masks[recipe_id] = (
+                masks.get(recipe_id, 0) | self._bit(ingredient_id)
+            )
+        for recipe_id, mask in masks.items():
+            self._recipes[recipe_id] = (mask, popcount(mask))
+        self._by_size = sorted(
+            (size, recipe_id, mask)
+            for recipe_id, (mask, size) in self._recipes.items()
+        )
+
+    def _rebuild(self, generation):
+        self._bits = {}
+        self._recipes = {}
+        self._load()
+        self._generation = generation
+
+    def sync(self):
+        """Догоняет журнал изменений из общего кэша."""
+        generation = cache.get_or_set(GENERATION_KEY, 0, timeout=None)
+        with self._lock:
+            if self._generation == generation:
+                return
+            if (
+                self._generation is None
+                or generation < self._generation
+                or generation - self._generation > MAX_CHANGES_TO_REPLAY
+            ):
+                return self._rebuild(generation)
+            keys = [
+                CHANGE_KEY.format(generation=number)
+                for number in range(self._generation + 1, generation + 1)
+            ]
+            changes = cache.get_many(keys)
+            if len(changes) != len(keys):
+                return self._rebuild(generation)
+            self._load(recipe_ids=set(changes.values()))
+            self._generation = generation
+
+    def match(self, ingredient_ids, max_missing=0):
+        """
+        Возвращает список пар (id рецепта, число недостающих продуктов)
+        для рецептов, которым не хватает не более max_missing продуктов.
+        Список отсортирован по числу недостающих продуктов.
+        """
+        self.sync()
+        pantry = 0
+        for ingredient_id in ingredient_ids:
+            pantry |= self._bits.get(ingredient_id, 0)
+        size_limit = popcount(pantry) + max_missing
+        matches = []
+        for size, recipe_id, mask in self._by_size:
+            if size > size_limit:
+                break
+            missing = size - popcount(mask & pantry)
+            if missing <= max_missing:
+                matches.append((recipe_id, missing))
+        matches.sort(key=lambda match: match[1])
+        return matches
+
+
+def mark_recipe_changed(recipe_id):
+    """
+    Записывает изменение набора продуктов рецепта в журнал. Бэкенды
+    без атомарного incr (FileBasedCache, DatabaseCache) могут выдать
+    двум воркерам одно поколение: тогда второй не перезаписывает чужую
+    запись, а заставляет все воркеры перестроить индекс целиком.
+    """
+    generation = bump_version(GENERATION_KEY)
+    if not cache.add(
+        CHANGE_KEY.format(generation=generation), recipe_id, CHANGE_TIMEOUT
+    ):
+        mark_all_recipes_changed()
+
+
+def mark_recipes_changed(recipe_ids):
+    """
+    Записывает изменение рецептов в журнал; если их больше, чем
+    воркер догоняет по журналу, индекс перестраивается целиком.
+    """
+    if len(recipe_ids) > MAX_CHANGES_TO_REPLAY:
+        return mark_all_recipes_changed()
+    for recipe_id in recipe_ids:
+        mark_recipe_changed(recipe_id)
+
+
+def mark_all_recipes_changed():
+    """
+    Заставляет все воркеры перестроить индекс целиком, например
+    после массовой загрузки рецептов через bulk_create.
+    """
+    bump_version(GENERATION_KEY, MAX_CHANGES_TO_REPLAY + 1)
+
+
+pantry_index = PantryIndex()
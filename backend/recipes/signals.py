@@ -0,0 +1,115 @@
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_save
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .constants import AUTHOR_FIELDS
+from .models import (
+    FoodgramUser, Ingredient, Recipe, RecipeIngredient, Tag, recipes_deleted
+)
+from .pantry import mark_recipe_changed, mark_recipes_changed
+from .tags import clear_tag_bit, refresh_tags_masks, update_tags_mask
+
+
+def touch_recipes(**filters):
+    """Обновляет updated_at рецептов без вызова save()."""
+    Recipe.objects.filter(**filters).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    """Отмечает изменение набора продуктов рецепта."""
+    touch_recipes(pk=instance.recipe_id)
+    transaction.on_commit(lambda: mark_recipe_changed(instance.recipe_id))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """Убирает удаленный рецепт из индекса кладовой."""
+    transaction.on_commit(lambda: mark_recipe_changed(instance.id))
+
+
+@receiver(recipes_deleted)
+def recipes_flagged_deleted(sender, recipe_ids, **kwargs):
+    """Рецепты, помеченные удаленными, убираются из индекса кладовой."""
+    transaction.on_commit(lambda: mark_recipes_changed(recipe_ids))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Обновляет updated_at и маски меток рецептов."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            touch_recipes(pk=instance.pk)
+            update_tags_mask(instance)
+    elif action == 'pre_clear':
+        touch_recipes(tags=instance)
+        clear_tag_bit(instance.pk, tags=instance)
+    elif action in ('post_add', 'post_remove'):
+        touch_recipes(pk__in=pk_set)
+        refresh_tags_masks(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+def tag_changed(sender, instance, created, **kwargs):
+    if not created:
+        touch_recipes(tags=instance)
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    """Связи удаленной метки удаляются без m2m_changed."""
+    clear_tag_bit(instance.pk)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_changed(sender, instance, created, **kwargs):
+    if not created:
+        touch_recipes(ingredients=instance)
+
+
+def is_author_data_changed(user, update_fields=None):
+    """
+    Изменятся ли при сохранении пользователя поля AUTHOR_FIELDS,
+    которые выводятся в его рецептах. Новый пользователь рецептов
+    еще не имеет.
+    """
+    if user._state.adding:
+        return False
+    fields = [
+        name for name in AUTHOR_FIELDS
+        if update_fields is None or name in update_fields
+    ]
+    if not fields:
+        return False
+    saved = FoodgramUser.all_objects.filter(pk=user.pk).values(
+        *fields
+    ).first()
+    return saved is None or any(
+        getattr(user, name) != saved[name] for name in fields
+    )
+
+
+@receiver(pre_save, sender=FoodgramUser)
+def check_author_data(sender, instance, update_fields, **kwargs):
+    """Запоминает до сохранения, меняются ли данные автора."""
+    instance._author_data_changed = is_author_data_changed(
+        instance, update_fields
+    )
+
+
+@receiver(post_save, sender=FoodgramUser)
+def author_changed(sender, instance, **kwargs):
+    """
+    Рецепты содержат данные автора, поэтому тоже считаются измененными.
+    UPDATE выполняется сразу, а не в очереди задач: updated_at входит
+    в ETag и Last-Modified рецептов, и без воркера клиенты получали бы
+    304 со старыми данными автора. Смена пароля, вход и другие поля,
+    которых нет в рецептах, рецепты не трогают.
+    """
+    if instance.is_deleted or not instance._author_data_changed:
+        return
+    touch_recipes(author=instance)
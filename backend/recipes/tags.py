@@ -0,0 +1,91 @@
+from django.core.cache import cache
+from django.db.models import F
+
+from .cache import get_generations
+from .constants import TAG_MASK_BITS
+from .models import Recipe, Tag
+
+TAG_MAP_KEY = 'tags:slug-map'
+REFRESH_BATCH_SIZE = 1000
+
+
+def tag_bit(tag_id):
+    """
+    Бит метки в Recipe.tags_mask: метке с id N соответствует бит N - 1.
+    У меток с id больше TAG_MASK_BITS бита нет (0).
+    """
+    if 0 < tag_id <= TAG_MASK_BITS:
+        return 1 << (tag_id - 1)
+    return 0
+
+
+def tags_mask(tag_ids):
+    mask = 0
+    for tag_id in tag_ids:
+        mask |= tag_bit(tag_id)
+    return mask
+
+
+def has_tag_bits(tag_ids):
+    """Все метки представлены в масках и по ним можно фильтровать."""
+    return all(tag_bit(tag_id) for tag_id in tag_ids)
+
+
+def get_tag_ids():
+    """
+    Словарь slug -> id всех меток из общего кэша; перечитывается после
+    смены поколения данных меток.
+    """
+    generations = get_generations(Tag)
+    entry = cache.get(TAG_MAP_KEY)
+    if entry is None or entry[0] != generations:
+        entry = (generations, dict(Tag.objects.values_list('slug', 'id')))
+        cache.set(TAG_MAP_KEY, entry, timeout=None)
+    return entry[1]
+
+
+def update_tags_mask(recipe):
+    """
+    Пересчитывает маску меток рецепта по связям. Маска записывается
+    и в объект: иначе последующий recipe.save() вернул бы старую.
+    """
+    recipe.tags_mask = tags_mask(
+        recipe.tags.through.objects.filter(
+            recipe_id=recipe.pk
+        ).values_list('tag_id', flat=True)
+    )
+    Recipe.objects.filter(pk=recipe.pk).update(tags_mask=recipe.tags_mask)
+
+
+def refresh_tags_masks(recipe_ids=None):
+    """
+    Пересчитывает маски меток рецептов recipe_ids (всех при None)
+    пакетами, например после bulk_create связей, который не отправляет
+    сигналов.
+    """
+    recipes = Recipe.objects.order_by('pk')
+    if recipe_ids is not None:
+        recipes = recipes.filter(pk__in=recipe_ids)
+    recipe_ids = list(recipes.values_list('pk', flat=True))
+    for start in range(0, len(recipe_ids), REFRESH_BATCH_SIZE):
+        batch = recipe_ids[start:start + REFRESH_BATCH_SIZE]
+        masks = dict.fromkeys(batch, 0)
+        for recipe_id, tag_id in Recipe.tags.through.objects.filter(
+            recipe_id__in=batch
+        ).values_list('recipe_id', 'tag_id'):
+            masks[recipe_id] |= tag_bit(tag_id)
+        Recipe.objects.bulk_update(
+            [Recipe(pk=pk, tags_mask=mask) for pk, mask in masks.items()],
+            ['tags_mask']
+        )
+
+
+def clear_tag_bit(tag_id, **filters):
+    """Снимает бит метки в масках рецептов без пересчета связей."""
+    bit = tag_bit(tag_id)
+    if bit:
+        Recipe.objects.filter(**filters).alias(
+            tag_matched=F('tags_mask').bitand(bit)
+        ).filter(tag_matched__gt=0).update(
+            tags_mask=F('tags_mask').bitand(~bit)
+        )
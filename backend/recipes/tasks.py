@@ -0,0 +1,19 @@
+from jobs.registry import task
+
+from .deletion import purge
+from .models import Deletion
+
+
+@task(priority=-2)
+def purge_deleted(deletion_id):
+    """
+    Удаляет зависимые записи помеченного удаленным объекта. Задача
+    ограничена по времени (DELETION_JOB_SECONDS) и, не успев, ставит
+    в очередь свое продолжение: воркер не занят ею надолго, и
+    JOB_LOCK_TIMEOUT не истекает посреди удаления.
+    """
+    deletion = Deletion.objects.filter(
+        pk=deletion_id, finished_at__isnull=True
+    ).first()
+    if deletion is not None and not purge(deletion):
+        purge_deleted.enqueue(deletion_id=deletion_id)
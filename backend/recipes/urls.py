@@ -1,9 +1,14 @@
+from django.conf import settings
 from django.urls import path
 
-from recipes.views import redirect_to_recipe
+from recipes.views import redirect_to_recipe, redirect_to_recipe_async
 
 app_name = 'recipes'
 
 urlpatterns = [
-    path('s/<int:recipe_id>/', redirect_to_recipe, name='redirect_to_recipe'),
+    path(
+        's/<int:recipe_id>/',
+        redirect_to_recipe_async if settings.ASGI else redirect_to_recipe,
+        name='redirect_to_recipe'
+    ),
 ]
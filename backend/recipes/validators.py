@@ -8,8 +8,7 @@ from . import constants as const
 def username_validator(username):
     """Валидация для username с регулярным выражением."""
     invalid_characters = re.findall(
-        f'[^{const.USERNAME_VALIDATION_PATTERN}]',
-        username
+        const.USERNAME_INVALID_CHARACTER, username
     )
     if invalid_characters:
         raise ValidationError(
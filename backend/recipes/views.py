@@ -1,14 +1,28 @@
 from django.http import Http404
 from django.shortcuts import redirect
 
+from foodgram.db.pool import database_sync_to_async
 from recipes.models import Recipe
 from .constants import RECIPE_NOT_FOUND
 
 
-def redirect_to_recipe(request, recipe_id):
-    """Реализует перенаправление с короткой ссылки."""
-    if Recipe.objects.filter(id=recipe_id).exists():
+def recipe_redirect(recipe_id, exists):
+    if exists:
         return redirect(f'/recipes/{recipe_id}/')
     raise Http404(RECIPE_NOT_FOUND.format(
         id=recipe_id
     ))
+
+
+def redirect_to_recipe(request, recipe_id):
+    """Реализует перенаправление с короткой ссылки."""
+    return recipe_redirect(
+        recipe_id, Recipe.objects.filter(id=recipe_id).exists()
+    )
+
+
+async def redirect_to_recipe_async(request, recipe_id):
+    """Перенаправление с короткой ссылки для режима ASGI."""
+    return recipe_redirect(recipe_id, await database_sync_to_async(
+        Recipe.objects.filter(id=recipe_id).exists
+    )())